@@ -20,6 +20,7 @@ def rebuild(pari_data: str, force: bool = False, output: None | str = None):
     gen_files = [
         output_dir / "auto_paridecl.pxd",
         output_dir / "auto_gen.pxi",
+        output_dir / "auto_docs.json.gz",
     ]
 
     if not force and all(f.exists() for f in gen_files):
@@ -206,41 +206,56 @@ class PariArgumentGEN(PariArgumentObject):
     def convert_code(self):
         """
         Conversion to Gen
+
+        A Python ``int`` is not converted here: it is converted
+        directly to a ``GEN`` in :meth:`c_convert_code`, which avoids
+        creating a temporary :class:`Gen`.
         """
         if self.index == 0:
             # self argument
             s  = ""
         elif self.default is None:
-            s  = "        {name} = objtogen({name})\n"
+            s  = "        cdef bint _int_{name} = (type({name}) is int)\n"
+            s += "        if not _int_{name}:\n"
+            s += "            {name} = objtogen({name})\n"
         elif self.default is False:
             # This is actually a required argument
             # See parse_prototype() in parser.py why we need this
             s  = "        if {name} is None:\n"
             s += "            raise TypeError(\"missing required argument: '{name}'\")\n"
-            s += "        {name} = objtogen({name})\n"
+            s += "        cdef bint _int_{name} = (type({name}) is int)\n"
+            s += "        if not _int_{name}:\n"
+            s += "            {name} = objtogen({name})\n"
         else:
             s  = "        cdef bint _have_{name} = ({name} is not None)\n"
-            s += "        if _have_{name}:\n"
+            s += "        cdef bint _int_{name} = (type({name}) is int)\n"
+            s += "        if _have_{name} and not _int_{name}:\n"
             s += "            {name} = objtogen({name})\n"
         return s.format(name=self.name)
     def c_convert_code(self):
         """
         Conversion Gen -> GEN
         """
-        if not self.default:
-            # required argument
+        if self.index == 0:
+            # self argument
             s  = "        cdef GEN {tmp} = (<Gen>{name}).g\n"
-        elif self.default == "NULL":
-            s  = "        cdef GEN {tmp} = NULL\n"
-            s += "        if _have_{name}:\n"
+        elif not self.default:
+            # required argument
+            s  = "        cdef GEN {tmp}\n"
+            s += "        if _int_{name}:\n"
+            s += "            {tmp} = PyLong_AS_GEN(<py_long>{name})\n"
+            s += "        else:\n"
             s += "            {tmp} = (<Gen>{name}).g\n"
-        elif self.default == "0":
-            s  = "        cdef GEN {tmp} = gen_0\n"
-            s += "        if _have_{name}:\n"
+        elif self.default == "NULL" or self.default == "0":
+            s  = "        cdef GEN {tmp} = {default}\n"
+            s += "        if _int_{name}:\n"
+            s += "            {tmp} = PyLong_AS_GEN(<py_long>{name})\n"
+            s += "        elif _have_{name}:\n"
             s += "            {tmp} = (<Gen>{name}).g\n"
         else:
             raise ValueError("default value %r for GEN argument %r is not supported" % (self.default, self.name))
-        return s.format(name=self.name, tmp=self.tmpname)
+        default = "NULL" if self.default == "NULL" else "gen_0"
+        return s.format(name=self.name, tmp=self.tmpname, default=default)
     def call_code(self):
         return self.tmpname
 
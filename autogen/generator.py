@@ -15,12 +15,17 @@ Auto-generate methods for PARI functions.
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import gzip
+import json
 import os
 import re
 import sys
 from pathlib import Path
 
-from .args import PariArgumentGEN, PariInstanceArgument
+from .args import (PariArgumentGEN, PariInstanceArgument, PariArgumentLong,
+                   PariArgumentULong, PariArgumentVariable, PariArgumentPrec,
+                   PariArgumentBitprec, PariArgumentSeriesPrec)
+from .ret import PariReturnGEN, PariReturnmGEN, PariReturnULong, PariReturnVoid
 from .doc import get_rest_doc
 from .parser import parse_prototype, read_pari_desc
 
@@ -73,6 +78,10 @@ function_blacklist = {"O",            # O(p^e) needs special parser support
                       "my",           # idem
                       }
 
+# Expensive functions whose results can be stored in a DiskCache, see
+# Pari.set_disk_cache()
+disk_cache_functions = {"bnfinit", "ellinit", "lfuninit", "mfinit", "nfinit"}
+
 
 class PariFunctionGenerator(object):
     """
@@ -81,12 +90,21 @@ class PariFunctionGenerator(object):
     The PARI file ``pari.desc`` is read and all suitable PARI functions
     are written as methods of either :class:`Gen` or
     :class:`Pari`.
+
+    The methods are written without docstrings, to keep the extension
+    modules small. Instead, the documentation is written to the
+    compressed file ``auto_docs.json.gz``, which is loaded when needed
+    by :mod:`cypari2.docs`.
     """
     def __init__(self, pari_datadir: Path, output_dir: Path):
         self.gen_filename = output_dir / "auto_gen.pxi"
         self.instance_filename = output_dir / "auto_instance.pxi"
         self.decl_filename = output_dir / "auto_paridecl.pxd"
+        self.docs_filename = output_dir / "auto_docs.json.gz"
         self.pari_datadir = pari_datadir
+        self.docs = {}
+        # Index of each function in the tables of cypari2.profiler
+        self.function_ids = {}
 
     def can_handle_function(self, function, cname="", **kwds):
         """
@@ -147,18 +165,36 @@ class PariFunctionGenerator(object):
             ...     **{"class":"basic", "section":"number_fields"})
                 GEN bnfinit0(GEN, long, GEN, long)
                 def bnfinit(P, long flag=0, tech=None, long precision=DEFAULT_BITPREC):
-                    ...
                     cdef bint _have_tech = (tech is not None)
-                    if _have_tech:
+                    cdef bint _int_tech = (type(tech) is int)
+                    if _have_tech and not _int_tech:
                         tech = objtogen(tech)
+                    _cache = get_disk_cache()
+                    _cache_key = None
+                    if _cache is not None:
+                        _cache_key = _cache.key("bnfinit", (P, flag, tech), precision)
+                    if _cache_key is not None:
+                        _cache_res = _cache.load(_cache_key)
+                        if _cache_res is not None:
+                            return _cache_res
                     sig_on()
+                    reset_avma()
                     cdef GEN _P = (<Gen>P).g
                     cdef GEN _tech = NULL
-                    if _have_tech:
+                    if _int_tech:
+                        _tech = PyLong_AS_GEN(<py_long>tech)
+                    elif _have_tech:
                         _tech = (<Gen>tech).g
                     precision = nbits2prec(precision)
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     cdef GEN _ret = bnfinit0(_P, flag, _tech, precision)
-                    return new_gen(_ret)
+                    if _profiling:
+                        profile_stop(&_prof, 0)
+                    _cache_res = new_gen(_ret)
+                    if _cache_key is not None:
+                        _cache.save(_cache_key, _cache_res)
+                    return _cache_res
             <BLANKLINE>
                 ...
             >>> G.handle_pari_function("ellmodulareqn",
@@ -167,7 +203,6 @@ class PariFunctionGenerator(object):
             ...     **{"class":"basic", "section":"elliptic_curves"})
                 GEN ellmodulareqn(long, long, long)
                 def ellmodulareqn(self, long N, x=None, y=None):
-                    ...
                     cdef long _x = -1
                     if x is not None:
                         _x = get_var(x)
@@ -175,7 +210,11 @@ class PariFunctionGenerator(object):
                     if y is not None:
                         _y = get_var(y)
                     sig_on()
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     cdef GEN _ret = ellmodulareqn(N, _x, _y)
+                    if _profiling:
+                        profile_stop(&_prof, 1)
                     return new_gen(_ret)
             <BLANKLINE>
             >>> G.handle_pari_function("setrand",
@@ -185,24 +224,38 @@ class PariFunctionGenerator(object):
             ...     **{"class":"basic", "section":"programming/specific"})
                 void setrand(GEN)
                 def setrand(n):
-                    r'''
-                    Reseeds the random number generator...
-                    '''
                     sig_on()
                     cdef GEN _n = (<Gen>n).g
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     setrand(_n)
+                    if _profiling:
+                        profile_stop(&_prof, 2)
                     clear_stack()
             <BLANKLINE>
                 def setrand(self, n):
-                    r'''
-                    Reseeds the random number generator...
-                    '''
-                    n = objtogen(n)
+                    cdef bint _int_n = (type(n) is int)
+                    if not _int_n:
+                        n = objtogen(n)
                     sig_on()
-                    cdef GEN _n = (<Gen>n).g
+                    reset_avma()
+                    cdef GEN _n
+                    if _int_n:
+                        _n = PyLong_AS_GEN(<py_long>n)
+                    else:
+                        _n = (<Gen>n).g
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     setrand(_n)
+                    if _profiling:
+                        profile_stop(&_prof, 2)
                     clear_stack()
             <BLANKLINE>
+
+        The documentation is stored separately::
+
+            >>> print(G.docs["setrand"])
+            Reseeds the random number generator...
             >>> G.handle_pari_function("polredord",
             ...     cname="polredord", prototype="G",
             ...     help="polredord(x): this function is obsolete, use polredbest.",
@@ -210,26 +263,35 @@ class PariFunctionGenerator(object):
             ...     **{"class":"basic", "section":"number_fields"})
                 GEN polredord(GEN)
                 def polredord(x):
-                    r'''
-                    This function is obsolete, use polredbest.
-                    '''
                     from warnings import warn
                     warn('the PARI/GP function polredord is obsolete (2008-07-20)', DeprecationWarning)
                     sig_on()
                     cdef GEN _x = (<Gen>x).g
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     cdef GEN _ret = polredord(_x)
+                    if _profiling:
+                        profile_stop(&_prof, 3)
                     return new_gen(_ret)
             <BLANKLINE>
                 def polredord(self, x):
-                    r'''
-                    This function is obsolete, use polredbest.
-                    '''
                     from warnings import warn
                     warn('the PARI/GP function polredord is obsolete (2008-07-20)', DeprecationWarning)
-                    x = objtogen(x)
+                    cdef bint _int_x = (type(x) is int)
+                    if not _int_x:
+                        x = objtogen(x)
                     sig_on()
-                    cdef GEN _x = (<Gen>x).g
+                    reset_avma()
+                    cdef GEN _x
+                    if _int_x:
+                        _x = PyLong_AS_GEN(<py_long>x)
+                    else:
+                        _x = (<Gen>x).g
+                    cdef profile_frame _prof
+                    cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)
                     cdef GEN _ret = polredord(_x)
+                    if _profiling:
+                        profile_stop(&_prof, 3)
                     return new_gen(_ret)
             <BLANKLINE>
         """
@@ -239,6 +301,10 @@ class PariFunctionGenerator(object):
             return  # Skip unsupported prototype codes
 
         doc = get_rest_doc(function)
+        if doc:
+            # Remove indentation, like in the PARI manual
+            self.docs[function] = "\n".join(line.strip()
+                                            for line in doc.splitlines())
 
         self.write_declaration(cname, args, ret, self.decl_file)
 
@@ -246,13 +312,17 @@ class PariFunctionGenerator(object):
             # If the first argument is a GEN, write a method of the
             # Gen class.
             self.write_method(function, cname, args, ret, args,
-                              self.gen_file, doc, obsolete)
+                              self.gen_file, obsolete)
 
         # In any case, write a method of the Pari class.
         # Parse again with an extra "self" argument.
         args, ret = parse_prototype(prototype, help, [PariInstanceArgument()])
         self.write_method(function, cname, args, ret, args[1:],
-                          self.instance_file, doc, obsolete)
+                          self.instance_file, obsolete)
+
+        if not obsolete and "W" not in prototype and self.can_batch(args, ret):
+            self.write_batch_method(function, cname, args, ret,
+                                    self.instance_file)
 
     def write_declaration(self, cname, args, ret, file):
         """
@@ -273,7 +343,7 @@ class PariFunctionGenerator(object):
         print(s, file=file)
 
     def write_method(self, function, cname, args, ret, cargs,
-                     file, doc, obsolete):
+                     file, obsolete):
         """
         Write Cython code with a method to call one PARI function.
 
@@ -290,23 +360,13 @@ class PariFunctionGenerator(object):
 
         - ``file`` -- a file object where the code should be written to
 
-        - ``doc`` -- the docstring for the method
-
         - ``obsolete`` -- if ``True``, a deprecation warning will be
           given whenever this method is called
         """
-        doc = "\n".join("        " + line.strip() if line else line
-                        for line in doc.splitlines())
-        # Indent doc, no trailing whitespaces
-
         protoargs = ", ".join(a.prototype_code() for a in args)
         callargs = ", ".join(a.call_code() for a in cargs)
 
         s = "    def {function}({protoargs}):\n"
-        if doc:
-            # Use triple single quotes to make it easier to doctest
-            # this within triply double quoted docstrings.
-            s += "        r'''\n{doc}\n        '''\n"
         # Warning for obsolete functions
         if obsolete:
             s += "        from warnings import warn\n"
@@ -316,14 +376,226 @@ class PariFunctionGenerator(object):
             s += a.deprecation_warning_code(function)
         for a in args:
             s += a.convert_code()
+        cached = function in disk_cache_functions
+        if cached:
+            s += self.disk_cache_lookup_code(args)
         s += "        sig_on()\n"
+        if any(isinstance(a, PariArgumentGEN) and a.index for a in args):
+            # Python integers are converted on the PARI stack: first
+            # remove what an interrupted computation may have left
+            s += "        reset_avma()\n"
         for a in args:
             s += a.c_convert_code()
+        s += "        cdef profile_frame _prof\n"
+        s += "        cdef bint _profiling = profiling_enabled[0] and profile_start(&_prof)\n"
         s += ret.assign_code("{cname}({callargs})")
-        s += ret.return_code()
-
+        s += "        if _profiling:\n"
+        s += "            profile_stop(&_prof, {index})\n"
+        if cached:
+            s += "        _cache_res = new_gen(_ret)\n"
+            s += "        if _cache_key is not None:\n"
+            s += "            _cache.save(_cache_key, _cache_res)\n"
+            s += "        return _cache_res\n"
+        else:
+            s += ret.return_code()
+
+        index = self.function_ids.setdefault(function, len(self.function_ids))
         s = s.format(function=function, protoargs=protoargs, cname=cname,
-                     callargs=callargs, doc=doc, obsolete=obsolete)
+                     callargs=callargs, obsolete=obsolete, index=index)
+        print(s, file=file)
+
+    def disk_cache_lookup_code(self, args):
+        """
+        Return Cython code to look up the result of a function in the
+        ``DiskCache`` set by :meth:`Pari.set_disk_cache`. The generated
+        code sets ``_cache`` and ``_cache_key`` for storing the result.
+
+        INPUT:
+
+        - ``args`` -- output from ``parse_prototype``, including the
+          initial args like ``self``
+
+        EXAMPLES::
+
+            >>> from autogen.generator import PariFunctionGenerator
+            >>> from autogen.parser import parse_prototype
+            >>> from autogen.args import PariInstanceArgument
+            >>> from pathlib import Path
+            >>> G = PariFunctionGenerator(Path("test"), Path("dummy"))
+            >>> args, ret = parse_prototype("GD0,L,p", "nfinit(pol,{flag=0})", [PariInstanceArgument()])
+            >>> print(G.disk_cache_lookup_code(args), end="")
+                    _cache = get_disk_cache()
+                    _cache_key = None
+                    if _cache is not None:
+                        _cache_key = _cache.key("{function}", (pol, flag), precision)
+                    if _cache_key is not None:
+                        _cache_res = _cache.load(_cache_key)
+                        if _cache_res is not None:
+                            return _cache_res
+        """
+        names = []
+        precision = "0"
+        for a in args:
+            if isinstance(a, PariInstanceArgument):
+                continue
+            if isinstance(a, (PariArgumentPrec, PariArgumentBitprec)):
+                precision = a.name
+            else:
+                names.append(a.name)
+        s  = "        _cache = get_disk_cache()\n"
+        s += "        _cache_key = None\n"
+        s += "        if _cache is not None:\n"
+        s += "            _cache_key = _cache.key(\"{{function}}\", ({names}), {precision})\n"
+        s += "        if _cache_key is not None:\n"
+        s += "            _cache_res = _cache.load(_cache_key)\n"
+        s += "            if _cache_res is not None:\n"
+        s += "                return _cache_res\n"
+        names = ", ".join(names) + ("," if len(names) == 1 else "")
+        return s.format(names=names, precision=precision)
+
+    def can_batch(self, args, ret):
+        """
+        Can we write a batched variant of a function with these
+        arguments (including ``self``) and return type?
+
+        This is the case if the first argument is a required ``GEN``
+        and the other arguments are ``GEN`` or C integers, such that
+        they can be converted once for all calls.
+
+        EXAMPLES::
+
+            >>> from autogen.generator import PariFunctionGenerator
+            >>> from autogen.parser import parse_prototype
+            >>> from autogen.args import PariInstanceArgument
+            >>> from pathlib import Path
+            >>> G = PariFunctionGenerator(Path("test"), Path("dummy"))
+            >>> G.can_batch(*parse_prototype("lGG", "kronecker(x,y)", [PariInstanceArgument()]))
+            True
+            >>> G.can_batch(*parse_prototype("GDn", "content(x,{D})", [PariInstanceArgument()]))
+            True
+            >>> G.can_batch(*parse_prototype("vG", "setrand(n)", [PariInstanceArgument()]))
+            False
+            >>> G.can_batch(*parse_prototype("LDn", "ellmodulareqn(N,{x},{y})", [PariInstanceArgument()]))
+            False
+            >>> G.can_batch(*parse_prototype("GD&", "sqrtint(x,{&r})", [PariInstanceArgument()]))
+            False
+        """
+        if isinstance(ret, PariReturnVoid):
+            return False
+        if len(args) < 2:
+            return False
+        if not isinstance(args[1], PariArgumentGEN) or args[1].default is not None:
+            return False
+        batch_types = (PariArgumentGEN, PariArgumentLong, PariArgumentULong,
+                       PariArgumentVariable, PariArgumentPrec,
+                       PariArgumentBitprec, PariArgumentSeriesPrec)
+        return all(isinstance(a, batch_types) and not a.undocumented
+                   for a in args[2:])
+
+    def write_batch_method(self, function, cname, args, ret, file):
+        """
+        Write Cython code with a method ``_batch_{function}`` to call
+        one PARI function on all items of an iterable (given as first
+        argument) in a single ``sig_on()`` block. This is used by
+        :meth:`Pari.batch`.
+
+        The results are returned as ``t_VECSMALL`` for C integer return
+        types and as ``t_VEC`` otherwise.
+
+        INPUT:
+
+        - ``function`` -- name of the PARI function
+
+        - ``cname`` -- name of the PARI C library call
+
+        - ``args``, ``ret`` -- output from ``parse_prototype``,
+          including the initial ``self`` argument
+
+        - ``file`` -- a file object where the code should be written to
+
+        EXAMPLES::
+
+            >>> from autogen.generator import PariFunctionGenerator
+            >>> from autogen.parser import parse_prototype
+            >>> from autogen.args import PariInstanceArgument
+            >>> from pathlib import Path
+            >>> G = PariFunctionGenerator(Path("test"), Path("dummy"))
+            >>> args, ret = parse_prototype("lGG", "kronecker(x,y)", [PariInstanceArgument()])
+            >>> G.write_batch_method("kronecker", "kronecker", args, ret, sys.stdout)
+                def _batch_kronecker(self, x, y):
+                    _batch_items = reduction_items(x)
+                    cdef Py_ssize_t _batch_i, _batch_n = len(_batch_items)
+                    cdef pari_sp _batch_av
+                    cdef bint _int_y = (type(y) is int)
+                    if not _int_y:
+                        y = objtogen(y)
+                    sig_on()
+                    reset_avma()
+                    cdef GEN _y
+                    if _int_y:
+                        _y = PyLong_AS_GEN(<py_long>y)
+                    else:
+                        _y = (<Gen>y).g
+                    cdef GEN _batch_res = cgetg(_batch_n + 1, t_VECSMALL)
+                    for _batch_i in range(_batch_n):
+                        _batch_av = avma
+                        _batch_res[_batch_i + 1] = kronecker(item_to_GEN(_batch_items[_batch_i]), _y)
+                        set_avma(_batch_av)
+                    return new_gen(_batch_res)
+            <BLANKLINE>
+            >>> args, ret = parse_prototype("GD0,L,", "isprime(x,{flag=0})", [PariInstanceArgument()])
+            >>> G.write_batch_method("isprime", "gisprime", args, ret, sys.stdout)
+                def _batch_isprime(self, x, long flag=0):
+                    _batch_items = reduction_items(x)
+                    cdef Py_ssize_t _batch_i, _batch_n = len(_batch_items)
+                    cdef pari_sp _batch_av
+                    sig_on()
+                    reset_avma()
+                    cdef GEN _batch_res = cgetg(_batch_n + 1, t_VEC)
+                    for _batch_i in range(_batch_n):
+                        _batch_av = avma
+                        set_gel(_batch_res, _batch_i + 1, gerepileupto(_batch_av, gisprime(item_to_GEN(_batch_items[_batch_i]), flag)))
+                    return new_gen(_batch_res)
+            <BLANKLINE>
+        """
+        first = args[1]
+        protoargs = ", ".join(a.prototype_code() for a in args)
+        callargs = ", ".join(["item_to_GEN(_batch_items[_batch_i])"] +
+                             [a.call_code() for a in args[2:]])
+        call = "{cname}({callargs})".format(cname=cname, callargs=callargs)
+
+        s  = "    def _batch_{function}({protoargs}):\n"
+        s += "        _batch_items = reduction_items({name})\n"
+        s += "        cdef Py_ssize_t _batch_i, _batch_n = len(_batch_items)\n"
+        s += "        cdef pari_sp _batch_av\n"
+        for a in args[2:]:
+            s += a.convert_code()
+        s += "        sig_on()\n"
+        s += "        reset_avma()\n"
+        for a in args[2:]:
+            s += a.c_convert_code()
+        if isinstance(ret, (PariReturnGEN, PariReturnmGEN, PariReturnULong)):
+            s += "        cdef GEN _batch_res = cgetg(_batch_n + 1, t_VEC)\n"
+        else:
+            s += "        cdef GEN _batch_res = cgetg(_batch_n + 1, t_VECSMALL)\n"
+        # Items are converted one at a time, such that the PARI stack
+        # only holds the results and a single converted item
+        s += "        for _batch_i in range(_batch_n):\n"
+        s += "            _batch_av = avma\n"
+        if isinstance(ret, PariReturnGEN):
+            s += "            set_gel(_batch_res, _batch_i + 1, gerepileupto(_batch_av, {call}))\n"
+        elif isinstance(ret, PariReturnmGEN):
+            # The result may point into the input: copy it
+            s += "            set_gel(_batch_res, _batch_i + 1, gerepilecopy(_batch_av, {call}))\n"
+        elif isinstance(ret, PariReturnULong):
+            s += "            set_gel(_batch_res, _batch_i + 1, gerepileupto(_batch_av, utoi({call})))\n"
+        else:
+            s += "            _batch_res[_batch_i + 1] = {call}\n"
+            s += "            set_avma(_batch_av)\n"
+        s += "        return new_gen(_batch_res)\n"
+
+        s = s.format(function=function, protoargs=protoargs,
+                     name=first.name, call=call)
         print(s, file=file)
 
     def __call__(self):
@@ -333,6 +605,7 @@ class PariFunctionGenerator(object):
         gen_file_tmp = self.gen_filename.with_suffix('.tmp')
         instance_file_tmp = self.instance_filename.with_suffix('.tmp')
         decl_file_tmp = self.decl_filename.with_suffix('.tmp')
+        docs_file_tmp = self.docs_filename.with_suffix('.tmp')
 
         D = read_pari_desc(self.pari_datadir)
         D = sorted(D.values(), key=lambda d: d['function'])
@@ -361,13 +634,25 @@ class PariFunctionGenerator(object):
                 sys.stdout.write(" (%s)" % func)
         sys.stdout.write("\n")
 
+        # Names of the functions for cypari2.profiler
+        names = sorted(self.function_ids, key=self.function_ids.get)
+        self.instance_file.write("set_function_names((\n")
+        for name in names:
+            self.instance_file.write(f"    {name!r},\n")
+        self.instance_file.write("))\n\n")
+
         self.instance_file.write(f"DEF HAVE_PLOT_SVG = {have_plot_svg}")
 
         self.gen_file.close()
         self.instance_file.close()
         self.decl_file.close()
 
+        # mtime=0 to make the output reproducible
+        data = json.dumps(self.docs, sort_keys=True).encode('utf-8')
+        docs_file_tmp.write_bytes(gzip.compress(data, mtime=0))
+
         # All done? Let's commit.
         gen_file_tmp.replace(self.gen_filename)
         instance_file_tmp.replace(self.instance_filename)
         decl_file_tmp.replace(self.decl_filename)
+        docs_file_tmp.replace(self.docs_filename)
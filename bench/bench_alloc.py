@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Benchmark workloads bound by the allocation of :class:`Gen` objects:
+small integer arithmetic, conversion and iteration.
+
+Usage: python bench/bench_alloc.py [N]
+"""
+
+import sys
+import timeit
+
+import cypari2
+
+
+def main(n=10**5):
+    pari = cypari2.Pari()
+    a = pari(12345)
+    b = pari(678)
+    v = pari.vector(1000, range(1000))
+    cases = [
+        ("a + b", lambda: a + b),
+        ("a * b - a", lambda: a * b - a),
+        ("pari(int)", lambda: pari(12345)),
+        ("list(vector(1000)) / 1000", lambda: [x for x in v]),
+    ]
+    print(f"Allocation-bound operations (best of 5, {n} loops)")
+    for name, f in cases:
+        loops = n // 1000 if "1000" in name else n
+        t = min(timeit.repeat(f, number=loops, repeat=5))
+        if "1000" in name:
+            loops *= 1000
+        print(f"  {name:>26}: {t / loops * 1e9:.1f} ns")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
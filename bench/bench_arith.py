@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Benchmark loops mixing Python numbers and PARI objects, which use the
+fast paths for ``int`` and ``float`` operands.
+
+Usage: python bench/bench_arith.py [N]
+"""
+
+import sys
+import timeit
+
+import cypari2
+
+
+def collatz(pari, n):
+    # Number of steps of the Collatz sequence starting at the PARI
+    # integer n
+    steps = 0
+    while n != 1:
+        if n % 2:
+            n = 3 * n + 1
+        else:
+            n = n // 2
+        steps += 1
+    return steps
+
+
+def main(n=10**5):
+    pari = cypari2.Pari()
+    a = pari(12345)
+    q = pari("2/3")
+    r = pari(1.5)
+    cases = [
+        ("a + 1", lambda: a + 1),
+        ("7 * a - 3", lambda: 7 * a - 3),
+        ("a % 97", lambda: a % 97),
+        ("q / 5", lambda: q / 5),
+        ("r * 2.5", lambda: r * 2.5),
+        ("a ** 3", lambda: a ** 3),
+        ("a < 10", lambda: a < 10),
+        ("a == 12345", lambda: a == 12345),
+        ("r >= 0.5", lambda: r >= 0.5),
+    ]
+    print(f"Mixed Python/PARI arithmetic (best of 5, {n} loops)")
+    for name, f in cases:
+        t = min(timeit.repeat(f, number=n, repeat=5))
+        print(f"  {name:>12}: {t / n * 1e9:.1f} ns")
+
+    start = pari(27)
+    loops = max(n // 1000, 1)
+    t = min(timeit.repeat(lambda: collatz(pari, start), number=loops, repeat=5))
+    print(f"  {'collatz(27)':>12}: {t / loops * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Benchmark the overhead of calling Python functions from PARI, with
+normal, fast and translated closures (see
+``cypari2.closure.objtoclosure``).
+
+Usage: python bench/bench_callbacks.py [N]
+"""
+
+import sys
+import timeit
+from math import exp
+
+import cypari2
+from cypari2.closure import objtoclosure
+
+
+def main(n=10**4):
+    pari = cypari2.Pari()
+    ints = pari(list(range(n)))
+    reals = pari([i / n for i in range(n)])
+    vecs = pari([[i, i + 1] for i in range(n)])
+    intnum = pari("f -> intnum(x = 0, [oo, 2], f(x))")
+    sumnum = pari("f -> sumnum(n = 1, f(n))")
+    print(f"Time per callback (best of 5, {n} callbacks)")
+    for mode in ("normal", "fast", "translated"):
+        kwds = {"fast": mode == "fast", "translate": mode == "translated"}
+        ident = objtoclosure(lambda x: x, **kwds)
+        square = objtoclosure(lambda x: x * x, **kwds)
+        first = objtoclosure(lambda v: v[0], **kwds)
+        if mode == "fast":
+            # The argument is a float
+            gauss = objtoclosure(lambda x: exp(-x * x), **kwds)
+        else:
+            gauss = objtoclosure(lambda x: (-x * x).exp(), **kwds)
+        inv = objtoclosure(lambda k: 1 / (k * k), **kwds)
+        ncalls = []
+        counter = objtoclosure(lambda x: ncalls.append(x) or 0)
+        intnum(counter)
+        nint = len(ncalls)
+        del ncalls[:]
+        sumnum(counter)
+        nsum = len(ncalls)
+        cases = [
+            ("apply(x -> x, ints)", lambda: pari.apply(ident, ints), n),
+            ("apply(x -> x*x, ints)", lambda: pari.apply(square, ints), n),
+            ("apply(x -> x*x, reals)", lambda: pari.apply(square, reals), n),
+            ("apply(v -> v[0], vecs)", lambda: pari.apply(first, vecs), n),
+            ("intnum(exp(-x*x))", lambda: intnum(gauss), nint),
+            ("sumnum(1/(k*k))", lambda: sumnum(inv), nsum),
+        ]
+        print(f"{mode} closures:")
+        for name, f, calls in cases:
+            t = min(timeit.repeat(f, number=max(n // calls, 1), repeat=5))
+            t /= max(n // calls, 1) * calls
+            print(f"  {name:>24}: {t * 1e9:.1f} ns")
+    f = lambda x: x
+    t = min(timeit.repeat(lambda: objtoclosure(f), number=n, repeat=5))
+    print(f"objtoclosure (cached): {t / n * 1e9:.1f} ns")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Benchmark the per-call overhead of the generated methods for tiny PARI
+functions, with Python ``int``, :class:`Gen` and variable name
+arguments.
+
+Usage: python bench/bench_calls.py [N]
+"""
+
+import sys
+import timeit
+
+import cypari2
+
+
+def main(n=10**5):
+    pari = cypari2.Pari()
+    a = pari(12345)
+    b = pari(97)
+    P = pari("x^3 + 1")
+    cases = [
+        ("kronecker(int, int)", lambda: pari.kronecker(12345, 97)),
+        ("kronecker(Gen, Gen)", lambda: pari.kronecker(a, b)),
+        ("gcd(int, int)", lambda: pari.gcd(12345, 97)),
+        ("a.gcd(int)", lambda: a.gcd(97)),
+        ("a.gcd(Gen)", lambda: a.gcd(b)),
+        ("valuation(int, int)", lambda: pari.valuation(1024, 2)),
+        ("a.valuation(int)", lambda: a.valuation(5)),
+        ("type(int)", lambda: pari.type(5)),
+        ("a.type()", lambda: a.type()),
+        ("P.polcoef(1, 'x')", lambda: P.polcoef(1, "x")),
+        ("pari.Pol(int, 'y')", lambda: pari.Pol(5, "y")),
+    ]
+    print(f"Per-call overhead of generated methods (best of 5, {n} loops)")
+    for name, f in cases:
+        t = min(timeit.repeat(f, number=n, repeat=5))
+        print(f"  {name:>20}: {t / n * 1e9:.1f} ns")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Benchmark the release of many objects referring to clones on the PARI
+heap, with and without deferred release (see ``Pari.deferred_release``).
+
+Usage: python bench/bench_clones.py [N]
+"""
+
+import sys
+import time
+
+import cypari2
+
+
+def make_clones(pari, n):
+    # On exit from the arena, all surviving objects are moved to the heap
+    with pari.arena():
+        L = [pari(i) ** 3 for i in range(n)]
+    return L
+
+
+def teardown_time(pari, n, queue, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        pari.deferred_release(queue)
+        L = make_clones(pari, n)
+        t = time.perf_counter()
+        del L
+        pari.release_clones()
+        best = min(best, time.perf_counter() - t)
+    pari.deferred_release(0)
+    return best
+
+
+def main(n=10**6):
+    pari = cypari2.Pari()
+    print(f"Release of {n} clones (best of 5)")
+    for queue in (0, 256, 4096, 65536):
+        t = teardown_time(pari, n, queue)
+        label = "immediate" if not queue else f"queue {queue}"
+        print(f"  {label:>12}: {t:.3f} s ({t / n * 1e9:.1f} ns/clone)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
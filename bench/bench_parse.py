@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Benchmark the evaluation of strings with ``pari(str)``, with and
+without the cache of compiled strings (see
+:meth:`cypari2.pari_instance.Pari.set_parse_cache`), compared to
+closures compiled once with :meth:`cypari2.pari_instance.Pari.compile`.
+
+Usage: python bench/bench_parse.py [N]
+"""
+
+import sys
+import timeit
+
+import cypari2
+
+
+def main(n=10**4):
+    pari = cypari2.Pari()
+    a, b = pari(12345), pari(678)
+    f = pari.compile("(a, b) -> a^2 + b")
+    long_code = "my(s = 0); for(i = 1, 10, s += i^2 + binomial(i, 2)); s"
+    cases = [
+        ("pari('2^64 + 1')", lambda: pari("2^64 + 1")),
+        ("pari(long string)", lambda: pari(long_code)),
+        ("pari(f'{a}^2 + {b}')", lambda: pari(f"{a}^2 + {b}")),
+        ("compiled f(a, b) (Gen)", lambda: f(a, b)),
+        ("compiled f(a, b) (int)", lambda: f(12345, 678)),
+    ]
+    print(f"Time per call (best of 5, {n} calls)")
+    for cache in (0, 100):
+        pari.set_parse_cache(cache)
+        print("with parse cache:" if cache else "without parse cache:")
+        for name, g in cases:
+            t = min(timeit.repeat(g, number=n, repeat=5))
+            print(f"  {name:>24}: {t / n * 1e9:.1f} ns")
+    pari.set_parse_cache(0)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -4,3 +4,8 @@ from .gen import Gen
 from .custom_block import init_custom_block
 
 init_custom_block()
+
+from .docs import is_interactive, install_docs
+if is_interactive():
+    install_docs()
+del is_interactive, install_docs
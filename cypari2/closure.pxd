@@ -1,3 +1,3 @@
 from .gen cimport Gen
-cpdef Gen objtoclosure(f)
+cpdef Gen objtoclosure(f, bint fast=*, bint translate=*)
 cdef int _pari_init_closure() except -1
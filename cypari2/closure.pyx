@@ -19,6 +19,15 @@ Examples:
 >>> cube = pari(lambda i: i**3)
 >>> cube.apply(range(10))
 [0, 1, 8, 27, 64, 125, 216, 343, 512, 729]
+
+Functions called many times, for example for numerical integration,
+should be converted to fast closures (see :func:`objtoclosure`):
+
+>>> from math import exp
+>>> from cypari2.closure import objtoclosure
+>>> integrand = objtoclosure(lambda x: exp(-x * x), fast=True)
+>>> pari("f -> intnum(x = 0, [oo, 2], f(x))")(integrand)
+0.886226925452758
 """
 
 # ****************************************************************************
@@ -35,28 +44,79 @@ from cysignals.signals cimport sig_on, sig_off, sig_block, sig_unblock, sig_erro
 
 from cpython.tuple cimport *
 from cpython.object cimport PyObject_Call
-from cpython.ref cimport Py_INCREF
+from cpython.ref cimport Py_INCREF, _Py_REFCNT
+from cpython.long cimport PyLong_FromLong
+from cpython.float cimport PyFloat_AS_DOUBLE
+from cpython.longintrepr cimport py_long
+from libc.limits cimport LONG_MAX
+from libc.stdint cimport int64_t
 
 from .paridecl cimport *
-from .stack cimport new_gen, new_gen_noclear, clone_gen_noclear, DetachGen
-from .gen cimport objtogen
+from .stack cimport (clone_gen, clear_stack, new_gen_noclear, clone_gen_noclear,
+                     borrowed_gen, own_borrowed_gen, DetachGen)
+from .gen cimport Gen, objtogen
+from .convert cimport PyLong_AS_GEN, double_to_REAL
+from .string_utils cimport to_bytes
+from .handle_error import PariError
+
+import weakref
+from functools import partial
+from .profiler cimport callback_start, callback_stop, get_profiling_flag
+
+cdef bint* profiling_enabled = get_profiling_flag()
+
 
-try:
-    from inspect import getfullargspec as getargspec
-except ImportError:
-    from inspect import getargspec
+cdef inline fast_arg(GEN x):
+    """
+    Convert the argument ``x`` of a fast closure to Python: word-sized
+    ``t_INT`` and ``t_REAL`` become ``int`` and ``float``, anything
+    else is borrowed.
+    """
+    cdef long tx = typ(x)
+    cdef ulong u
+    if tx == t_INT and lgefint(x) <= 3:
+        if not signe(x):
+            return 0
+        u = x[2]
+        if u <= <ulong>LONG_MAX:
+            return PyLong_FromLong(u if signe(x) > 0 else -<long>u)
+    elif tx == t_REAL and lg(x) <= 3 and -1000 < expo(x) < 1000:
+        return rtodbl(x)
+    return borrowed_gen(x)
+
+
+cdef int own_escaped_args(tuple t) except -1:
+    """
+    Copy to the heap the borrowed arguments in ``t`` which are still
+    referenced outside ``t``.
+    """
+    cdef PyObject* arg
+    cdef Py_ssize_t i
+    for i in range(PyTuple_GET_SIZE(t)):
+        arg = PyTuple_GET_ITEM(t, i)
+        if type(<object>arg) is Gen and _Py_REFCNT(arg) > 1:
+            own_borrowed_gen(<Gen>arg)
 
 
-cdef inline GEN call_python_func_impl "call_python_func"(GEN* args, object py_func) except NULL:
+cdef inline GEN call_python_func_impl "call_python_func"(GEN* args, ulong token, bint fast) except NULL:
     """
-    Call ``py_func(*args)`` where ``py_func`` is a Python function
-    and ``args`` is an array of ``GEN``s terminated by ``NULL``.
+    Call ``py_func(*args)`` where ``py_func`` is the Python function
+    registered as ``token`` by :func:`register_function` and ``args``
+    is an array of ``GEN``s terminated by ``NULL``.
 
     The arguments are converted from ``GEN`` to a cypari ``gen`` before
     calling ``py_func``. The result is converted back to a PARI ``GEN``.
+
+    If ``fast`` is set, the arguments are converted by ``fast_arg``
+    instead and the arguments which are still referenced after the call
+    are copied to the heap.
     """
-    # We need to ensure that nothing above avma is touched
-    avmaguard = new_gen_noclear(<GEN>avma)
+    py_func = registered_function(token)
+
+    # We need to ensure that nothing above avma is touched. We allocate
+    # an empty vector since avma is not on the PARI stack if the stack
+    # is empty.
+    avmaguard = new_gen_noclear(cgetg(1, t_VEC))
 
     # How many arguments are there?
     cdef Py_ssize_t n = 0
@@ -67,22 +127,53 @@ cdef inline GEN call_python_func_impl "call_python_func"(GEN* args, object py_fu
     cdef tuple t = PyTuple_New(n)
     cdef Py_ssize_t i
     for i in range(n):
-        a = clone_gen_noclear(args[i])
+        if fast:
+            a = fast_arg(args[i])
+        else:
+            a = clone_gen_noclear(args[i])
         Py_INCREF(a)  # Need to increase refcount because the tuple steals it
         PyTuple_SET_ITEM(t, i, a)
+    a = None
 
     # Call the Python function
-    r = PyObject_Call(py_func, t, <dict>NULL)
+    cdef int64_t start = callback_start() if profiling_enabled[0] else 0
+    try:
+        r = PyObject_Call(py_func, t, <dict>NULL)
+    except BaseException:
+        if fast:
+            # The arguments may be referenced by the traceback
+            own_escaped_args(t)
+        raise
+    finally:
+        if start:
+            callback_stop(start)
 
     # Convert the result to a GEN and copy it to the PARI stack
     # (with a special case for None)
+    cdef GEN res
     if r is None:
-        return gnil
+        res = gnil
+    elif fast and type(r) is int:
+        res = PyLong_AS_GEN(<py_long>r)
+    elif fast and type(r) is float:
+        res = double_to_REAL(PyFloat_AS_DOUBLE(r))
+    elif fast and type(r) is Gen and (<Gen>r).next is None:
+        # Not on the PARI stack, possibly borrowed
+        res = (<Gen>r).g
+        if not is_universal_constant(res):
+            res = gcopy(res)
+    else:
+        # Safely delete r
+        d = DetachGen(objtogen(r))
+        del r
+        res = d.detach()
+    r = None
+
+    if fast:
+        own_escaped_args(t)
+    del t
 
-    # Safely delete r and avmaguard
-    d = DetachGen(objtogen(r))
-    del r
-    res = d.detach()
+    # Safely delete avmaguard
     d = DetachGen(avmaguard)
     del avmaguard
     d.detach()
@@ -91,21 +182,15 @@ cdef inline GEN call_python_func_impl "call_python_func"(GEN* args, object py_fu
 
 
 # We rename this function to be able to call it with a different
-# signature. In particular, we want manual exception handling and we
-# implicitly convert py_func from a PyObject* to an object.
+# signature. In particular, we want manual exception handling.
 cdef extern from *:
-    GEN call_python_func(GEN* args, PyObject* py_func)
+    GEN call_python_func(GEN* args, ulong token, bint fast)
 
 
-cdef GEN call_python(GEN arg1, GEN arg2, GEN arg3, GEN arg4, GEN arg5,
-                     ulong nargs, ulong py_func) noexcept:
+cdef inline GEN call_python_args(GEN arg1, GEN arg2, GEN arg3, GEN arg4, GEN arg5,
+                                 ulong nargs, ulong token, bint fast) noexcept:
     """
-    This function, which will be installed in PARI, is a front-end for
-    ``call_python_func_impl``.
-
-    It has 5 optional ``GEN``s as argument, a ``nargs`` argument
-    specifying how many arguments are valid and one ``ulong``, which is
-    actually a Python callable object cast to ``ulong``.
+    Common implementation of ``call_python`` and ``call_python_fast``.
     """
     if nargs > 5:
         sig_error()
@@ -124,28 +209,161 @@ cdef GEN call_python(GEN arg1, GEN arg2, GEN arg3, GEN arg4, GEN arg5,
     # call_python_func_impl(). We need to do this because this function
     # is very likely called within sig_on() and interrupting arbitrary
     # Python code is bad.
-    cdef GEN r = call_python_func(args, <PyObject*>py_func)
+    cdef GEN r = call_python_func(args, token, fast)
     sig_unblock()
     if not r:  # An exception was raised
         sig_error()
     return r
 
 
-# Install the function "call_python" for use in the PARI library.
+cdef GEN call_python(GEN arg1, GEN arg2, GEN arg3, GEN arg4, GEN arg5,
+                     ulong nargs, ulong token) noexcept:
+    """
+    This function, which will be installed in PARI, is a front-end for
+    ``call_python_func_impl``.
+
+    It has 5 optional ``GEN``s as argument, a ``nargs`` argument
+    specifying how many arguments are valid and one ``ulong``, which is
+    the token of a Python callable in ``closure_functions``.
+    """
+    return call_python_args(arg1, arg2, arg3, arg4, arg5, nargs, token, False)
+
+
+cdef GEN call_python_fast(GEN arg1, GEN arg2, GEN arg3, GEN arg4, GEN arg5,
+                          ulong nargs, ulong token) noexcept:
+    """
+    Like ``call_python`` but for fast closures.
+    """
+    return call_python_args(arg1, arg2, arg3, arg4, arg5, nargs, token, True)
+
+
+# Install the functions "call_python" and "call_python_fast" for use
+# in the PARI library.
 cdef entree* ep_call_python
+cdef entree* ep_call_python_fast
 
 cdef int _pari_init_closure() except -1:
     sig_on()
-    global ep_call_python
+    global ep_call_python, ep_call_python_fast
     ep_call_python = install(<void*>call_python, "call_python", 'DGDGDGDGDGD5,U,U')
+    ep_call_python_fast = install(<void*>call_python_fast, "call_python_fast", 'DGDGDGDGDGD5,U,U')
     sig_off()
 
 
-cpdef Gen objtoclosure(f):
+# The Python callables called by the closures created by
+# objtoclosure(), indexed by the token passed to call_python(). PARI
+# cannot hold references to Python objects, so a callable which
+# supports weak references is stored as a weak reference, which
+# removes the entry when the callable is deallocated. Other callables
+# are stored as 1-tuple and never deallocated.
+cdef dict closure_functions = {}
+cdef ulong closure_token = 0
+
+
+cdef ulong register_function(f) except 0:
+    """
+    Add ``f`` to ``closure_functions`` and return its token.
+    """
+    global closure_token
+    closure_token += 1
+    try:
+        ref = weakref.ref(f, partial(unregister_function, closure_token))
+    except TypeError:
+        ref = (f,)
+    closure_functions[closure_token] = ref
+    return closure_token
+
+
+def unregister_function(token, ref):
+    closure_functions.pop(token, None)
+
+
+cdef registered_function(ulong token):
+    """
+    Return the callable registered as ``token``.
+    """
+    ref = closure_functions.get(token)
+    if type(ref) is tuple:
+        return (<tuple>ref)[0]
+    f = ref() if ref is not None else None
+    if f is None:
+        raise ValueError("the Python function called by this PARI closure has been deallocated")
+    return f
+
+
+# Cache of the closures created by objtoclosure(), indexed by
+# (id(f), fast, translate), in order of last use. Every entry is a
+# tuple (closure, f): the cache keeps f alive, so its id is not reused
+# while it is cached. The least recently used closures are evicted,
+# which releases their clone and their reference to f.
+cdef dict closure_cache = {}
+cdef Py_ssize_t closure_cache_size = 256
+
+
+cdef cached_closure(key):
+    """
+    Return the closure for ``key`` from ``closure_cache`` (marking it
+    as most recently used) or ``None``.
+    """
+    entry = closure_cache.pop(key, None)
+    if entry is None:
+        return None
+    closure_cache[key] = entry
+    return (<tuple>entry)[0]
+
+
+cdef int cache_closure(key, Gen res, f) except -1:
+    """
+    Add the closure ``res`` of ``f`` to ``closure_cache``, evicting
+    the least recently used closure if the cache is full.
+    """
+    if len(closure_cache) >= closure_cache_size:
+        del closure_cache[next(iter(closure_cache))]
+    closure_cache[key] = (res, f)
+    return 0
+
+
+cdef Gen translated_closure(source):
+    """
+    Compile the GP closure with source code ``source``.
+    """
+    source = to_bytes(source)
+    sig_on()
+    cdef GEN res = gp_read_str(<bytes>source)
+    if typ(res) != t_CLOSURE:
+        clear_stack()
+        raise ValueError(f"{source} is not a closure")
+    return clone_gen(res)
+
+
+cpdef Gen objtoclosure(f, bint fast=False, bint translate=False):
     """
     Convert a Python function (more generally, any callable) to a PARI
     ``t_CLOSURE``.
 
+    If ``fast`` is set, the overhead of calling ``f`` from PARI is
+    reduced, which matters for functions like ``apply()``, ``intnum()``
+    or ``sumnum()`` calling ``f`` many times:
+
+    - the arguments which are integers fitting in a C ``long`` are
+      passed to ``f`` as Python ``int`` and the real numbers with a
+      precision of at most 64 bits (that is, at most 19 decimal digits)
+      as Python ``float``
+
+    - the other arguments are not copied: they are only copied when
+      they are still referenced after the call or when one of their
+      components is accessed
+
+    - a Python ``int`` or ``float`` result is converted directly
+
+    If ``translate`` is set and ``f`` is a simple arithmetic function,
+    like ``lambda x: x**2 + 1``, it is translated to a GP closure which
+    is evaluated without calling Python (see :mod:`cypari2.translate`).
+    If ``f`` cannot be translated, this option is ignored.
+
+    The closures are cached: converting the same callable again returns
+    the same closure.
+
     .. NOTE::
 
         With the current implementation, the function can be called
@@ -190,6 +408,33 @@ cpdef Gen objtoclosure(f):
     >>> f(10)
     10
 
+    The same callable gives the same closure, as long as it is one of
+    the 256 most recently converted callables, which are kept alive by
+    the cache. Since PARI cannot hold references to Python objects, the
+    closure only holds a weak reference to ``f`` (or a strong one if
+    ``f`` does not support weak references). So ``f`` must be kept
+    alive by its caller when the closure is used after more than 256
+    other callables were converted. Converting many distinct functions
+    (for example, a new ``lambda`` in each iteration of a loop) does
+    not keep them alive:
+
+    >>> objtoclosure(pymul) is mul
+    True
+    >>> objtoclosure(pymul, fast=True) is mul
+    False
+    >>> sq = objtoclosure(lambda x: x * x)
+    >>> clones = pari.memory_stats()["clone_gens"]
+    >>> for k in range(1000):
+    ...     _ = pari.apply(lambda x: x + k, [1])
+    >>> pari.memory_stats()["clone_gens"] - clones <= 256
+    True
+    >>> sq(3)
+    Traceback (most recent call last):
+    ...
+    ValueError: the Python function called by this PARI closure has been deallocated
+    >>> mul(6, 9)
+    54
+
     Test various kinds of errors:
 
     >>> mul(4)
@@ -208,14 +453,74 @@ cpdef Gen objtoclosure(f):
     Traceback (most recent call last):
     ...
     PariError: call_python: ...
+
+    Fast closures receive small integers and low precision real numbers
+    as Python ``int`` and ``float``:
+
+    >>> def types(a, b, c, d, e):
+    ...     print(*[type(x).__name__ for x in (a, b, c, d, e)])
+    >>> fast = objtoclosure(types, fast=True)
+    >>> fast
+    (v1,v2,v3,v4,v5)->call_python_fast(v1,v2,v3,v4,v5,5,...)
+    >>> fast(2, -3, 2**100, 1.5, [1, 2])
+    int int Gen float Gen
+    >>> fast(1.5, pari("1.5"), 0.0, pari("1e-400"), pari("1.5").bitprecision(128))
+    float float float Gen Gen
+    >>> pari.apply(objtoclosure(lambda x: x * x, fast=True), range(10))
+    [0, 1, 4, 9, 16, 25, 36, 49, 64, 81]
+    >>> g = objtoclosure(lambda x: x + 0.5, fast=True)
+    >>> g(1), g(2**70), g(pari("1/3"))
+    (1.50000000000000, 1.18059162071741 E21, 0.833333333333333)
+
+    Arguments which are still referenced after the call are copied:
+
+    >>> L = []
+    >>> keep = objtoclosure(lambda x: L.append(x) or x[0], fast=True)
+    >>> pari.apply(keep, [[1, 2], [3, 4]])
+    [1, 3]
+    >>> L
+    [[1, 2], [3, 4]]
+    >>> L[1][1]
+    4
+
+    Translating simple functions to GP:
+
+    >>> objtoclosure(lambda x: x**2 + 1, translate=True)
+    (x)->x^2+1
+    >>> objtoclosure(lambda n: n.isprime() and n % 4 == 1, translate=True)
+    (v1)->call_python(v1,0,0,0,0,1,...)
+    >>> even = objtoclosure(lambda n: n % 2 == 0, translate=True)
+    >>> pari.select(even, range(10))
+    [0, 2, 4, 6, 8]
+    >>> objtoclosure(lambda x, y, I: x + y + I, translate=True)(1, 2, 3)
+    6
     """
     if not callable(f):
         raise TypeError("argument to objtoclosure() must be callable")
 
+    key = (id(f), fast, translate)
+    cached = cached_closure(key)
+    if cached is not None:
+        return cached
+
+    cdef Gen res
+    if translate:
+        # Imported here since importing ast is slow
+        from .translate import function_to_gp
+        try:
+            res = translated_closure(function_to_gp(f))
+        except (ValueError, PariError):
+            pass
+        else:
+            cache_closure(key, res, f)
+            return res
+
     # Determine number of arguments of f
     cdef Py_ssize_t i, nargs
+    # Imported here since importing inspect is slow
+    from inspect import getfullargspec
     try:
-        argspec = getargspec(f)
+        argspec = getfullargspec(f)
     except Exception:
         nargs = 5
     else:
@@ -225,21 +530,19 @@ cpdef Gen objtoclosure(f):
     if nargs > 5:
         nargs = 5
 
+    cdef ulong token = register_function(f)
+
     # Fill in default arguments of PARI function
     sig_on()
     cdef GEN args = cgetg((5 - nargs) + 2 + 1, t_VEC)
     for i in range(5 - nargs):
         set_gel(args, i + 1, gnil)
     set_gel(args, (5 - nargs) + 1, stoi(nargs))
-    # Convert f to a t_INT containing the address of f
-    set_gel(args, (5 - nargs) + 1 + 1, utoi(<ulong><PyObject*>f))
-
-    # Create a t_CLOSURE which calls call_python() with py_func equal to f
-    cdef Gen res = new_gen(snm_closure(ep_call_python, args))
+    set_gel(args, (5 - nargs) + 1 + 1, utoi(token))
 
-    # We need to keep a reference to f somewhere and there is no way to
-    # have PARI handle this reference for us. So the only way out is to
-    # force f to be never deallocated
-    Py_INCREF(f)
+    # Create a t_CLOSURE which calls call_python() or call_python_fast()
+    # with the token of f
+    res = clone_gen(snm_closure(ep_call_python_fast if fast else ep_call_python, args))
 
+    cache_closure(key, res, f)
     return res
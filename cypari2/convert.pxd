@@ -15,10 +15,16 @@ cdef PyObject_FromGEN(GEN g)
 
 cdef PyInt_FromGEN(GEN g)
 
-cpdef gen_to_python(Gen z)
+cpdef gen_to_python(Gen z, rationals=*, reals=*, matrices=*)
 
 cpdef gen_to_integer(Gen x)
 
+cpdef gen_to_numpy(Gen z, dtype=*)
+
+cpdef bytes gen_to_bytes(Gen x)
+
+cpdef Gen gen_from_bytes(data)
+
 
 # Conversion C -> PARI
 
@@ -71,6 +77,13 @@ cdef inline GEN PyComplex_AS_GEN(x) except? NULL:
 
 cdef GEN PyObject_AsGEN(x) except? NULL
 
+cdef set_parse_cache(size_t maxsize)
+cdef get_parse_cache()
+
+cdef GEN PyBuffer_AsGEN(x, bint matrix, bint vecsmall) except? NULL
+
+cdef GEN binary_to_GEN(const char* buf, Py_ssize_t size) except NULL
+
 
 # Deprecated functions still used by SageMath
 
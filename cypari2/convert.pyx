@@ -39,17 +39,27 @@ some bit shuffling.
 #                  https://www.gnu.org/licenses/
 # ****************************************************************************
 
-from cysignals.signals cimport sig_on, sig_off, sig_error
+from cysignals.signals cimport sig_on, sig_off, sig_error, sig_block, sig_unblock
 
 from cpython.version cimport PY_MAJOR_VERSION
 from cpython.long cimport PyLong_AsLong, PyLong_FromLong
+from cpython.list cimport PyList_New, PyList_SET_ITEM
+from cpython.ref cimport Py_INCREF
+from cysignals.memory cimport check_malloc, check_reallocarray, sig_free
+from cpython.bytes cimport PyBytes_FromStringAndSize, PyBytes_AS_STRING
+from libc.string cimport memcpy, memcmp
 from cpython.longintrepr cimport (_PyLong_New,
                                   digit, PyLong_SHIFT, PyLong_MASK)
-from libc.limits cimport LONG_MIN, LONG_MAX
+from cpython.buffer cimport (PyObject_CheckBuffer, PyObject_GetBuffer,
+                             PyBuffer_Release, PyBUF_SIMPLE, PyBUF_STRIDES,
+                             PyBUF_FORMAT)
+from libc.limits cimport LONG_MIN, LONG_MAX, ULONG_MAX
 from libc.math cimport INFINITY
+from libc.stdint cimport int64_t
 
 from .paridecl cimport *
-from .stack cimport new_gen, reset_avma
+from .paripriv cimport EpNEW, EpVAR, EpVALENCE, initial_value, varentries
+from .stack cimport new_gen, clone_gen, reset_avma
 from .string_utils cimport to_string, to_bytes
 from .pycore_long cimport (ob_digit, _PyLong_IsZero, _PyLong_IsPositive,
                            _PyLong_DigitCount, _PyLong_SetSignAndDigitCount)
@@ -58,10 +68,31 @@ from .pycore_long cimport (ob_digit, _PyLong_IsZero, _PyLong_IsPositive,
 # Conversion PARI -> Python
 ########################################################################
 
-cpdef gen_to_python(Gen z):
+cpdef gen_to_python(Gen z, rationals="fraction", reals="float", matrices="rows"):
     r"""
     Convert the PARI element ``z`` to a Python object.
 
+    INPUT:
+
+    - ``z`` -- a PARI object
+
+    - ``rationals`` -- (default: ``"fraction"``) how to convert
+      rational numbers: ``"fraction"`` gives a ``Fraction``,
+      ``"tuple"`` a tuple ``(numerator, denominator)`` of integers and
+      ``"float"`` a ``float``
+
+    - ``reals`` -- (default: ``"float"``) how to convert real numbers:
+      ``"float"`` gives a ``float``, ``"exact"`` a tuple ``(m, e)`` of
+      integers with ``m`` odd or zero, such that the number is exactly
+      ``m * 2**e``
+
+    - ``matrices`` -- (default: ``"rows"``) whether to convert matrices
+      to a list of rows (``"rows"``) or of columns (``"columns"``)
+
+    Nested vectors and matrices are converted without recursion, so
+    arbitrarily deep objects are supported. Vectors of word-size
+    integers are converted in a single pass.
+
     OUTPUT:
 
     - a Python integer for integers (type ``t_INT``)
@@ -72,13 +103,13 @@ cpdef gen_to_python(Gen z):
 
     - a ``complex`` for complex numbers (type ``t_COMPLEX``)
 
-    - a ``list`` for vectors (type ``t_VEC`` or ``t_COL``). The function
-      ``gen_to_python`` is then recursively applied on the entries.
+    - a ``list`` for vectors (type ``t_VEC`` or ``t_COL``). The entries
+      are converted in the same way.
 
     - a ``list`` of Python integers for small vectors (type ``t_VECSMALL``)
 
-    - a ``list`` of ``list``s for matrices (type ``t_MAT``). The function
-      ``gen_to_python`` is then recursively applied on the entries.
+    - a ``list`` of ``list``s for matrices (type ``t_MAT``). The entries
+      are converted in the same way.
 
     - the floating point ``inf`` or ``-inf`` for infinities (type ``t_INFINITY``)
 
@@ -194,6 +225,41 @@ cpdef gen_to_python(Gen z):
     >>> z = pari('[[1, 3], [[2]]; 3, [4, [5, 6]]]')
     >>> gen_to_python(z)
     [[[1, 3], [[2]]], [3, [4, [5, 6]]]]
+    >>> gen_to_python(z, matrices="columns")
+    [[[1, 3], 3], [[[2]], [4, [5, 6]]]]
+    >>> gen_to_python(pari('matrix(0, 0)'))
+    [[]]
+    >>> gen_to_python(pari('matrix(0, 0)'), matrices="columns")
+    []
+    >>> gen_to_python(pari('matrix(0, 2)'), matrices="columns")
+    [[], []]
+
+    Conversion options for rational and real numbers:
+
+    >>> z = pari('[1/3, -2.5, 2^-100 * 1.0, 0.0]')
+    >>> gen_to_python(z)
+    [Fraction(1, 3), -2.5, 7.888609052210118e-31, 0.0]
+    >>> gen_to_python(z, rationals="tuple", reals="exact")
+    [(1, 3), (-5, -1), (1, -100), (0, -64)]
+    >>> gen_to_python(z, rationals="float")
+    [0.3333333333333333, -2.5, 7.888609052210118e-31, 0.0]
+    >>> gen_to_python(pari('1/3 + 1/2*I'), rationals="tuple")
+    (0.3333333333333333+0.5j)
+    >>> gen_to_python(pari('2^70/3'), rationals="float") == 2**70/3
+    True
+    >>> gen_to_python(z, reals="decimal")
+    Traceback (most recent call last):
+    ...
+    ValueError: reals must be 'float' or 'exact', not 'decimal'
+
+    Deeply nested vectors:
+
+    >>> z = pari('my(v = 1); for (i = 1, 10000, v = [v]); v')
+    >>> a = gen_to_python(z)
+    >>> for i in range(10000):
+    ...     a = a[0]
+    >>> a
+    1
 
     Converting strings:
 
@@ -221,7 +287,29 @@ cpdef gen_to_python(Gen z):
     ...
     NotImplementedError: conversion not implemented for t_PADIC
     """
-    return PyObject_FromGEN(z.g)
+    cdef int rat, real
+    cdef bint columns
+    if rationals == "fraction":
+        rat = RATIONAL_FRACTION
+    elif rationals == "tuple":
+        rat = RATIONAL_TUPLE
+    elif rationals == "float":
+        rat = RATIONAL_FLOAT
+    else:
+        raise ValueError(f"rationals must be 'fraction', 'tuple' or 'float', not {rationals!r}")
+    if reals == "float":
+        real = REAL_FLOAT
+    elif reals == "exact":
+        real = REAL_EXACT
+    else:
+        raise ValueError(f"reals must be 'float' or 'exact', not {reals!r}")
+    if matrices == "rows":
+        columns = False
+    elif matrices == "columns":
+        columns = True
+    else:
+        raise ValueError(f"matrices must be 'rows' or 'columns', not {matrices!r}")
+    return GEN_to_python(z.g, rat, real, columns)
 
 
 cpdef gen_to_integer(Gen x):
@@ -302,35 +390,257 @@ cpdef gen_to_integer(Gen x):
     return PyInt_FromGEN(x.g)
 
 
+# Options for gen_to_python()
+cdef enum:
+    RATIONAL_FRACTION
+    RATIONAL_TUPLE
+    RATIONAL_FLOAT
+
+cdef enum:
+    REAL_FLOAT
+    REAL_EXACT
+
+
+# Kinds of entries for gen_to_numpy(), in increasing order of generality
+cdef enum:
+    ENTRY_INT        # t_INT fitting in a C long
+    ENTRY_REAL       # t_REAL
+    ENTRY_COMPLEX    # t_COMPLEX with real parts
+    ENTRY_OBJECT     # anything else
+
+
+cdef int entry_kind(GEN x) noexcept:
+    cdef long t = typ(x)
+    if t == t_INT:
+        return ENTRY_OBJECT if is_bigint(x) else ENTRY_INT
+    elif t == t_REAL:
+        return ENTRY_REAL
+    elif t == t_COMPLEX:
+        if is_real_t(typ(gel(x, 1))) and is_real_t(typ(gel(x, 2))):
+            return ENTRY_COMPLEX
+    return ENTRY_OBJECT
+
+
+cdef int_array_astype(a, dtype):
+    """
+    Convert the ``int64`` array ``a`` to the integer type ``dtype``,
+    raising ``OverflowError`` if an entry is out of range.
+    """
+    import numpy
+    info = numpy.iinfo(dtype)
+    if a.size and (a.min() < info.min or a.max() > info.max):
+        raise OverflowError(f"PARI integer out of range for {dtype}")
+    return a.astype(dtype, copy=False)
+
+
+cpdef gen_to_numpy(Gen z, dtype=None):
+    r"""
+    Convert the PARI vector or matrix ``z`` to a NumPy array.
+
+    INPUT:
+
+    - ``z`` -- a PARI object of type ``t_VECSMALL``, ``t_VEC``,
+      ``t_COL`` or ``t_MAT``
+
+    - ``dtype`` -- (optional) NumPy data type of the result
+
+    OUTPUT: a 1-dimensional array for vectors, a 2-dimensional array
+    of shape ``(rows, columns)`` for matrices.
+
+    If ``dtype`` is not given, it is chosen from the entries:
+
+    - ``int64`` if all entries are integers fitting in a C long
+
+    - ``float64`` if all entries are such integers or real numbers
+      (type ``t_REAL``)
+
+    - ``complex128`` if all entries are such integers, real numbers
+      or complex numbers with real parts
+
+    - ``object`` otherwise: the entries are converted with
+      :func:`gen_to_python`
+
+    A ``t_VECSMALL`` is converted to a read-only ``int64`` array
+    sharing its memory with ``z`` (which is moved to the PARI heap
+    first). Other objects are converted entry by entry into a new
+    array, without creating intermediate Python objects.
+
+    When converting to an integer ``dtype``, integers which do not fit
+    in that type raise an ``OverflowError``.
+    """
+    import numpy
+
+    cdef GEN g = z.g
+    cdef long t = typ(g)
+    cdef Py_ssize_t nrows, ncols, i, j
+    cdef bint matrix = (t == t_MAT)
+
+    if t == t_VECSMALL:
+        a = numpy.asarray(memoryview(z))
+        if dtype is not None:
+            dtype = numpy.dtype(dtype)
+            if dtype.kind in "iu":
+                return int_array_astype(a, dtype)
+            a = a.astype(dtype, copy=False)
+        return a
+
+    if t == t_VEC or t == t_COL:
+        nrows = 1
+        ncols = lg(g) - 1
+    elif matrix:
+        ncols = lg(g) - 1
+        nrows = lg(gel(g, 1)) - 1 if ncols else 0
+        if ncols and typ(gel(g, 1)) == t_VECSMALL:
+            sig_on()
+            z = new_gen(zm_to_ZM(g))
+            g = z.g
+    else:
+        raise TypeError(f"cannot convert PARI object of type {z.type()} to a NumPy array")
+
+    cdef int kind
+    if dtype is None:
+        kind = ENTRY_INT
+        for j in range(ncols):
+            for i in range(nrows):
+                kind = max(kind, entry_kind(gcoeff(g, i+1, j+1) if matrix else gel(g, j+1)))
+                if kind == ENTRY_OBJECT:
+                    break
+            if kind == ENTRY_OBJECT:
+                break
+    else:
+        dtype = numpy.dtype(dtype)
+        if dtype.kind in "iu":
+            kind = ENTRY_INT
+        elif dtype.kind == "f":
+            kind = ENTRY_REAL
+        elif dtype.kind == "c":
+            kind = ENTRY_COMPLEX
+        else:
+            kind = ENTRY_OBJECT
+
+    cdef GEN x
+    cdef double re, im
+    cdef int64_t[:, ::1] ints
+    cdef double[:, ::1] reals
+    cdef double complex[:, ::1] complexes
+    if kind == ENTRY_INT:
+        a = numpy.empty((nrows, ncols), dtype=numpy.int64)
+        ints = a
+        for j in range(ncols):
+            for i in range(nrows):
+                x = gcoeff(g, i+1, j+1) if matrix else gel(g, j+1)
+                if typ(x) != t_INT:
+                    tname = to_string(type_name(typ(x)))
+                    raise TypeError(f"cannot convert PARI object of type {tname} to an integer")
+                if is_bigint(x):
+                    raise OverflowError("PARI integer too large to convert to C long")
+                ints[i, j] = itos(x)
+    elif kind == ENTRY_REAL:
+        a = numpy.empty((nrows, ncols), dtype=numpy.float64)
+        reals = a
+        sig_on()
+        for j in range(ncols):
+            for i in range(nrows):
+                x = gcoeff(g, i+1, j+1) if matrix else gel(g, j+1)
+                reals[i, j] = gtodouble(x)
+        sig_off()
+    elif kind == ENTRY_COMPLEX:
+        a = numpy.empty((nrows, ncols), dtype=numpy.complex128)
+        complexes = a
+        sig_on()
+        for j in range(ncols):
+            for i in range(nrows):
+                x = gcoeff(g, i+1, j+1) if matrix else gel(g, j+1)
+                if typ(x) == t_COMPLEX:
+                    re = gtodouble(gel(x, 1))
+                    im = gtodouble(gel(x, 2))
+                else:
+                    re = gtodouble(x)
+                    im = 0
+                complexes[i, j] = re + im * 1j
+        sig_off()
+    else:
+        a = numpy.empty((nrows, ncols), dtype=object)
+        for j in range(ncols):
+            for i in range(nrows):
+                x = gcoeff(g, i+1, j+1) if matrix else gel(g, j+1)
+                a[i, j] = PyObject_FromGEN(x)
+
+    if not matrix:
+        a = a[0]
+    if dtype is not None:
+        if kind == ENTRY_INT:
+            return int_array_astype(a, dtype)
+        a = a.astype(dtype, copy=False)
+    return a
+
+
 cdef PyObject_FromGEN(GEN g):
+    return GEN_to_python(g, RATIONAL_FRACTION, REAL_FLOAT, False)
+
+
+cdef object Fraction_from_coprime = None
+
+cdef Fraction_new(num, den):
+    """
+    Return the ``Fraction`` ``num/den`` for coprime ``num`` and positive
+    ``den``, avoiding a gcd computation if possible.
+    """
+    global Fraction_from_coprime
+    if Fraction_from_coprime is None:
+        from fractions import Fraction
+        try:
+            Fraction_from_coprime = Fraction._from_coprime_ints
+        except AttributeError:
+            Fraction_from_coprime = Fraction
+    return Fraction_from_coprime(num, den)
+
+
+cdef scalar_to_python(GEN g, int rationals, int reals):
+    """
+    Convert a PARI object which is not a vector or matrix.
+    """
     cdef long t = typ(g)
-    cdef Py_ssize_t i, j
-    cdef Py_ssize_t lr, lc
+    cdef long e, n, d
+    cdef GEN m
 
     if t == t_INT:
         return PyInt_FromGEN(g)
     elif t == t_FRAC:
-        from fractions import Fraction
+        if rationals == RATIONAL_FLOAT:
+            if lgefint(gel(g, 1)) <= 3 and lgefint(gel(g, 2)) <= 3:
+                if not is_bigint(gel(g, 1)) and not is_bigint(gel(g, 2)):
+                    n = itos(gel(g, 1))
+                    d = itos(gel(g, 2))
+                    # Exact conversion to double, correctly rounded quotient
+                    if -(1L << 53) <= n <= (1L << 53) and d <= (1L << 53):
+                        return (<double>n) / (<double>d)
+            return PyInt_FromGEN(gel(g, 1)) / PyInt_FromGEN(gel(g, 2))
         num = PyInt_FromGEN(gel(g, 1))
         den = PyInt_FromGEN(gel(g, 2))
-        return Fraction(num, den)
+        if rationals == RATIONAL_TUPLE:
+            return (num, den)
+        return Fraction_new(num, den)
     elif t == t_REAL:
+        if reals == REAL_EXACT:
+            if not signe(g):
+                return (0, expo(g))
+            sig_on()
+            m = mantissa2nr(g, 0)
+            e = vali(m)
+            m = shifti(m, -e)
+            e += expo(g) - bit_prec(g) + 1
+            res = (PyInt_FromGEN(m), e)
+            reset_avma()
+            sig_off()
+            return res
         return rtodbl(g)
     elif t == t_COMPLEX:
-        re = PyObject_FromGEN(gel(g, 1))
-        im = PyObject_FromGEN(gel(g, 2))
+        re = scalar_to_python(gel(g, 1), RATIONAL_FRACTION, REAL_FLOAT)
+        im = scalar_to_python(gel(g, 2), RATIONAL_FRACTION, REAL_FLOAT)
         return complex(re, im)
-    elif t == t_VEC or t == t_COL:
-        return [PyObject_FromGEN(gel(g, i)) for i in range(1, lg(g))]
     elif t == t_VECSMALL:
         return [g[i] for i in range(1, lg(g))]
-    elif t == t_MAT:
-        lc = lg(g)
-        if lc <= 1:
-            return [[]]
-        lr = lg(gel(g, 1))
-        return [[PyObject_FromGEN(gcoeff(g, i, j)) for j in range(1, lc)]
-                for i in range(1, lr)]
     elif t == t_INFINITY:
         if inf_get_sign(g) >= 0:
             return INFINITY
@@ -343,6 +653,134 @@ cdef PyObject_FromGEN(GEN g):
         raise NotImplementedError(f"conversion not implemented for {tname}")
 
 
+cdef list small_vector_to_python(GEN g):
+    """
+    Convert a ``t_VEC`` or ``t_COL`` to a list of Python integers if all
+    entries are word-size ``t_INT``. Otherwise, return ``None``.
+    """
+    cdef Py_ssize_t i, n = lg(g) - 1
+    cdef GEN x
+    for i in range(1, n + 1):
+        x = gel(g, i)
+        if typ(x) != t_INT or is_bigint(x):
+            return None
+    cdef list L = PyList_New(n)
+    for i in range(n):
+        v = PyLong_FromLong(itos(gel(g, i + 1)))
+        Py_INCREF(v)
+        PyList_SET_ITEM(L, i, v)
+    return L
+
+
+# A pending vector or matrix in GEN_to_python()
+cdef struct conversion_frame:
+    GEN g           # the vector or matrix
+    Py_ssize_t i    # index of the next entry to convert
+    Py_ssize_t n    # number of entries
+    Py_ssize_t nrows
+
+
+cdef inline bint is_container(GEN g) noexcept:
+    cdef long t = typ(g)
+    return t == t_VEC or t == t_COL or t == t_MAT
+
+
+cdef new_container(GEN g, bint columns):
+    """
+    Return the Python list for the vector or matrix ``g``, filled with
+    ``None``. For a vector of word-size integers, return the converted
+    list as a tuple ``(list,)``.
+    """
+    cdef Py_ssize_t nrows, ncols
+    if typ(g) != t_MAT:
+        L = small_vector_to_python(g)
+        if L is not None:
+            return (L,)
+        return [None] * (lg(g) - 1)
+    ncols = lg(g) - 1
+    if ncols == 0:
+        return [] if columns else [[]]
+    nrows = lg(gel(g, 1)) - 1
+    if columns:
+        return [[None] * nrows for _ in range(ncols)]
+    return [[None] * ncols for _ in range(nrows)]
+
+
+cdef GEN_to_python(GEN g, int rationals, int reals, bint columns):
+    """
+    Convert ``g`` to Python, see :func:`gen_to_python`.
+
+    Vectors and matrices are converted using an explicit stack of
+    pending containers instead of recursion.
+    """
+    if not is_container(g):
+        return scalar_to_python(g, rationals, reals)
+    res = new_container(g, columns)
+    if type(res) is tuple:
+        return (<tuple>res)[0]
+    root = res
+
+    # Stack of frames with the corresponding output lists
+    cdef conversion_frame* stack = NULL
+    cdef Py_ssize_t depth = 0, size = 0
+    cdef list outputs = []
+    cdef conversion_frame* f
+    cdef Py_ssize_t i, j
+    cdef GEN x
+    try:
+        while True:
+            if g is not NULL:
+                # Push g with output list res
+                if depth == size:
+                    size = 2 * size + 16
+                    stack = <conversion_frame*>check_reallocarray(stack, size, sizeof(conversion_frame))
+                f = &stack[depth]
+                f.g = g
+                f.i = 0
+                if typ(g) == t_MAT:
+                    f.nrows = lg(gel(g, 1)) - 1 if lg(g) > 1 else 0
+                    f.n = f.nrows * (lg(g) - 1)
+                else:
+                    f.nrows = 1
+                    f.n = lg(g) - 1
+                outputs.append(res)
+                depth += 1
+                g = NULL
+
+            f = &stack[depth - 1]
+            if f.i == f.n:
+                depth -= 1
+                outputs.pop()
+                if not depth:
+                    return root
+                continue
+
+            # Entry (i, j) of a matrix, entry j of a vector
+            i = f.i % f.nrows
+            j = f.i // f.nrows
+            f.i += 1
+            x = gcoeff(f.g, i + 1, j + 1) if typ(f.g) == t_MAT else gel(f.g, j + 1)
+            if is_container(x):
+                item = new_container(x, columns)
+                if type(item) is tuple:
+                    item = (<tuple>item)[0]
+                else:
+                    g = x
+                    res = item
+            else:
+                item = scalar_to_python(x, rationals, reals)
+
+            out = outputs[depth - 1]
+            if typ(f.g) != t_MAT:
+                (<list>out)[j] = item
+            elif columns:
+                (<list>(<list>out)[j])[i] = item
+            else:
+                (<list>(<list>out)[i])[j] = item
+    finally:
+        sig_free(stack)
+
+
 cdef PyInt_FromGEN(GEN g):
     # First convert the input to a t_INT
     try:
@@ -534,6 +972,159 @@ cdef GEN PyLong_AS_GEN(py_long x) noexcept:
     return g
 
 
+cdef class ParseCache:
+    r"""
+    A cache of the compiled code of the strings evaluated by
+    ``pari(s)``.
+
+    Evaluating a string requires parsing and compiling it to PARI
+    bytecode. With the cache, the bytecode of the ``maxsize`` most
+    recently evaluated strings is kept and only evaluated again.
+
+    The bytecode depends on the meaning of the identifiers when the
+    string was compiled. For example, if ``f`` is not defined when
+    ``pari("f(2)")`` is evaluated, it is compiled as a call of a user
+    function. If ``f`` is then defined by :meth:`Pari.install`, the
+    cached code remains a call of a user function. Call :meth:`clear`
+    after such changes.
+
+    The cache is enabled with :meth:`Pari.set_parse_cache`.
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> pari = Pari()
+    >>> pari.set_parse_cache(2)
+    >>> cache = pari.get_parse_cache()
+    >>> cache
+    <ParseCache with 0 of 2 entries>
+    >>> pari("2 + 2"), pari("2 + 2"), pari("2 + 3"), pari("2 + 2")
+    (4, 4, 5, 4)
+    >>> pari("[1, 2]")
+    [1, 2]
+    >>> cache.stats()
+    {'hits': 2, 'misses': 3, 'entries': 2, 'maxsize': 2}
+    >>> pari("2 + 3")
+    5
+    >>> cache.stats()
+    {'hits': 2, 'misses': 4, 'entries': 2, 'maxsize': 2}
+
+    The results do not share memory with the cached code:
+
+    >>> v = pari("[1, 2]")
+    >>> v[0] = 5
+    >>> pari("[1, 2]")
+    [1, 2]
+
+    Strings are evaluated at the current precision and in the current
+    context:
+
+    >>> pari("Pi")
+    3.14159265358979
+    >>> pari.set_real_precision(30)
+    15
+    >>> pari("Pi")
+    3.14159265358979323846264338328
+    >>> pari.set_real_precision(15)
+    30
+    >>> pari("cached_var = 1"); pari("cached_var += 1"); pari("cached_var += 1")
+    1
+    2
+    3
+    >>> pari("")
+    >>> pari("1 +")
+    Traceback (most recent call last):
+    ...
+    PariError: syntax error, unexpected end of file
+    >>> cache.clear()
+    >>> len(cache)
+    0
+    >>> pari.set_parse_cache(0)
+    >>> pari.get_parse_cache() is None
+    True
+    """
+    cdef readonly size_t maxsize
+    cdef readonly size_t hits
+    cdef readonly size_t misses
+    # Compiled code (a t_CLOSURE on the PARI heap) by string, in the
+    # order in which they were used
+    cdef dict entries
+
+    def __init__(self, size_t maxsize):
+        self.maxsize = maxsize
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"<ParseCache with {len(self.entries)} of {self.maxsize} entries>"
+
+    def clear(self):
+        r"""
+        Remove all entries (but keep the statistics).
+        """
+        self.entries.clear()
+
+    def stats(self):
+        r"""
+        Return a dict with the number of hits and misses and the number
+        of entries.
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self.entries), "maxsize": self.maxsize}
+
+    cdef GEN eval(self, bytes s) except NULL:
+        r"""
+        Evaluate the string ``s`` like ``gp_read_str()`` and return the
+        result on the PARI stack (outside ``sig_on()``).
+        """
+        cdef GEN g
+        cdef char* t
+        code = self.entries.pop(s, None)
+        if code is None:
+            self.misses += 1
+            sig_on()
+            t = gp_filter(s)
+            if t[0] == c'\0' or t[0] == c'?' or t[0] == c'#' or t[0] == c'\\':
+                # Meta-commands are not compiled
+                g = gp_read_str(s)
+                sig_off()
+                return g
+            code = clone_gen(pari_compile_str(t))
+            while len(self.entries) >= self.maxsize:
+                # Remove the least recently used entry
+                del self.entries[next(iter(self.entries))]
+        else:
+            self.hits += 1
+        # Move the entry to the end (most recently used)
+        self.entries[s] = code
+
+        # The result may point to constants in the code, so copy it
+        sig_on()
+        cdef pari_sp av = avma
+        g = closure_evalres((<Gen>code).g)
+        if is_universal_constant(g):
+            set_avma(av)
+        else:
+            g = gerepilecopy(av, g)
+        sig_off()
+        return g
+
+
+# The ParseCache used by PyObject_AsGEN(), see Pari.set_parse_cache()
+cdef ParseCache parse_cache = None
+
+
+cdef set_parse_cache(size_t maxsize):
+    global parse_cache
+    parse_cache = ParseCache(maxsize) if maxsize else None
+
+
+cdef get_parse_cache():
+    return parse_cache
+
+
 cdef GEN PyObject_AsGEN(x) except? NULL:
     """
     Convert basic Python types to a PARI GEN.
@@ -542,6 +1133,8 @@ cdef GEN PyObject_AsGEN(x) except? NULL:
     if isinstance(x, unicode):
         x = to_bytes(x)
     if isinstance(x, bytes):
+        if parse_cache is not None:
+            return parse_cache.eval(<bytes>x)
         sig_on()
         g = gp_read_str(<bytes>x)
         sig_off()
@@ -557,9 +1150,538 @@ cdef GEN PyObject_AsGEN(x) except? NULL:
         sig_on()
         g = PyComplex_AS_GEN(x)
         sig_off()
+    elif PyObject_CheckBuffer(x):
+        g = PyBuffer_AsGEN(x, False, False)
     return g
 
 
+# Kinds of items in a buffer for PyBuffer_AsGEN()
+cdef enum:
+    BUFFER_UNSUPPORTED
+    BUFFER_SIGNED
+    BUFFER_UNSIGNED
+    BUFFER_FLOAT
+    BUFFER_COMPLEX
+
+import sys
+cdef char native_byteorder = b'<' if sys.byteorder == "little" else b'>'
+
+
+cdef int buffer_kind(const char* fmt, Py_ssize_t itemsize) noexcept:
+    """
+    Return the kind of items of a buffer with struct format ``fmt``.
+    """
+    if fmt is NULL:
+        return BUFFER_UNSIGNED if itemsize == 1 else BUFFER_UNSUPPORTED
+    if fmt[0] == b'@' or fmt[0] == b'=' or fmt[0] == native_byteorder:
+        fmt += 1
+    cdef int kind
+    if fmt[0] == b'Z':
+        kind = BUFFER_COMPLEX
+        fmt += 1
+        itemsize //= 2
+    elif fmt[0] in b"bhilqn":
+        kind = BUFFER_SIGNED
+    elif fmt[0] in b"?BHILQN":
+        kind = BUFFER_UNSIGNED
+    else:
+        kind = BUFFER_FLOAT
+    if fmt[0] == 0 or fmt[1] != 0:
+        return BUFFER_UNSUPPORTED
+    if kind == BUFFER_SIGNED or kind == BUFFER_UNSIGNED:
+        if itemsize == 1 or itemsize == 2 or itemsize == 4 or itemsize == 8:
+            return kind
+    elif fmt[0] == b'f' and itemsize == sizeof(float):
+        return kind
+    elif fmt[0] == b'd' and itemsize == sizeof(double):
+        return kind
+    return BUFFER_UNSUPPORTED
+
+
+cdef inline long long buffer_signed(const char* p, Py_ssize_t itemsize) noexcept:
+    if itemsize == 1:
+        return (<const signed char*>p)[0]
+    elif itemsize == 2:
+        return (<const short*>p)[0]
+    elif itemsize == 4:
+        return (<const int*>p)[0]
+    return (<const long long*>p)[0]
+
+
+cdef inline unsigned long long buffer_unsigned(const char* p, Py_ssize_t itemsize) noexcept:
+    if itemsize == 1:
+        return (<const unsigned char*>p)[0]
+    elif itemsize == 2:
+        return (<const unsigned short*>p)[0]
+    elif itemsize == 4:
+        return (<const unsigned int*>p)[0]
+    return (<const unsigned long long*>p)[0]
+
+
+cdef GEN buffer_item(const char* p, int kind, Py_ssize_t itemsize) noexcept:
+    """
+    Convert one item of a buffer to a PARI ``t_INT``, ``t_REAL`` or
+    ``t_COMPLEX``.
+    """
+    cdef long long v
+    cdef unsigned long long u
+    cdef GEN g
+    if kind == BUFFER_SIGNED:
+        v = buffer_signed(p, itemsize)
+        if LONG_MIN <= v <= LONG_MAX:
+            return stoi(<long>v)
+        # Only reached if long is smaller than long long
+        u = (0ULL - <unsigned long long>v) if v < 0 else <unsigned long long>v
+        g = uutoi(<ulong>(u >> 32), <ulong>(u & 0xffffffffULL))
+        return negi(g) if v < 0 else g
+    elif kind == BUFFER_UNSIGNED:
+        u = buffer_unsigned(p, itemsize)
+        if u <= ULONG_MAX:
+            return utoi(<ulong>u)
+        return uutoi(<ulong>(u >> 32), <ulong>(u & 0xffffffffULL))
+    elif kind == BUFFER_FLOAT:
+        if itemsize == sizeof(float):
+            return double_to_REAL((<const float*>p)[0])
+        return double_to_REAL((<const double*>p)[0])
+    else:
+        if itemsize == 2 * sizeof(float):
+            return doubles_to_COMPLEX((<const float*>p)[0], (<const float*>p)[1])
+        return doubles_to_COMPLEX((<const double*>p)[0], (<const double*>p)[1])
+
+
+cdef GEN buffer_to_vec(const char* p, Py_buffer* view, int dim, int kind, bint vecsmall) noexcept:
+    """
+    Convert the items of ``view`` starting at ``p`` along dimensions
+    ``dim`` and higher to nested ``t_VEC`` (or a ``t_VECSMALL`` if
+    ``vecsmall`` is set). Return ``NULL`` if an item does not fit in a
+    ``t_VECSMALL``.
+    """
+    cdef Py_ssize_t i, n = view.shape[dim], stride = view.strides[dim]
+    cdef long long v
+    cdef unsigned long long u
+    cdef GEN x
+    if vecsmall:
+        x = cgetg(n + 1, t_VECSMALL)
+        for i in range(n):
+            if kind == BUFFER_SIGNED:
+                v = buffer_signed(p + i * stride, view.itemsize)
+                if not (LONG_MIN <= v <= LONG_MAX):
+                    return NULL
+                x[i + 1] = <long>v
+            else:
+                u = buffer_unsigned(p + i * stride, view.itemsize)
+                if u > <unsigned long long>LONG_MAX:
+                    return NULL
+                x[i + 1] = <long>u
+        return x
+    x = cgetg(n + 1, t_VEC)
+    for i in range(n):
+        if dim == view.ndim - 1:
+            set_gel(x, i + 1, buffer_item(p + i * stride, kind, view.itemsize))
+        else:
+            set_gel(x, i + 1, buffer_to_vec(p + i * stride, view, dim + 1, kind, False))
+    return x
+
+
+cdef GEN buffer_to_mat(const char* p, Py_buffer* view, int kind) noexcept:
+    """
+    Convert a 2-dimensional buffer to a ``t_MAT``.
+    """
+    cdef Py_ssize_t i, j
+    cdef Py_ssize_t nrows = view.shape[0], ncols = view.shape[1]
+    cdef GEN x = cgetg(ncols + 1, t_MAT)
+    cdef GEN c
+    for j in range(ncols):
+        c = cgetg(nrows + 1, t_COL)
+        for i in range(nrows):
+            set_gel(c, i + 1, buffer_item(p + i * view.strides[0] + j * view.strides[1],
+                                          kind, view.itemsize))
+        set_gel(x, j + 1, c)
+    return x
+
+
+cdef GEN PyBuffer_AsGEN(x, bint matrix, bint vecsmall) except? NULL:
+    """
+    Convert an object supporting the buffer protocol with integer,
+    floating-point or complex items to a PARI GEN in a single pass
+    over the buffer. Return ``NULL`` if the buffer is not supported.
+
+    Items are converted to ``t_INT``, ``t_REAL`` or ``t_COMPLEX``.
+    A 0-dimensional buffer is converted to a single item and a
+    1-dimensional buffer to a ``t_VEC``, or a ``t_VECSMALL`` if
+    ``vecsmall`` is set. If ``matrix`` is set, a 2-dimensional buffer
+    is converted to a ``t_MAT``. Otherwise, buffers of dimension 2 or
+    higher are converted to nested ``t_VEC``, like a list of lists.
+    """
+    cdef Py_buffer view
+    cdef bint strict = matrix or vecsmall
+    try:
+        PyObject_GetBuffer(x, &view, PyBUF_STRIDES | PyBUF_FORMAT)
+    except BufferError:
+        if strict:
+            raise
+        return NULL
+
+    cdef GEN g = NULL
+    cdef int kind
+    try:
+        kind = buffer_kind(view.format, view.itemsize)
+        if kind == BUFFER_UNSUPPORTED:
+            if strict:
+                fmt = "" if view.format is NULL else view.format.decode()
+                raise TypeError(f"unsupported buffer format {fmt!r}")
+            return NULL
+        if vecsmall and (view.ndim != 1 or kind == BUFFER_FLOAT or kind == BUFFER_COMPLEX):
+            raise TypeError("conversion to t_VECSMALL requires a 1-dimensional array of integers")
+        if matrix and view.ndim > 2:
+            raise ValueError(f"cannot convert {view.ndim}-dimensional array to a PARI matrix")
+
+        sig_on()
+        if view.ndim == 0:
+            g = buffer_item(<const char*>view.buf, kind, view.itemsize)
+        elif matrix and view.ndim == 2:
+            g = buffer_to_mat(<const char*>view.buf, &view, kind)
+        else:
+            g = buffer_to_vec(<const char*>view.buf, &view, 0, kind, vecsmall)
+        sig_off()
+        if g is NULL:
+            reset_avma()
+            raise OverflowError("value too large to convert to t_VECSMALL")
+    finally:
+        PyBuffer_Release(&view)
+    return g
+
+
+########################################################################
+# Binary serialization
+########################################################################
+
+# The binary format of a PARI object consists of
+#
+# - a header of 8 bytes: the magic bytes b"PGEN", the format version,
+#   sizeof(long), the byte order (b"<" or b">") and the number n of
+#   variables
+# - 3 + n words (C longs): the PARI version code, the size L in words
+#   of the data, the offset in words of the root of the object in the
+#   data (or -1 for the object 0), the n variable numbers
+# - L words of data, as produced by copy_bin_canon(), where each
+#   pointer p is replaced by the offset in bytes of p[1] from the start
+#   of the data (such that no pointer becomes 0)
+# - the n variable names, each terminated by a NUL byte
+#
+# This is the format used by PARI's writebin(), wrapped such that it
+# can be stored in a bytes object. Unlike writebin(), no addresses of
+# the current process are stored, so the result is deterministic.
+
+cdef enum:
+    BINARY_VERSION = 2
+    BINARY_HEADER = 8
+    BINARY_WORDS = 3
+
+cdef extern from *:
+    const long lontyp[]
+    GEN list_data(GEN x)
+    long varn(GEN x)
+
+
+cdef bint has_closure(GEN x) noexcept:
+    """
+    Return whether ``x`` contains a ``t_CLOSURE``, which cannot be
+    serialized since it refers to the functions of the current session.
+    """
+    cdef long i, t = typ(x)
+    if t == t_CLOSURE:
+        return True
+    if t == t_LIST:
+        x = list_data(x)
+        if x is NULL:
+            return False
+        t = typ(x)
+    if not is_recursive_t(t):
+        return False
+    for i in range(lontyp[t], lg(x)):
+        if has_closure(gel(x, i)):
+            return True
+    return False
+
+
+cdef void relocate_bin(GEN y, GEN start, GEN base) noexcept:
+    """
+    Replace the pointers in ``y``, which is part of a copy at ``start``
+    of the data of a ``GENbin`` with base ``base``, by offsets relative
+    to the start of the data.
+    """
+    cdef long i, t = typ(y)
+    cdef GEN z
+    if t == t_LIST:
+        if list_data(y) is NULL:
+            return
+    elif not is_recursive_t(t):
+        return
+    for i in range(lontyp[t], lg(y)):
+        if y[i]:
+            z = <GEN>y[i]
+            y[i] = (z - base + 1) * sizeof(long)
+            relocate_bin(start + (z - base), start, base)
+
+
+cdef long get_user_var(const char* s) noexcept:
+    """
+    Return the number of the variable named ``s``, creating it if
+    needed, or -1 if ``s`` is the name of something which is not a
+    variable (such as a built-in or user-defined function).
+
+    This must be called inside ``sig_on()``.
+    """
+    cdef entree* ep = is_entry(s)
+    cdef long v
+    if ep is NULL or EpVALENCE(ep) == EpNEW:
+        return fetch_user_var(s)
+    if EpVALENCE(ep) != EpVAR:
+        return -1
+    # A user-defined function is an EpVAR entry which is not a variable
+    v = varn(<GEN>initial_value(ep))
+    if varentries[v] != ep:
+        return -1
+    return v
+
+
+cpdef bytes gen_to_bytes(Gen x):
+    r"""
+    Serialize the PARI object ``x`` to a compact binary representation,
+    which can be converted back using :func:`gen_from_bytes`.
+
+    The result does not depend on the PARI stack or on the precision
+    defaults. It can be read by processes using the same word size,
+    byte order and PARI version. Variables are identified by their
+    name.
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> from cypari2.convert import gen_to_bytes, gen_from_bytes
+    >>> pari = Pari()
+    >>> s = gen_to_bytes(pari(2)**1000)
+    >>> len(s) < len(str(2**1000))
+    True
+    >>> gen_from_bytes(s) == 2**1000
+    True
+    >>> x = pari("[1.5, 1/3, x^2 + y, Mod(3, 7), \"abc\", List([1])]")
+    >>> gen_from_bytes(gen_to_bytes(x)) == x
+    True
+
+    The result only depends on the object:
+
+    >>> gen_to_bytes(x) == gen_to_bytes(pari(str(x)))
+    True
+    >>> gen_to_bytes(pari("(x) -> x + 1"))
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot serialize PARI object containing a closure
+    """
+    if has_closure(x.g):
+        raise ValueError("cannot serialize PARI object containing a closure")
+
+    cdef GEN vars
+    cdef Py_ssize_t i, nvars
+    cdef list names = []
+    cdef char* c
+    sig_on()
+    vars = variables_vecsmall(x.g)
+    sig_off()
+    nvars = lg(vars) - 1
+    if nvars > 255:
+        reset_avma()
+        raise ValueError("cannot serialize PARI object with more than 255 variables")
+    for i in range(1, nvars + 1):
+        sig_on()
+        # Use sig_block(), which is needed because GENtostr() uses
+        # malloc(), which is dangerous inside sig_on()
+        sig_block()
+        c = GENtostr(pol_x(vars[i]))
+        sig_unblock()
+        sig_off()
+        names.append(bytes(c) + b"\0")
+        pari_free(c)
+
+    cdef GENbin* p = NULL
+    cdef long* words
+    cdef bytes names_bytes = b"".join(names)
+    cdef Py_ssize_t nwords = BINARY_WORDS + nvars, size
+    sig_on()
+    p = copy_bin_canon(x.g)
+    sig_off()
+    try:
+        size = BINARY_HEADER + (nwords + <Py_ssize_t>p.len) * sizeof(long) + len(names_bytes)
+        res = PyBytes_FromStringAndSize(NULL, size)
+        buf = PyBytes_AS_STRING(res)
+        memcpy(buf, b"PGEN", 4)
+        buf[4] = BINARY_VERSION
+        buf[5] = sizeof(long)
+        buf[6] = native_byteorder
+        buf[7] = nvars
+        words = <long*>(buf + BINARY_HEADER)
+        words[0] = paricfg_version_code
+        words[1] = p.len
+        for i in range(nvars):
+            words[BINARY_WORDS + i] = vars[i + 1]
+        memcpy(words + nwords, GENbinbase(p), p.len * sizeof(long))
+        if p.x is NULL:
+            words[2] = -1
+        else:
+            words[2] = p.x - p.base
+            relocate_bin(words + nwords + words[2], words + nwords, p.base)
+        memcpy(<char*>(words + nwords + p.len), <char*>names_bytes, len(names_bytes))
+    finally:
+        pari_free(p)
+        reset_avma()
+    return res
+
+
+cpdef Gen gen_from_bytes(data):
+    r"""
+    Convert the binary representation ``data`` (a bytes-like object)
+    produced by :func:`gen_to_bytes` back to a PARI object.
+
+    If the variables of the object have a different number in the
+    current session (because variables were created in a different
+    order), they are substituted by the variables of the same name.
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> from cypari2.convert import gen_to_bytes, gen_from_bytes
+    >>> pari = Pari()
+    >>> x = pari("[a^2 + b, 3.5 * c]")
+    >>> s = gen_to_bytes(x)
+    >>> gen_from_bytes(memoryview(s)) == x
+    True
+    >>> gen_from_bytes(b"garbage")
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid binary data for a PARI object
+    >>> gen_from_bytes(s[:-1])
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid binary data for a PARI object
+    >>> [gen_from_bytes(gen_to_bytes(pari(c))) for c in (0, 1, -1)]
+    [0, 1, -1]
+
+    Data written by a different PARI version or with a corrupted header
+    is rejected:
+
+    >>> import struct
+    >>> t = bytearray(s)
+    >>> struct.pack_into("l", t, 8, 0)
+    >>> gen_from_bytes(t)
+    Traceback (most recent call last):
+    ...
+    ValueError: binary data for a PARI object was written by a different PARI version
+    >>> t = bytearray(s)
+    >>> struct.pack_into("l", t, 24, -2)
+    >>> gen_from_bytes(t)
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid binary data for a PARI object
+
+    Names which do not refer to a variable in the current session are
+    rejected:
+
+    >>> s = gen_to_bytes(pari("qq^2 + 1"))
+    >>> s.endswith(b"qq\0")
+    True
+    >>> gen_from_bytes(s[:-3] + b"sin\0")
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot convert binary data for a PARI object: 'sin' is not a variable
+    >>> _ = pari("ff(n) = n + 1")
+    >>> gen_from_bytes(s[:-3] + b"ff\0")
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot convert binary data for a PARI object: 'ff' is not a variable
+    >>> gen_from_bytes(s[:-3] + b"rr\0")
+    rr^2 + 1
+    """
+    cdef Py_buffer view
+    cdef GEN x
+    PyObject_GetBuffer(data, &view, PyBUF_SIMPLE)
+    try:
+        x = binary_to_GEN(<const char*>view.buf, view.len)
+    finally:
+        PyBuffer_Release(&view)
+    return new_gen(x)
+
+
+cdef GEN binary_to_GEN(const char* buf, Py_ssize_t size) except NULL:
+    """
+    Convert ``size`` bytes at ``buf``, in the format produced by
+    :func:`gen_to_bytes`, to a GEN on the PARI stack.
+
+    The data is copied directly to the PARI stack, so ``buf`` may point
+    to any memory (for example, a memory-mapped file) and it does not
+    need to be aligned.
+
+    This must be called without ``sig_on()``. The GEN is returned
+    inside a ``sig_on()`` block, so the caller must call ``new_gen()``
+    or ``clone_gen()``.
+    """
+    cdef long words[BINARY_WORDS]
+    cdef long vold[255]
+    cdef long vnew[255]
+    cdef const char* cnames[255]
+    cdef Py_ssize_t i, nvars, length, root
+    if (size < BINARY_HEADER + BINARY_WORDS * <Py_ssize_t>sizeof(long) or memcmp(buf, b"PGEN", 4)
+            or buf[5] != sizeof(long) or buf[6] != native_byteorder):
+        raise ValueError("invalid binary data for a PARI object")
+    if buf[4] != BINARY_VERSION:
+        raise ValueError(f"unsupported binary format version {buf[4]}")
+    nvars = <unsigned char>buf[7]
+    if size < BINARY_HEADER + (BINARY_WORDS + nvars) * <Py_ssize_t>sizeof(long):
+        raise ValueError("invalid binary data for a PARI object")
+    memcpy(words, buf + BINARY_HEADER, BINARY_WORDS * sizeof(long))
+    if words[0] != paricfg_version_code:
+        raise ValueError("binary data for a PARI object was written by a different PARI version")
+    memcpy(vold, buf + BINARY_HEADER + BINARY_WORDS * sizeof(long), nvars * sizeof(long))
+    length = words[1]
+    root = words[2]
+    buf += BINARY_HEADER + (BINARY_WORDS + nvars) * sizeof(long)
+    size -= BINARY_HEADER + (BINARY_WORDS + nvars) * sizeof(long)
+    if length < 0 or size < length * <Py_ssize_t>sizeof(long):
+        raise ValueError("invalid binary data for a PARI object")
+    # The root of the object must lie inside the data
+    if not (root == -1 or 0 <= root < length):
+        raise ValueError("invalid binary data for a PARI object")
+    names = (buf + length * sizeof(long))[:size - length * sizeof(long)].split(b"\0")
+    if len(names) != nvars + 1 or names[nvars] or not all(names[:nvars]):
+        raise ValueError("invalid binary data for a PARI object")
+    for i in range(nvars):
+        cnames[i] = names[i]
+
+    cdef GEN y, v, w
+    sig_on()
+    for i in range(nvars):
+        vnew[i] = get_user_var(cnames[i])
+        if vnew[i] < 0:
+            sig_off()
+            raise ValueError(f"cannot convert binary data for a PARI object: "
+                             f"{names[i].decode()!r} is not a variable")
+    if root == -1:
+        # copy_bin_canon() does not copy gen_0
+        return gen_0
+    # Same as bin_copy(), but without an intermediate GENbin
+    y = <GEN>memcpy(new_chunk(length), buf, length * sizeof(long))
+    shiftaddress_canon(y + root, <long>(y - 1))
+    y += root
+    if memcmp(vnew, vold, nvars * sizeof(long)):
+        v = cgetg(nvars + 1, t_VEC)
+        w = cgetg(nvars + 1, t_VEC)
+        for i in range(nvars):
+            set_gel(v, i + 1, pol_x(vold[i]))
+            set_gel(w, i + 1, pol_x(vnew[i]))
+        y = gsubstvec(y, v, w)
+    return y
+
+
 ####################################
 # Deprecated functions
 ####################################
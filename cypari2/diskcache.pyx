@@ -0,0 +1,257 @@
+"""
+Persistent cache of expensive PARI computations
+***********************************************
+
+Functions like ``bnfinit`` or ``mfinit`` can take a long time for
+large inputs. A :class:`DiskCache` stores their results in a directory,
+such that other processes (or later sessions) computing the same
+structure only need to read a file. It is enabled for the current
+process with :meth:`Pari.set_disk_cache`.
+
+The methods which use the cache are ``bnfinit``, ``ellinit``,
+``lfuninit``, ``mfinit`` and ``nfinit``, both as methods of
+:class:`Pari` and of :class:`Gen`. The functions actually cached are
+chosen when creating the :class:`DiskCache`.
+
+Every result is stored in one file, whose name is the SHA-256 digest
+of the function name, the arguments, the precision and the PARI
+version. The arguments are stored in the file too and are compared
+with :func:`gidentical` when reading it, such that objects which print
+the same (like real numbers of different precision) cannot be
+confused. Results containing closures are not cached.
+
+Files are written to a temporary file which is renamed atomically, so
+several processes can use the same directory. When the files use more
+than ``max_bytes`` bytes, the least recently used ones are removed.
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+from .paridecl cimport gidentical, paricfg_version
+from .gen cimport Gen, objtogen
+from .convert cimport gen_to_bytes, gen_from_bytes
+
+import hashlib
+import os
+import struct
+import tempfile
+
+
+cdef bytes MAGIC = b"PGDC"
+cdef header_format = struct.Struct("=4sQ")
+
+
+cdef class DiskCache:
+    r"""
+    A directory containing results of PARI functions.
+
+    INPUT:
+
+    - ``path`` -- the directory (created if needed)
+
+    - ``functions`` -- (default: all supported functions) an iterable
+      with the names of the functions to cache
+
+    - ``max_bytes`` -- (default: 1 GiB) the maximal size of the
+      cache files
+
+    Examples:
+
+    >>> import tempfile
+    >>> from cypari2 import Pari
+    >>> from cypari2.diskcache import DiskCache
+    >>> pari = Pari()
+    >>> cache = DiskCache(tempfile.mkdtemp(), functions=["nfinit", "bnfinit"])
+    >>> pari.set_disk_cache(cache)
+    >>> K = pari.bnfinit("y^2 + 23")
+    >>> K.bnf_get_cyc()
+    [3]
+    >>> cache.stats()
+    {'hits': 0, 'misses': 1, 'entries': 1, 'nbytes': ...}
+
+    The next call, in this or another process, reads the result:
+
+    >>> L = pari("y^2 + 23").bnfinit()
+    >>> L == K
+    True
+    >>> cache.hits
+    1
+
+    Other arguments or precisions give different entries:
+
+    >>> K = pari.bnfinit("y^2 + 23", precision=128)
+    >>> pari.nfinit("y^2 + 23")[2]
+    -23
+    >>> cache.stats()["entries"]
+    3
+
+    Functions which were not selected are not cached:
+
+    >>> E = pari.ellinit([0, 1])
+    >>> cache.stats()["entries"]
+    3
+
+    >>> cache.clear()
+    >>> cache.stats()["entries"]
+    0
+    >>> pari.set_disk_cache(None)
+    """
+    cdef readonly str path
+    cdef readonly frozenset functions
+    cdef readonly size_t max_bytes
+    cdef readonly size_t hits
+    cdef readonly size_t misses
+
+    def __init__(self, path, functions=("bnfinit", "ellinit", "lfuninit",
+                                        "mfinit", "nfinit"),
+                 size_t max_bytes=2**30):
+        self.path = os.fspath(path)
+        self.functions = frozenset(functions)
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def __repr__(self):
+        return f"<DiskCache in {self.path!r}>"
+
+    def key(self, function, tuple args, long precision):
+        r"""
+        Return the key used to store ``function(*args)`` or ``None``
+        if this call should not be cached.
+
+        This is called by the methods which support caching.
+        """
+        if function not in self.functions:
+            return None
+        # Python integers may be passed without conversion to Gen
+        argvec = objtogen([a for a in args if isinstance(a, (Gen, int))])
+        try:
+            argdata = gen_to_bytes(argvec)
+        except ValueError:
+            # Closures cannot be stored
+            return None
+        h = hashlib.sha256()
+        h.update(repr((function, args, precision, paricfg_version,
+                       sizeof(long))).encode())
+        digest = h.hexdigest()
+        filename = os.path.join(self.path, digest[:2], digest[2:])
+        return (filename, argvec, argdata)
+
+    def load(self, key):
+        r"""
+        Return the result stored for ``key`` or ``None``.
+        """
+        filename, argvec, argdata = key
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+            magic, n = header_format.unpack_from(data)
+            if magic != MAGIC:
+                raise ValueError
+            start = header_format.size
+            args = gen_from_bytes(data[start:start + n])
+            if not gidentical((<Gen>args).g, (<Gen>argvec).g):
+                # A different computation with the same digest
+                self.misses += 1
+                return None
+            res = gen_from_bytes(data[start + n:])
+        except (OSError, ValueError, struct.error):
+            # Missing, removed or corrupt file
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Mark the file as recently used
+            os.utime(filename)
+        except OSError:
+            pass
+        return res
+
+    def save(self, key, Gen value):
+        r"""
+        Store ``value`` as result for ``key``.
+        """
+        filename, argvec, argdata = key
+        try:
+            data = gen_to_bytes(value)
+        except ValueError:
+            return
+        directory = os.path.dirname(filename)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header_format.pack(MAGIC, len(argdata)))
+                f.write(argdata)
+                f.write(data)
+            os.replace(tmp, filename)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def entries(self):
+        r"""
+        Return a list of ``(mtime, size, filename)`` for all cache
+        files.
+        """
+        res = []
+        for d in os.scandir(self.path):
+            if not d.is_dir():
+                continue
+            for e in os.scandir(d.path):
+                if e.name.startswith("."):
+                    continue
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                res.append((st.st_mtime, st.st_size, e.path))
+        return res
+
+    def evict(self):
+        r"""
+        Remove the least recently used files until the cache uses at
+        most ``max_bytes`` bytes.
+        """
+        entries = self.entries()
+        cdef size_t nbytes = sum(e[1] for e in entries)
+        if nbytes <= self.max_bytes:
+            return
+        entries.sort()
+        for mtime, size, filename in entries:
+            try:
+                os.unlink(filename)
+            except OSError:
+                # Removed by another process
+                pass
+            nbytes -= size
+            if nbytes <= self.max_bytes:
+                break
+
+    def clear(self):
+        r"""
+        Remove all cache files.
+        """
+        for mtime, size, filename in self.entries():
+            try:
+                os.unlink(filename)
+            except OSError:
+                pass
+
+    def stats(self):
+        r"""
+        Return a dict with the number of hits and misses in this
+        process and the number of entries and bytes in the cache.
+        """
+        entries = self.entries()
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(entries), "nbytes": sum(e[1] for e in entries)}
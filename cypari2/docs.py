@@ -0,0 +1,99 @@
+"""
+Documentation of the auto-generated methods
+*******************************************
+
+The methods of :class:`Gen` and :class:`Pari` calling PARI library
+functions are generated from the PARI documentation. To keep the
+extension modules small and ``import cypari2`` fast, the documentation
+is not compiled into the modules: it is stored in the compressed file
+``auto_docs.json.gz``, which is only read when needed.
+
+In an interactive session (the Python prompt, IPython or Jupyter) and
+when building the documentation with Sphinx, the docstrings are
+installed when ``cypari2`` is imported. Otherwise, call
+:func:`install_docs` to make them available to ``help()``.
+
+Examples:
+
+>>> from cypari2 import Pari
+>>> from cypari2.docs import get_doc, install_docs
+>>> print(get_doc("gcd"))
+Creates the greatest common divisor of :math:`x` and :math:`y`...
+>>> get_doc("nonexistent") is None
+True
+>>> install_docs()
+>>> "greatest common divisor" in Pari().gcd.__doc__
+True
+>>> "greatest common divisor" in Pari()(12).gcd.__doc__
+True
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+import os
+import sys
+
+
+docs_filename = os.path.join(os.path.dirname(__file__), "auto_docs.json.gz")
+
+docs = None
+installed = False
+
+
+def get_docs():
+    r"""
+    Return a dict with the documentation of all auto-generated methods,
+    indexed by the name of the PARI function.
+    """
+    global docs
+    if docs is None:
+        # Imported here to keep "import cypari2" fast
+        import gzip
+        import json
+        try:
+            with gzip.open(docs_filename, "rt", encoding="utf-8") as f:
+                docs = json.load(f)
+        except OSError:
+            # Documentation not installed
+            docs = {}
+    return docs
+
+
+def get_doc(name):
+    r"""
+    Return the documentation of the PARI function ``name`` or ``None``.
+    """
+    return get_docs().get(name)
+
+
+def install_docs():
+    r"""
+    Set the docstrings of the auto-generated methods of :class:`Gen`
+    and :class:`Pari`.
+    """
+    global installed
+    if installed:
+        return
+    from .gen import Gen_base
+    from .pari_instance import Pari_auto
+    for cls in (Gen_base, Pari_auto):
+        for name, doc in get_docs().items():
+            f = cls.__dict__.get(name)
+            if f is not None and f.__doc__ is None:
+                f.__doc__ = doc
+    installed = True
+
+
+def is_interactive():
+    r"""
+    Return whether Python runs interactively or builds documentation,
+    in which case docstrings should be installed at import.
+    """
+    return (hasattr(sys, "ps1") or sys.flags.interactive or
+            "IPython" in sys.modules or "sphinx" in sys.modules)
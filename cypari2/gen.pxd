@@ -65,3 +65,8 @@ cdef inline Gen Gen_new(GEN g, GEN addr):
 
 cdef Gen list_of_Gens_to_Gen(list s)
 cpdef Gen objtogen(s)
+
+cdef set_factor_cache(size_t max_bytes)
+cdef get_factor_cache()
+cdef set_disk_cache(cache)
+cdef get_disk_cache()
@@ -58,6 +58,11 @@ AUTHORS:
 cimport cython
 
 from cpython.object cimport (Py_EQ, Py_NE, Py_LE, Py_GE, Py_LT, PyTypeObject)
+from cpython.buffer cimport PyBUF_WRITABLE, PyBUF_FORMAT
+from cpython.long cimport PyLong_AsLongAndOverflow
+from cpython.longintrepr cimport py_long
+from libc.limits cimport LONG_MIN
+from cpython.float cimport PyFloat_AS_DOUBLE
 
 from cysignals.memory cimport sig_free, check_malloc
 from cysignals.signals cimport sig_check, sig_on, sig_off, sig_block, sig_unblock
@@ -65,15 +70,22 @@ from cysignals.signals cimport sig_check, sig_on, sig_off, sig_block, sig_unbloc
 from .types cimport *
 from .string_utils cimport to_string, to_bytes
 from .paripriv cimport *
-from .convert cimport PyObject_AsGEN, gen_to_integer
+from .convert cimport (PyObject_AsGEN, PyInt_FromGEN, gen_to_integer,
+                       gen_to_bytes, double_to_REAL, PyLong_AS_GEN)
 from .pari_instance cimport DEFAULT_BITPREC, get_var
 from .stack cimport (new_gen, new_gens2, new_gen_noclear,
                      clone_gen, clear_stack, reset_avma,
-                     remove_from_pari_stack, move_gens_to_heap)
+                     remove_from_pari_stack, move_gens_to_heap,
+                     release_clone, count_clone_gen, own_borrowed_gen)
 from .closure cimport objtoclosure
+from .profiler cimport (profile_frame, profile_start, profile_stop,
+                        get_profiling_flag)
 
 from .paridecl cimport *
 
+# Tested by the auto-generated methods before calling profile_start()
+cdef bint* profiling_enabled = get_profiling_flag()
+
 include 'auto_gen.pxi'
 
 
@@ -140,6 +152,155 @@ cdef extern from *:
     GEN old_nfbasis(GEN x, GEN * y, GEN p)
 
 
+cdef extern from *:
+    """
+    /*
+     * Pool of recycled memory for Gen objects. Cython does not support
+     * freelists for subclasses like Gen, so we install custom tp_alloc
+     * and tp_free slots instead. Freed objects are kept (untracked by
+     * the garbage collector) and handed out again by tp_alloc.
+     */
+    #if CYTHON_COMPILING_IN_CPYTHON && CYTHON_USE_TYPE_SLOTS && !defined(Py_GIL_DISABLED)
+    #define GEN_POOL_SIZE 1024
+    static PyTypeObject* gen_pool_type;
+    static PyObject* gen_pool[GEN_POOL_SIZE];
+    static int gen_pool_len;
+
+    static PyObject* gen_pool_alloc(PyTypeObject* t, Py_ssize_t nitems)
+    {
+        if (t != gen_pool_type || !gen_pool_len)
+            return PyType_GenericAlloc(t, nitems);
+        PyObject* o = gen_pool[--gen_pool_len];
+        memset(o, 0, t->tp_basicsize);
+        PyObject_Init(o, t);
+        PyObject_GC_Track(o);
+        return o;
+    }
+
+    static void gen_pool_free(void* o)
+    {
+        if (Py_TYPE((PyObject*)o) != gen_pool_type || gen_pool_len >= GEN_POOL_SIZE)
+            PyObject_GC_Del(o);
+        else
+            gen_pool[gen_pool_len++] = (PyObject*)o;
+    }
+
+    static void gen_pool_install(PyTypeObject* t)
+    {
+        if (t->tp_alloc != PyType_GenericAlloc || t->tp_free != PyObject_GC_Del)
+            return;
+        gen_pool_type = t;
+        t->tp_alloc = gen_pool_alloc;
+        t->tp_free = gen_pool_free;
+    }
+    #else
+    static void gen_pool_install(PyTypeObject* t) { }
+    #endif
+    """
+    void gen_pool_install(PyTypeObject* t)
+
+
+# Fast paths for arithmetic and comparison with Python int and float
+# operands: integers which fit in a C long are handled by the PARI
+# kernels for mixed operands (like gaddgs()) and floats are converted
+# directly on the PARI stack. In both cases, no temporary Gen is needed.
+cdef enum:
+    OP_ADD
+    OP_SUB
+    OP_MUL
+    OP_DIV
+    OP_FLOORDIV
+    OP_MOD
+
+
+cdef inline bint small_int(x, long* n) noexcept:
+    """
+    If ``x`` is a Python ``int`` which fits in a C long, store its
+    value in ``n`` and return ``True``.
+
+    We exclude ``LONG_MIN`` since PARI kernels like ``gsubgs()`` negate
+    their argument.
+    """
+    cdef int overflow
+    if type(x) is not int:
+        return False
+    n[0] = PyLong_AsLongAndOverflow(x, &overflow)
+    return not overflow and n[0] != LONG_MIN
+
+
+cdef inline GEN binop_GEN(GEN x, GEN y, int op) noexcept:
+    if op == OP_ADD:
+        return gadd(x, y)
+    elif op == OP_SUB:
+        return gsub(x, y)
+    elif op == OP_MUL:
+        return gmul(x, y)
+    elif op == OP_DIV:
+        return gdiv(x, y)
+    elif op == OP_FLOORDIV:
+        return gdivent(x, y)
+    else:
+        return gmod(x, y)
+
+
+cdef binop_fast(left, right, int op):
+    """
+    Return ``left op right`` if one of the operands is a :class:`Gen`
+    and the other a Python ``int`` fitting in a C long or a ``float``.
+    Return ``None`` for other operands.
+
+    The mixed kernels are only used for integers, reals and rationals,
+    since for other types (like ``0 * O(x)``) their result may differ
+    from the generic functions.
+    """
+    cdef long n
+    cdef GEN x
+    if isinstance(left, Gen):
+        x = (<Gen>left).g
+        if small_int(right, &n):
+            sig_on()
+            if not (is_rational_t(typ(x)) or typ(x) == t_REAL):
+                return new_gen(binop_GEN(x, stoi(n), op))
+            elif op == OP_ADD:
+                return new_gen(gaddgs(x, n))
+            elif op == OP_SUB:
+                return new_gen(gsubgs(x, n))
+            elif op == OP_MUL:
+                return new_gen(gmulgs(x, n))
+            elif op == OP_DIV:
+                return new_gen(gdivgs(x, n))
+            elif op == OP_FLOORDIV:
+                return new_gen(gdiventgs(x, n))
+            else:
+                return new_gen(gmodgs(x, n))
+        if type(right) is float:
+            sig_on()
+            return new_gen(binop_GEN(x, double_to_REAL(PyFloat_AS_DOUBLE(right)), op))
+    elif isinstance(right, Gen):
+        x = (<Gen>right).g
+        if small_int(left, &n):
+            sig_on()
+            if not (is_rational_t(typ(x)) or typ(x) == t_REAL):
+                return new_gen(binop_GEN(stoi(n), x, op))
+            elif op == OP_ADD:
+                return new_gen(gaddsg(n, x))
+            elif op == OP_SUB:
+                return new_gen(gsubsg(n, x))
+            elif op == OP_MUL:
+                return new_gen(gmulsg(n, x))
+            elif op == OP_DIV:
+                return new_gen(gdivsg(n, x))
+            elif op == OP_FLOORDIV:
+                return new_gen(gdiventsg(n, x))
+            else:
+                return new_gen(gmodsg(n, x))
+        if type(left) is float:
+            sig_on()
+            return new_gen(binop_GEN(double_to_REAL(PyFloat_AS_DOUBLE(left)), x, op))
+    return None
+
+
+
 @cython.trashcan(True)
 cdef class Gen(Gen_base):
     """
@@ -160,7 +321,7 @@ cdef class Gen(Gen_base):
             remove_from_pari_stack(self)
         elif self.address is not NULL:
             # clone
-            gunclone_deep(self.address)
+            release_clone(self.address)
 
     cdef Gen new_ref(self, GEN g):
         """
@@ -198,6 +359,7 @@ cdef class Gen(Gen_base):
 
         if self.address is not NULL:
             gclone_refc(self.address)
+            count_clone_gen()
         return Gen_new(g, self.address)
 
     cdef GEN fixGEN(self) except NULL:
@@ -207,6 +369,9 @@ cdef class Gen(Gen_base):
         """
         if self.next is not None:
             move_gens_to_heap(self.sp())
+        elif self.address is NULL:
+            # Possibly a GEN borrowed by a fast closure
+            own_borrowed_gen(self)
         return self.g
 
     cdef GEN ref_target(self) except NULL:
@@ -476,6 +641,64 @@ cdef class Gen(Gen_base):
         s = repr(self)
         return (objtogen, (s,))
 
+    def __reduce_ex__(self, protocol):
+        """
+        Pickle ``self`` using the binary representation of
+        :func:`~cypari2.convert.gen_to_bytes`. With pickle protocol 5,
+        the data is passed as an out-of-band buffer if the pickler
+        supports it.
+
+        Objects containing closures are pickled using their string
+        representation, see :meth:`__reduce__`.
+
+        Examples:
+
+        >>> from cypari2 import Pari
+        >>> pari = Pari()
+        >>> import pickle
+
+        >>> x = pari("[2^200, 1.25, [1, 2; 3, 4], Mod(x, x^2 + 1)]")
+        >>> for proto in range(pickle.HIGHEST_PROTOCOL + 1):
+        ...     assert pickle.loads(pickle.dumps(x, proto)) == x
+        >>> len(pickle.dumps(pari(2)**10000)) < len(str(2**10000)) // 2
+        True
+
+        The precision of real numbers is preserved, regardless of the
+        current precision:
+
+        >>> y = pari("Pi").bitprecision(256)
+        >>> pari.set_real_precision(5)
+        15
+        >>> pickle.loads(pickle.dumps(y)).bitprecision()
+        256
+        >>> pari.set_real_precision(15)
+        5
+
+        Out-of-band buffers with protocol 5:
+
+        >>> buffers = []
+        >>> s = pickle.dumps(x, protocol=5, buffer_callback=buffers.append)
+        >>> len(buffers)
+        1
+        >>> pickle.loads(s, buffers=buffers) == x
+        True
+
+        Closures:
+
+        >>> f = pari("(x) -> x^2")
+        >>> pickle.loads(pickle.dumps(f))(3)
+        9
+        """
+        from .convert import gen_from_bytes
+        try:
+            data = gen_to_bytes(self)
+        except ValueError:
+            return self.__reduce__()
+        if protocol >= 5:
+            from pickle import PickleBuffer
+            data = PickleBuffer(data)
+        return (gen_from_bytes, (data,))
+
     def __add__(left, right):
         """
         Return ``left`` plus ``right``.
@@ -494,6 +717,9 @@ cdef class Gen(Gen_base):
         >>> -2 + pari(3)
         1
         """
+        res = binop_fast(left, right, OP_ADD)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -521,6 +747,9 @@ cdef class Gen(Gen_base):
         >>> -2 - pari(3)
         -5
         """
+        res = binop_fast(left, right, OP_SUB)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -531,6 +760,9 @@ cdef class Gen(Gen_base):
         return new_gen(gsub(t0.g, t1.g))
 
     def __mul__(left, right):
+        res = binop_fast(left, right, OP_MUL)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -561,6 +793,9 @@ cdef class Gen(Gen_base):
         >>> pari("x^2 + 2*x + 3") / pari("x")
         (x^2 + 2*x + 3)/x
         """
+        res = binop_fast(left, right, OP_DIV)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -580,6 +815,9 @@ cdef class Gen(Gen_base):
         >>> pari("x^2 + 2*x + 3") // pari("x")
         x + 2
         """
+        res = binop_fast(left, right, OP_FLOORDIV)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -607,6 +845,9 @@ cdef class Gen(Gen_base):
         >>> -2 % pari(3)
         1
         """
+        res = binop_fast(left, right, OP_MOD)
+        if res is not None:
+            return res
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -637,6 +878,10 @@ cdef class Gen(Gen_base):
         >>> pari(2) ** -5
         1/32
         """
+        cdef long n
+        if m is None and isinstance(left, Gen) and small_int(right, &n):
+            sig_on()
+            return new_gen(gpowgs((<Gen>left).g, n))
         cdef Gen t0, t1
         try:
             t0 = objtogen(left)
@@ -1617,6 +1862,10 @@ cdef class Gen(Gen_base):
         Traceback (most recent call last):
         ...
         PariError: forbidden comparison t_VEC (1 elts) , t_INT
+        >>> pari("[0]") <= 0
+        Traceback (most recent call last):
+        ...
+        PariError: forbidden comparison t_VEC (1 elts) , t_INT
 
         Tests:
 
@@ -1631,16 +1880,49 @@ cdef class Gen(Gen_base):
         True
         >>> pari('O(2)') == 0
         True
+
+        Python ``int`` and ``float`` operands are not converted to a
+        :class:`Gen`, but this gives the same result:
+
+        >>> pari(5) < 2**100, pari(2**100) > -2**63
+        (True, True)
+        >>> pari(2.5) > 2.0, pari("5/2") == 2.5, pari("x") == 0.0
+        (True, True, False)
         """
-        cdef Gen t1
-        try:
-            t1 = objtogen(right)
-        except Exception:
-            return NotImplemented
         cdef bint r
+        cdef int c
+        cdef long n
         cdef GEN x = self.g
-        cdef GEN y = t1.g
-        sig_on()
+        cdef GEN y
+        cdef Gen t1
+        # Like binop_fast(), only use the mixed kernels for integers,
+        # rationals and reals
+        if (is_rational_t(typ(x)) or typ(x) == t_REAL) and small_int(right, &n):
+            sig_on()
+            if op == Py_EQ or op == Py_NE:
+                r = (gequalgs(x, n) != 0) == (op == Py_EQ)
+            else:
+                c = gcmpgs(x, n)
+                if op == Py_LE:
+                    r = c <= 0
+                elif op == Py_GE:
+                    r = c >= 0
+                elif op == Py_LT:
+                    r = c < 0
+                else:  # Py_GT
+                    r = c > 0
+            sig_off()
+            return r
+        if type(right) is float:
+            sig_on()
+            y = double_to_REAL(PyFloat_AS_DOUBLE(right))
+        else:
+            try:
+                t1 = objtogen(right)
+            except Exception:
+                return NotImplemented
+            y = t1.g
+            sig_on()
         if op == Py_EQ:
             r = (gequal(x, y) != 0)
         elif op == Py_NE:
@@ -1653,7 +1935,7 @@ cdef class Gen(Gen_base):
             r = (gcmp(x, y) < 0)
         else:  # Py_GT
             r = (gcmp(x, y) > 0)
-        sig_off()
+        clear_stack()
         return r
 
     def cmp(self, right):
@@ -1932,11 +2214,12 @@ cdef class Gen(Gen_base):
             raise TypeError("Object (=%s) must be of type t_VEC or t_COL." % self)
         return [self[n] for n in range(glength(self.g))]
 
-    def python(self):
+    def python(self, **kwds):
         """
         Return the closest Python equivalent of the given PARI object.
 
-        See :func:`~sage.libs.cypari.convert.gen_to_python` for more informations.
+        See :func:`~cypari2.convert.gen_to_python` for more information
+        and the supported keyword arguments.
 
         Examples:
 
@@ -1947,9 +2230,116 @@ cdef class Gen(Gen_base):
         1.2
         >>> pari('389/17').python()
         Fraction(389, 17)
+        >>> pari('[389/17, 1.5]').python(rationals="tuple", reals="exact")
+        [(389, 17), (3, -1)]
         """
         from .convert import gen_to_python
-        return gen_to_python(self)
+        return gen_to_python(self, **kwds)
+
+    def to_numpy(self, dtype=None):
+        r"""
+        Convert this vector or matrix to a NumPy array.
+
+        See :func:`~cypari2.convert.gen_to_numpy` for more information.
+        """
+        from .convert import gen_to_numpy
+        return gen_to_numpy(self, dtype)
+
+    def view(self, Py_ssize_t cache=16):
+        r"""
+        Return a lazy :class:`GenView` of this vector, column, matrix
+        or ``t_VECSMALL``.
+
+        Unlike indexing ``self`` directly, indexing, slicing or
+        iterating a view does not move ``self`` to the PARI heap and
+        does not create a :class:`Gen` for every entry: integers are
+        returned as Python ``int``, vectors and matrices as views.
+        Other entries are returned as :class:`Gen`, of which at most
+        ``cache`` are kept by the view.
+
+        Examples:
+
+        >>> from cypari2 import Pari
+        >>> pari = Pari()
+        >>> v = pari("[1, [2, 3], x + 1, 1/2]")
+        >>> w = v.view()
+        >>> w
+        <view of [1, [2, 3], x + 1, 1/2]>
+        >>> w[0], type(w[0])
+        (1, <class 'int'>)
+        >>> w[1]
+        <view of [2, 3]>
+        >>> list(w[1])
+        [2, 3]
+        >>> w[2]
+        x + 1
+        >>> w[-1]
+        1/2
+        >>> pari(5).view()
+        Traceback (most recent call last):
+        ...
+        TypeError: cannot create a view of a PARI object of type t_INT
+
+        Views of arguments of fast closures work:
+
+        >>> from cypari2.closure import objtoclosure
+        >>> f = objtoclosure(lambda v: v.view()[0], fast=True)
+        >>> pari.apply(f, pari("[[1/3, 2], [x, 4]]"))
+        [1/3, x]
+        """
+        if not is_matvec_t(typ(self.g)) and typ(self.g) != t_VECSMALL:
+            raise TypeError(f"cannot create a view of a PARI object of type {self.type()}")
+        if cache < 0:
+            raise ValueError("cache size must be non-negative")
+        return GenView_new(self, (), self.g, cache)
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        r"""
+        Export the entries of a ``t_VECSMALL`` as a read-only buffer of
+        C longs, without copying. The object is moved to the PARI heap
+        first, so the memory stays valid while the buffer is used.
+
+        Examples:
+
+        >>> from cypari2 import Pari
+        >>> pari = Pari()
+        >>> v = pari([1, -2, 3]).Vecsmall()
+        >>> m = memoryview(v)
+        >>> m.tolist()
+        [1, -2, 3]
+        >>> m.readonly, m.itemsize, m.shape
+        (True, 8, (3,))
+        >>> memoryview(pari("Vecsmall([])")).tolist()
+        []
+        >>> memoryview(pari([1, 2]))
+        Traceback (most recent call last):
+        ...
+        BufferError: only PARI objects of type t_VECSMALL support the buffer protocol
+        """
+        if typ(self.g) != t_VECSMALL:
+            raise BufferError("only PARI objects of type t_VECSMALL support the buffer protocol")
+        if flags & PyBUF_WRITABLE:
+            raise BufferError("PARI objects are read-only")
+        cdef GEN g = self.fixGEN()
+        cdef Py_ssize_t* shape = <Py_ssize_t*>check_malloc(2 * sizeof(Py_ssize_t))
+        shape[0] = lg(g) - 1
+        shape[1] = sizeof(long)
+        buffer.buf = <void*>(g + 1)
+        buffer.obj = self
+        buffer.len = shape[0] * sizeof(long)
+        buffer.readonly = 1
+        buffer.itemsize = sizeof(long)
+        buffer.format = NULL
+        if flags & PyBUF_FORMAT:
+            buffer.format = "q" if sizeof(long) == 8 else "l"
+        buffer.ndim = 1
+        buffer.shape = shape
+        buffer.strides = shape + 1
+        buffer.suboffsets = NULL
+        buffer.internal = shape
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        sig_free(buffer.internal)
 
     def sage(self, locals=None):
         r"""
@@ -4064,10 +4454,12 @@ cdef class Gen(Gen_base):
         """
         cdef long t = typ(self.g)
         cdef Gen t0
-        cdef GEN result
+        cdef GEN result, w
         cdef long arity
         cdef long nargs = len(args)
         cdef long nkwds = len(kwds)
+        cdef long j
+        cdef list converted
 
         # Closure must be evaluated using *args
         if t == t_CLOSURE:
@@ -4076,9 +4468,19 @@ cdef class Gen(Gen_base):
             if closure_is_variadic(self.g):
                 arity = closure_arity(self.g) - 1
                 args = list(args[:arity]) + [0]*(arity-nargs) + [args[arity:]]
-            t0 = objtogen(args)
+                nargs = len(args)
+            # Python ints are converted inside sig_on()
+            converted = [a if type(a) is int else objtogen(a) for a in args]
             sig_on()
-            result = closure_callgenvec(self.g, t0.g)
+            reset_avma()
+            w = cgetg(nargs + 1, t_VEC)
+            for j in range(nargs):
+                a = converted[j]
+                if type(a) is int:
+                    set_gel(w, j + 1, PyLong_AS_GEN(<py_long>a))
+                else:
+                    set_gel(w, j + 1, (<Gen>a).g)
+            result = closure_callgenvec(self.g, w)
             if result is gnil:
                 clear_stack()
                 return None
@@ -4325,16 +4727,25 @@ cdef class Gen(Gen_base):
         cdef GEN g
         global factor_proven
         cdef int saved_factor_proven = factor_proven
+        cdef Gen fa
 
         try:
             if proof is not None:
                 factor_proven = 1 if proof else 0
+            if factor_cache is not None:
+                key = (hash(self), limit if limit >= 0 else -1, factor_proven)
+                fa = factor_cache.get(self, key)
+                if fa is not None:
+                    return fa
             sig_on()
             if limit >= 0:
                 g = boundfact(self.g, limit)
             else:
                 g = factor(self.g)
-            return new_gen(g)
+            fa = new_gen(g)
+            if factor_cache is not None:
+                factor_cache.put(self, key, fa)
+            return fa
         finally:
             factor_proven = saved_factor_proven
 
@@ -4638,6 +5049,391 @@ cdef int Gen_clear(self) except -1:
 
 (<PyTypeObject*>Gen).tp_clear = Gen_clear
 
+# Recycle the memory of deallocated Gen objects
+gen_pool_install(<PyTypeObject*>Gen)
+
+
+@cython.final
+cdef class GenView:
+    r"""
+    Lazy view of a PARI vector, column, matrix or ``t_VECSMALL``,
+    created by :meth:`Gen.view`.
+
+    A view refers to the memory of the :class:`Gen` it was created
+    from, which may stay on the PARI stack. Entries are converted when
+    they are accessed: entries of type ``t_INT`` or of a ``t_VECSMALL``
+    become Python ``int``, vectors and matrices become views and other
+    entries become :class:`Gen` (of which a bounded number is cached).
+
+    Like for :class:`Gen`, the entries of a matrix are its columns.
+    Unlike :class:`Gen`, views use Python semantics for negative indices
+    and slices.
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> pari = Pari()
+    >>> M = pari.matrix(2, 3, range(6)).view()
+    >>> len(M)
+    3
+    >>> M[1]
+    <view of [1, 4]~>
+    >>> M[1, 2], M[1][1]
+    (5, 4)
+    >>> M[::2].gen()
+    [0, 2; 3, 5]
+    >>> M.type(), M[0].type()
+    ('t_MAT', 't_COL')
+
+    Slices are views too:
+
+    >>> v = pari(range(10)).view()
+    >>> v[2:8:2]
+    <view of [2, 4, 6]>
+    >>> v[::-1][:3]
+    <view of [9, 8, 7]>
+    >>> list(v[5:])
+    [5, 6, 7, 8, 9]
+    >>> sum(pari("Vecsmall([1, 2, 3])").view())
+    6
+    >>> v[10]
+    Traceback (most recent call last):
+    ...
+    IndexError: index out of range
+    >>> v[0, 1]
+    Traceback (most recent call last):
+    ...
+    TypeError: tuple indices are only defined for matrices
+
+    The view stays valid when the underlying object is moved to the
+    PARI heap, but not when it is modified such that the viewed
+    component no longer exists:
+
+    >>> L = pari("[[1, 2], [3, 4]]")
+    >>> first = L.view()[0]
+    >>> L[0] = 5
+    >>> list(first)
+    Traceback (most recent call last):
+    ...
+    RuntimeError: the object underlying this view was modified
+    """
+    # The Gen owning the memory and the path of (1-based) indices from
+    # parent.g to the viewed GEN. We store the path instead of the GEN
+    # since parent.g changes when parent is moved to the PARI heap.
+    cdef Gen parent
+    cdef tuple path
+    cdef long vtype
+    # Entries start, start + step, ... (0-based) of the viewed GEN
+    cdef Py_ssize_t start
+    cdef Py_ssize_t step
+    cdef Py_ssize_t length
+    # Bounded cache of entries returned as Gen
+    cdef dict cache
+    cdef Py_ssize_t cache_size
+
+    def __init__(self):
+        raise TypeError("use Gen.view() to create a view")
+
+    cdef GEN target(self) except NULL:
+        """
+        Return the viewed GEN, checking that it still exists.
+        """
+        cdef GEN g = self.parent.g
+        cdef Py_ssize_t k
+        for k in self.path:
+            if not is_matvec_t(typ(g)) or k >= lg(g):
+                raise RuntimeError("the object underlying this view was modified")
+            g = gel(g, k)
+        # Largest 0-based index in the view
+        k = self.start + (self.length - 1) * self.step if self.step > 0 else self.start
+        if typ(g) != self.vtype or (self.length and k >= lg(g) - 1):
+            raise RuntimeError("the object underlying this view was modified")
+        return g
+
+    cdef Py_ssize_t index(self, i, Py_ssize_t n) except -1:
+        """
+        Return the 1-based PARI index of the Python index ``i`` in a
+        vector of length ``n``.
+        """
+        cdef Py_ssize_t j = i
+        if j < 0:
+            j += n
+        if not (0 <= j < n):
+            raise IndexError("index out of range")
+        return j + 1
+
+    cdef entry(self, GEN g, Py_ssize_t col, Py_ssize_t k):
+        """
+        Convert the entry ``g[k]`` of the viewed GEN ``g`` or, if
+        ``col`` is non-zero, the entry ``g[col][k]`` of a matrix.
+        """
+        if col:
+            g = gel(g, col)
+        if typ(g) == t_VECSMALL:
+            return g[k]
+        cdef GEN x = gel(g, k)
+        cdef long t = typ(x)
+        if t == t_INT:
+            return PyInt_FromGEN(x)
+        if is_matvec_t(t) or t == t_VECSMALL:
+            if col:
+                path = self.path + (col, k)
+            else:
+                path = self.path + (k,)
+            return GenView_new(self.parent, path, x, self.cache_size)
+
+        key = (col, k)
+        if self.cache is not None:
+            try:
+                return self.cache[key]
+            except KeyError:
+                pass
+        if self.parent.next is None and self.parent.address is not NULL:
+            res = self.parent.new_ref(x)
+        else:
+            # Copy the entry instead of moving the parent to the heap
+            # (or cloning a parent borrowed by a fast closure)
+            sig_on()
+            res = new_gen(gcopy(x))
+        if self.cache_size:
+            if self.cache is None:
+                self.cache = {}
+            elif len(self.cache) >= self.cache_size:
+                del self.cache[next(iter(self.cache))]
+            self.cache[key] = res
+        return res
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, n):
+        cdef GEN g = self.target()
+        cdef Py_ssize_t i, j
+        if isinstance(n, tuple):
+            if self.vtype != t_MAT:
+                raise TypeError("tuple indices are only defined for matrices")
+            i, j = n
+            j = self.start + (self.index(j, self.length) - 1) * self.step + 1
+            i = self.index(i, lg(gel(g, j)) - 1)
+            return self.entry(g, j, i)
+
+        if isinstance(n, slice):
+            start, stop, step = n.indices(self.length)
+            v = GenView_new(self.parent, self.path, g, self.cache_size)
+            v.start = self.start + start * self.step
+            v.step = self.step * step
+            v.length = len(range(start, stop, step))
+            return v
+
+        i = self.index(n, self.length) - 1
+        return self.entry(g, 0, self.start + i * self.step + 1)
+
+    def __iter__(self):
+        cdef Py_ssize_t i
+        for i in range(self.length):
+            yield self.entry(self.target(), 0, self.start + i * self.step + 1)
+
+    def __repr__(self):
+        return f"<view of {self.gen()}>"
+
+    def type(self):
+        r"""
+        Return the PARI type of the viewed object as a string.
+        """
+        return to_string(type_name(self.vtype))
+
+    def gen(self):
+        r"""
+        Return a copy of the viewed entries as a :class:`Gen` of the
+        same type.
+        """
+        cdef GEN g = self.target()
+        cdef Py_ssize_t i, k
+        sig_on()
+        cdef GEN res = cgetg(self.length + 1, self.vtype)
+        for i in range(self.length):
+            k = self.start + i * self.step + 1
+            if self.vtype == t_VECSMALL:
+                res[i + 1] = g[k]
+            else:
+                set_gel(res, i + 1, gcopy(gel(g, k)))
+        return new_gen(res)
+
+
+cdef GenView GenView_new(Gen parent, tuple path, GEN g, Py_ssize_t cache_size):
+    cdef GenView v = <GenView>GenView.__new__(GenView)
+    v.parent = parent
+    v.path = path
+    v.vtype = typ(g)
+    v.start = 0
+    v.step = 1
+    v.length = lg(g) - 1
+    v.cache_size = cache_size
+    return v
+
+
+@cython.final
+cdef class FactorCache:
+    r"""
+    A cache of factorizations computed by :meth:`Gen.factor`.
+
+    Entries are keyed by the object to factor (compared with
+    ``gidentical``, so ``2`` and ``2.0`` are different), the ``limit``
+    and the value of ``factor_proven`` used for the factorization.
+    The object and its factorization are stored as clones on the PARI
+    heap. So a cache hit returns the same :class:`Gen` again, which
+    must not be modified.
+
+    When the clones use more than ``max_bytes`` bytes, the least
+    recently used entries are removed.
+
+    The cache is enabled with :meth:`Pari.set_factor_cache`.
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> pari = Pari()
+    >>> pari.set_factor_cache(2**20)
+    >>> cache = pari.get_factor_cache()
+    >>> cache
+    <FactorCache with 0 entries using 0 of 1048576 bytes>
+    >>> n = pari(2**64 + 1)
+    >>> f = n.factor()
+    >>> n.factor() == f
+    True
+
+    Every call returns a new copy, so modifying a factorization does not
+    change the cached one:
+
+    >>> f[0, 1] = 99
+    >>> n.factor()
+    [274177, 1; 67280421310721, 1]
+    >>> pari(360).factor(limit=3)
+    [2, 3; 45, 1]
+    >>> cache.stats()
+    {'hits': 2, 'misses': 2, 'entries': 2, 'nbytes': ..., 'max_bytes': 1048576}
+
+    Factorizations can be passed to functions which would otherwise
+    factor the same numbers:
+
+    >>> T = pari("x^3 - 15*x - 50")
+    >>> fa = T.poldisc().factor()
+    >>> pari.nfbasis([T, fa[0]])
+    [1, x, 1/60*x^2 + 1/12*x + 1/6]
+
+    >>> cache.clear()
+    >>> len(cache)
+    0
+    >>> pari.set_factor_cache(0)
+    >>> pari.get_factor_cache() is None
+    True
+    """
+    cdef readonly size_t max_bytes
+    cdef readonly size_t nbytes
+    cdef readonly size_t hits
+    cdef readonly size_t misses
+    # Entries by (hash, limit, proof), in the order in which they were
+    # used. Every value is a list of tuples (key, value, size) with
+    # objects which have the same hash.
+    cdef dict entries
+    cdef Py_ssize_t n
+
+    def __init__(self, size_t max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = {}
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return (f"<FactorCache with {self.n} entries using "
+                f"{self.nbytes} of {self.max_bytes} bytes>")
+
+    def clear(self):
+        r"""
+        Remove all entries (but keep the statistics).
+        """
+        self.entries.clear()
+        self.n = 0
+        self.nbytes = 0
+
+    def stats(self):
+        r"""
+        Return a dict with the number of hits and misses, the number
+        of entries and the number of bytes used.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": self.n,
+                "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+    cdef Gen get(self, Gen x, key):
+        r"""
+        Return a copy of the cached factorization of ``x`` or
+        ``None``.
+        """
+        bucket = self.entries.pop(key, None)
+        if bucket is None:
+            self.misses += 1
+            return None
+        # Move the entry to the end (most recently used)
+        self.entries[key] = bucket
+        for k, v, size in <list>bucket:
+            if gidentical((<Gen>k).g, x.g):
+                self.hits += 1
+                sig_on()
+                return new_gen(gcopy((<Gen>v).g))
+        self.misses += 1
+        return None
+
+    cdef put(self, Gen x, key, Gen value):
+        r"""
+        Add a copy of the factorization ``value`` of ``x`` to the
+        cache.
+        """
+        cdef size_t size = gsizebyte(x.g) + gsizebyte(value.g)
+        if size > self.max_bytes:
+            return
+        sig_on()
+        k = clone_gen(x.g)
+        sig_on()
+        v = clone_gen(value.g)
+        bucket = self.entries.pop(key, [])
+        bucket.append((k, v, size))
+        self.entries[key] = bucket
+        self.n += 1
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            # Remove the least recently used entries
+            oldest = next(iter(self.entries))
+            for entry in self.entries.pop(oldest):
+                self.n -= 1
+                self.nbytes -= entry[2]
+
+
+cdef FactorCache factor_cache = None
+
+
+cdef set_factor_cache(size_t max_bytes):
+    global factor_cache
+    factor_cache = FactorCache(max_bytes) if max_bytes else None
+
+
+cdef get_factor_cache():
+    return factor_cache
+
+
+# The DiskCache used by the methods of expensive PARI functions, see
+# Pari.set_disk_cache()
+cdef object disk_cache = None
+
+
+cdef set_disk_cache(cache):
+    global disk_cache
+    disk_cache = cache
+
+
+cdef get_disk_cache():
+    return disk_cache
+
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -4774,12 +5570,13 @@ cpdef Gen objtogen(s):
     if isinstance(s, Gen):
         return s
 
-    try:
-        m = s.__pari__
-    except AttributeError:
-        pass
-    else:
-        return m()
+    if type(s) is not str:
+        try:
+            m = s.__pari__
+        except AttributeError:
+            pass
+        else:
+            return m()
 
     cdef GEN g = PyObject_AsGEN(s)
     if g is not NULL:
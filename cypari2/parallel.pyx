@@ -0,0 +1,235 @@
+"""
+Process pools for PARI computations
+***********************************
+
+A :class:`PariPool` runs PARI computations in worker processes. Every
+worker initializes PARI once, with the given stack size and prime
+limit, and can be given shared objects (like a ``bnf`` or an elliptic
+curve) which are sent to it only once. Inputs and results are sent in
+the binary format of :func:`~cypari2.convert.gen_to_bytes`, in chunks
+of several items.
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+from .gen cimport Gen, objtogen
+from .convert cimport gen_to_bytes, gen_from_bytes
+
+import multiprocessing
+import re
+
+from .pari_instance import Pari
+from .handle_error import PariError
+
+
+cdef object identifier_re = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+# State of a worker process
+cdef object worker_pari = None
+cdef dict worker_shared = {}
+cdef dict worker_closures = {}
+
+
+def shared(name):
+    r"""
+    Return the shared object ``name`` of the :class:`PariPool` in
+    which the current process is a worker.
+
+    This can be used by Python functions given to :meth:`PariPool.map`.
+    """
+    return worker_shared[name]
+
+
+def _init_worker(size_t size, size_t sizemax, unsigned long maxprime, dict shared):
+    """
+    Initialize PARI and the shared objects in a worker process.
+    """
+    global worker_pari
+    worker_pari = Pari(size, sizemax, maxprime)
+    # With the "fork" start method, PARI is inherited from the parent
+    # process and Pari() does not shrink its stack
+    worker_pari.allocatemem(size, sizemax or size, silent=True)
+    worker_shared.clear()
+    worker_closures.clear()
+    for name, data in shared.items():
+        x = gen_from_bytes(data)
+        worker_shared[name] = x
+        # Make the object available to GP closures as global variable
+        setter(worker_pari, name)(x)
+
+
+cdef setter(pari, name):
+    """
+    Return a GP closure assigning its argument to the global variable
+    ``name``.
+    """
+    arg = "y" if name == "x" else "x"
+    return pari(f"({arg}) -> {name} = {arg}")
+
+
+def _run_chunk(func, list chunk):
+    """
+    Apply ``func`` to the encoded items of ``chunk`` and return the
+    encoded results.
+    """
+    if isinstance(func, str):
+        f = worker_closures.get(func)
+        if f is None:
+            f = worker_closures[func] = worker_pari(func)
+    else:
+        f = func
+    try:
+        return [gen_to_bytes(objtogen(f(gen_from_bytes(data)))) for data in chunk]
+    except PariError as err:
+        # Send the error number, text and data in binary form, to be
+        # raised again by PariPool.map()
+        errnum, errtext, errdata = err.args
+        try:
+            errdata = gen_to_bytes(errdata)
+        except ValueError:
+            errdata = None
+        return (errnum, errtext, errdata)
+
+
+cdef class PariPool:
+    r"""
+    A pool of worker processes for PARI computations.
+
+    INPUT:
+
+    - ``processes`` -- (default: the number of CPUs) the number of
+      worker processes
+
+    - ``size``, ``sizemax``, ``maxprime`` -- PARI initialization
+      parameters for the workers, see :class:`~cypari2.pari_instance.Pari`
+
+    - ``shared`` -- (optional) a dict of objects to send once to every
+      worker. They are available as GP global variables (the keys
+      must be valid GP variable names) and from Python functions with
+      :func:`shared`.
+
+    - ``context`` -- (optional) a :mod:`multiprocessing` context or
+      start method name (like ``"spawn"``)
+
+    Examples:
+
+    >>> from cypari2 import Pari
+    >>> from cypari2.parallel import PariPool
+    >>> pari = Pari()
+    >>> with PariPool(2) as pool:
+    ...     pool.map("isprime", range(10))
+    [0, 0, 1, 1, 0, 1, 0, 1, 0, 0]
+
+    Functions can be given as GP closures (or their source code).
+    Shared objects are sent to each worker only once:
+
+    >>> E = pari.ellinit([0, 0, 1, -1, 0])
+    >>> with PariPool(2, shared={"E": E}) as pool:
+    ...     pool.map("(p) -> ellap(E, p)", pari.primes(8), chunksize=3)
+    ...     pool.map(pari("(x) -> x^2 + 1"), ["y", 2])
+    [-2, -3, -2, -1, -5, -2, 0, 0]
+    [y^2 + 1, 5]
+
+    The workers use the given stack size, whatever the start method:
+
+    >>> with PariPool(1, size=10**6) as pool:
+    ...     pool.map("(x) -> default(parisize)", [0])
+    [1000000]
+
+    Errors are raised in the calling process:
+
+    >>> with PariPool(1) as pool:
+    ...     pool.map("(x) -> 1/x", [1, 0])
+    Traceback (most recent call last):
+    ...
+    PariError: _/_: impossible inverse in gdiv: 0
+    >>> PariPool(1, shared={"1x": 1})
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid GP variable name '1x'
+    >>> PariPool(1, shared={"Pi": 3})
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid GP variable name 'Pi'
+    """
+    cdef object pool
+
+    def __init__(self, processes=None, size_t size=8000000, size_t sizemax=0,
+                 unsigned long maxprime=500000, shared=None, context=None):
+        cdef dict encoded = {}
+        if shared is not None:
+            for name, x in shared.items():
+                if not identifier_re.match(name):
+                    raise ValueError(f"invalid GP variable name {name!r}")
+                try:
+                    setter(Pari(), name)
+                except PariError:
+                    # Names of GP functions or constants
+                    raise ValueError(f"invalid GP variable name {name!r}") from None
+                encoded[name] = gen_to_bytes(objtogen(x))
+        if context is None or isinstance(context, str):
+            context = multiprocessing.get_context(context)
+        self.pool = context.Pool(processes, _init_worker,
+                                 (size, sizemax, maxprime, encoded))
+
+    def map(self, func, iterable, Py_ssize_t chunksize=16):
+        r"""
+        Return the list of ``func(x)`` for all ``x`` in ``iterable``,
+        computed by the workers.
+
+        INPUT:
+
+        - ``func`` -- a GP closure, a string with GP code evaluating
+          to a closure (like ``"(x) -> x^2"`` or a function name like
+          ``"isprime"``) or a picklable Python function taking a
+          :class:`Gen`
+
+        - ``iterable`` -- the inputs, which are converted to PARI
+
+        - ``chunksize`` -- (default: 16) the number of items sent to
+          a worker at once
+
+        The results are converted to PARI.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be positive")
+        if isinstance(func, Gen):
+            func = str(func)
+        cdef list items = [gen_to_bytes(objtogen(x)) for x in iterable]
+        cdef list chunks = [(func, items[i:i + chunksize])
+                            for i in range(0, len(items), chunksize)]
+        cdef list res = []
+        for chunk in self.pool.starmap(_run_chunk, chunks, chunksize=1):
+            if isinstance(chunk, tuple):
+                errnum, errtext, errdata = chunk
+                if errdata is not None:
+                    errdata = gen_from_bytes(errdata)
+                raise PariError(errnum, errtext, errdata)
+            res.extend(gen_from_bytes(data) for data in chunk)
+        return res
+
+    def close(self):
+        r"""
+        Stop the workers after they completed their tasks.
+        """
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        r"""
+        Stop the workers immediately.
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.terminate()
@@ -217,6 +217,16 @@ inputs and the ``precision`` argument is ignored:
 >>> pari.sin("1.0000000000000000000000000000000000000").bitprecision()
 128
 
+Threads:
+
+The PARI library is used through a single PARI stack, which is shared
+by all Python threads. Calls to PARI keep the GIL, so PARI computations
+from different threads run one after the other. To use several cores,
+use separate processes (for example with :mod:`multiprocessing`) or the
+parallel functions of PARI like ``parapply``, which run in PARI's own
+threads if PARI was built with the ``pthread`` engine (see
+:meth:`Pari.mt_engine`).
+
 Tests:
 
 Check that the documentation is generated correctly:
@@ -289,15 +299,31 @@ from libc.stdio cimport *
 cimport cython
 
 from cysignals.signals cimport sig_check, sig_on, sig_off, sig_error
+from cpython.float cimport PyFloat_AS_DOUBLE
+from cpython.longintrepr cimport py_long
 
 from .string_utils cimport to_string, to_bytes
 from .paridecl cimport *
 from .paripriv cimport *
-from .gen cimport Gen, objtogen
-from .stack cimport (new_gen, new_gen_noclear, clear_stack,
-                     set_pari_stack_size, before_resize, after_resize)
+from .gen cimport (Gen, objtogen, set_factor_cache, get_factor_cache,
+                  set_disk_cache, get_disk_cache)
+from .convert cimport (PyBuffer_AsGEN, PyLong_AS_GEN, double_to_REAL,
+                       set_parse_cache, get_parse_cache)
+from .stack cimport (new_gen, new_gen_noclear, clone_gen, clear_stack,
+                     set_pari_stack_size, before_resize, after_resize,
+                     set_promotion_policy, get_promotion_policy,
+                     get_memory_stats, reset_memory_stats, Arena,
+                     flush_release_queue, set_release_queue_size,
+                     get_release_queue_size, reset_avma)
 from .handle_error cimport _pari_init_error_handling
 from .closure cimport _pari_init_closure
+from .profiler cimport (profile_frame, profile_start, profile_stop,
+                        get_profiling_flag, set_function_names, set_profiling,
+                        get_profiling, get_profile_stats, reset_profile_stats,
+                        Profiling)
+
+# Tested by the auto-generated methods before calling profile_start()
+cdef bint* profiling_enabled = get_profiling_flag()
 
 
 #################################################################
@@ -568,7 +594,8 @@ cdef class Pari(Pari_auto):
            PARI stack. CyPari2 tries to keep everything on the PARI
            stack. However, if over half of the PARI stack space is used,
            all live objects on the PARI stack are copied to the PARI
-           heap (they become so-called clones).
+           heap (they become so-called clones). This can be tuned with
+           :meth:`promotion_policy`.
         """
         # Increase (but don't decrease) size and sizemax to the
         # requested value
@@ -624,6 +651,93 @@ cdef class Pari(Pari_auto):
         """
         return int(self.default('debug'))
 
+    def set_factor_cache(self, size_t max_bytes):
+        """
+        Enable a cache of the factorizations computed by
+        :meth:`Gen.factor`, using at most ``max_bytes`` bytes on the
+        PARI heap. This replaces the previous cache, if any. If
+        ``max_bytes`` is 0, disable the cache.
+
+        See :class:`~cypari2.gen.FactorCache`.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.set_factor_cache(10**6)
+        >>> pari(100).factor()
+        [2, 2; 5, 2]
+        >>> pari(100).factor()
+        [2, 2; 5, 2]
+        >>> pari.get_factor_cache().stats()["hits"]
+        1
+        >>> pari.set_factor_cache(0)
+        """
+        set_factor_cache(max_bytes)
+
+    def get_factor_cache(self):
+        """
+        Return the :class:`~cypari2.gen.FactorCache` used by
+        :meth:`Gen.factor` or ``None`` if there is no cache.
+        """
+        return get_factor_cache()
+
+    def set_disk_cache(self, cache):
+        """
+        Use the :class:`~cypari2.diskcache.DiskCache` ``cache`` to store
+        the results of expensive functions like ``bnfinit``. If
+        ``cache`` is ``None``, disable caching.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.set_disk_cache("/tmp")
+        Traceback (most recent call last):
+        ...
+        TypeError: cache must be a DiskCache or None
+        """
+        from .diskcache import DiskCache
+        if cache is not None and not isinstance(cache, DiskCache):
+            raise TypeError("cache must be a DiskCache or None")
+        set_disk_cache(cache)
+
+    def get_disk_cache(self):
+        """
+        Return the :class:`~cypari2.diskcache.DiskCache` set by
+        :meth:`set_disk_cache` or ``None``.
+        """
+        return get_disk_cache()
+
+    def set_parse_cache(self, size_t maxsize):
+        """
+        Enable a cache of the compiled code of the last ``maxsize``
+        strings evaluated by ``pari(s)``. This replaces the previous
+        cache, if any. If ``maxsize`` is 0, disable the cache.
+
+        This speeds up evaluating the same strings many times. See
+        :class:`~cypari2.convert.ParseCache` and also :meth:`compile`.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.set_parse_cache(100)
+        >>> [pari("nextprime(10^6)") for i in range(3)]
+        [1000003, 1000003, 1000003]
+        >>> pari.get_parse_cache().stats()["hits"]
+        2
+        >>> pari.set_parse_cache(0)
+        """
+        set_parse_cache(maxsize)
+
+    def get_parse_cache(self):
+        """
+        Return the :class:`~cypari2.convert.ParseCache` used by
+        ``pari(s)`` or ``None`` if there is no cache.
+        """
+        return get_parse_cache()
+
     def set_real_precision_bits(self, n):
         """
         Sets the PARI default real precision in bits.
@@ -758,6 +872,23 @@ cdef class Pari(Pari_auto):
         """
         return tuple(Pari_auto.version(self))
 
+    def mt_engine(self):
+        """
+        Return the multi-threading engine which PARI was built with:
+        ``"single"`` (no multi-threading), ``"pthread"`` or ``"mpi"``.
+
+        With ``"pthread"``, the parallel GP functions like ``parapply``
+        and ``parfor`` use ``nbthreads`` threads (see
+        ``pari.default("nbthreads")``).
+
+        Examples:
+
+        >>> from cypari2 import Pari
+        >>> Pari().mt_engine() in ("single", "pthread", "mpi")
+        True
+        """
+        return paricfg_mt_engine.decode("ascii")
+
     def complex(self, re, im):
         """
         Create a new complex number, initialized from re and im.
@@ -802,6 +933,40 @@ cdef class Pari(Pari_auto):
             return None
         return g
 
+    def compile(self, code):
+        """
+        Compile the GP closure ``code``, like ``"(a, b) -> a + b"``, and
+        return it as a :class:`Gen`.
+
+        The closure is parsed and compiled once, so calling it is faster
+        than evaluating a string built for each value of the
+        parameters. Use ``"() -> ..."`` for expressions without
+        parameters.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> f = pari.compile("(a, b) -> a^2 + b")
+        >>> f
+        (a,b)->a^2+b
+        >>> f(3, 1), f(2**70, pari("1/2")), f(pari("x"), pari("y"))
+        (10, 2787593149816327892691964784081045188247553/2, x^2 + y)
+        >>> pari.compile("() -> nextprime(100)")()
+        101
+        >>> pari.compile("2 + 2")
+        Traceback (most recent call last):
+        ...
+        TypeError: 2 + 2 is not a GP closure
+        """
+        code = to_bytes(code)
+        sig_on()
+        cdef GEN res = gp_read_str(<bytes>code)
+        if typ(res) != t_CLOSURE:
+            clear_stack()
+            raise TypeError(f"{to_string(code)} is not a GP closure")
+        return clone_gen(res)
+
     cpdef Gen zero(self):
         """
         Examples:
@@ -995,6 +1160,460 @@ cdef class Pari(Pari_auto):
             print("PARI stack size set to {} bytes, maximum size set to {}".
                   format(self.stacksize(), self.stacksizemax()))
 
+    def promotion_policy(self, threshold=None, max_gens=None, max_bytes=None,
+                         generational=None):
+        r"""
+        Get or set the policy for moving :class:`Gen` objects from the
+        PARI stack to the PARI heap.
+
+        Results of PARI computations are kept on the PARI stack. When
+        too much of the PARI stack is in use, some of them are copied
+        ("promoted") to the PARI heap to make room for new computations.
+
+        INPUT:
+
+        - ``threshold`` -- fraction of the PARI stack which must be in
+          use to trigger promotion (default at startup: ``0.5``)
+
+        - ``max_gens`` -- maximum number of objects to promote at a
+          time; ``0`` means no limit (default at startup: ``0``)
+
+        - ``max_bytes`` -- stop promoting once the promoted objects
+          occupy this many bytes on the PARI stack; ``0`` means no
+          limit (default at startup: ``0``)
+
+        - ``generational`` -- if ``False`` (the default at startup),
+          promote the newest objects first. If ``True``, promote the
+          oldest objects first: those are the long-lived ones which
+          pin the PARI stack. Old objects which are no longer
+          referenced are released without copying them.
+
+        Arguments which are not given are left unchanged.
+
+        OUTPUT: the new policy as a ``dict``
+
+        With the default policy, all objects are promoted as soon as
+        half of the PARI stack is in use. Setting ``max_gens`` or
+        ``max_bytes`` spreads the work over several calls. In
+        generational mode, all objects are still promoted if the PARI
+        stack is almost full (half-way between ``threshold`` and full).
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.promotion_policy()
+        {'threshold': 0.5, 'max_gens': 0, 'max_bytes': 0, 'generational': False}
+        >>> pari.promotion_policy(threshold=0.25, max_gens=100, generational=True)
+        {'threshold': 0.25, 'max_gens': 100, 'max_bytes': 0, 'generational': True}
+
+        Objects remain valid, whichever way they are promoted:
+
+        >>> pari.allocatemem(2**18, silent=True)
+        >>> L = [pari(i)**3 for i in range(10**4)]
+        >>> all(L[i] == i**3 for i in range(10**4))
+        True
+        >>> _ = pari.promotion_policy(max_bytes=1000, generational=False)
+        >>> M = [pari(i)**3 for i in range(10**4)]
+        >>> all(M[i] == i**3 for i in range(10**4))
+        True
+        >>> del L, M
+
+        In generational mode, promoting some of the oldest objects does
+        not lower the use of the PARI stack, so the next run waits until
+        the PARI stack has grown further. Each run only processes the
+        objects within its limits:
+
+        >>> _ = pari.promotion_policy(max_gens=16, max_bytes=0, generational=True)
+        >>> _ = pari.memory_stats(reset=True)
+        >>> L = [pari(i) * 3**40 for i in range(2 * 10**4)]
+        >>> pari.memory_stats()["promotions"] < 1000
+        True
+        >>> pari.memory_stats()["max_promoted_bytes"] < pari.stacksize()
+        True
+        >>> all(L[i] == i * 3**40 for i in range(2 * 10**4))
+        True
+        >>> del L
+
+        Restore the default policy:
+
+        >>> pari.promotion_policy(0.5, 0, 0, False)
+        {'threshold': 0.5, 'max_gens': 0, 'max_bytes': 0, 'generational': False}
+        >>> pari.allocatemem(8000000, silent=True)
+
+        Tests:
+
+        >>> pari.promotion_policy(threshold=0)
+        Traceback (most recent call last):
+        ...
+        ValueError: promotion threshold must be in (0, 1], not 0.0
+        """
+        policy = get_promotion_policy()
+        if threshold is not None:
+            policy["threshold"] = threshold
+        if max_gens is not None:
+            policy["max_gens"] = max_gens
+        if max_bytes is not None:
+            policy["max_bytes"] = max_bytes
+        if generational is not None:
+            policy["generational"] = generational
+        set_promotion_policy(policy["threshold"], policy["max_gens"],
+                             policy["max_bytes"], policy["generational"])
+        return get_promotion_policy()
+
+    def memory_stats(self, bint reset=False):
+        r"""
+        Return a snapshot of the counters for memory management of
+        :class:`Gen` objects on the PARI stack and the PARI heap.
+
+        INPUT:
+
+        - ``reset`` -- (default: ``False``) if ``True``, reset the
+          cumulative counters to zero after taking the snapshot
+
+        OUTPUT: a ``dict`` with the following keys:
+
+        - ``stack_gens`` -- number of live objects on the PARI stack
+
+        - ``clone_gens`` -- number of live objects referring to clones
+          on the PARI heap
+
+        - ``pending_clones`` -- number of clones waiting in the deferred
+          release queue (see :meth:`deferred_release`)
+
+        - ``stack_used``, ``stack_size`` -- number of bytes in use on
+          the PARI stack and its current size
+
+        - ``promotions`` -- number of runs moving objects from the PARI
+          stack to the heap (see :meth:`promotion_policy`)
+
+        - ``promoted_gens``, ``promoted_bytes`` -- total number of
+          objects and bytes moved to the heap
+
+        - ``last_promoted_gens``, ``last_promoted_bytes`` -- number of
+          objects and bytes moved to the heap in the last run
+
+        - ``max_promoted_bytes`` -- maximum number of bytes moved to
+          the heap in a single run
+
+        - ``dropped_gens`` -- number of dead objects released from the
+          PARI stack without moving them in generational mode
+
+        - ``clone_releases`` -- number of clones released when
+          deallocating an object
+
+        - ``clone_flushes`` -- number of flushes of the deferred release
+          queue
+
+        - ``stack_resizes`` -- number of reallocations of the PARI stack
+
+        - ``leaks``, ``leaked_bytes`` -- number of times that memory
+          leaked on the PARI stack and the total number of bytes
+
+        The ``stack_*``, ``clone_gens`` and ``pending_clones`` entries reflect the current
+        state and are not affected by ``reset``.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> _ = pari.memory_stats(reset=True)
+        >>> a = pari(2)**100
+        >>> s = pari.memory_stats()
+        >>> s["stack_gens"] > 0
+        True
+        >>> s["promotions"]
+        0
+
+        Indexing moves an object to the heap:
+
+        >>> v = pari.vector(3, [1, 2, 3])
+        >>> v[0]
+        1
+        >>> s = pari.memory_stats()
+        >>> s["promotions"] > 0 and s["promoted_gens"] > 0
+        True
+        >>> n = s["clone_gens"]
+        >>> del v
+        >>> s = pari.memory_stats()
+        >>> s["clone_gens"] < n and s["clone_releases"] > 0
+        True
+
+        Resizing the stack:
+
+        >>> pari.allocatemem(10**7, silent=True)
+        >>> pari.memory_stats(reset=True)["stack_resizes"]
+        1
+        >>> pari.memory_stats()["stack_resizes"]
+        0
+        >>> pari.allocatemem(8000000, silent=True)
+        """
+        stats = get_memory_stats()
+        if reset:
+            reset_memory_stats()
+        return stats
+
+    def deferred_release(self, size=None):
+        r"""
+        Set or get the size of the queue of clones on the PARI heap
+        whose release is deferred.
+
+        Normally, the memory on the PARI heap of an object is released
+        as soon as the object is deallocated. When many such objects
+        die at once (for example, a long list of entries of a large
+        vector), this is a long burst of small frees. With deferred
+        release, the memory is queued and released in one batch when
+        the queue is full or when calling :meth:`release_clones`.
+
+        INPUT:
+
+        - ``size`` -- (optional) maximal number of clones in the queue;
+          ``0`` releases clones immediately (the default). Changing the
+          size flushes the queue.
+
+        OUTPUT: the current size of the queue
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.deferred_release()
+        0
+        >>> pari.deferred_release(1000)
+        1000
+        >>> v = pari.vector(10, range(10))
+        >>> L = list(v)
+        >>> del v, L
+        >>> pari.memory_stats()["pending_clones"] > 0
+        True
+        >>> pari.release_clones() > 0
+        True
+        >>> pari.memory_stats()["pending_clones"]
+        0
+        >>> pari.deferred_release(0)
+        0
+        """
+        if size is not None:
+            set_release_queue_size(size)
+        return get_release_queue_size()
+
+    def release_clones(self):
+        r"""
+        Release the clones waiting in the deferred release queue, see
+        :meth:`deferred_release`. Return the number of clones released.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.release_clones()
+        0
+        """
+        return flush_release_queue()
+
+    def arena(self):
+        r"""
+        Return a context manager which reclaims the PARI stack used by
+        the objects created inside a ``with`` block.
+
+        Inside the block, temporary objects are allocated on the PARI
+        stack as usual. On exit, the stack is reset to its state on
+        entry in one go: every object created in the block which is
+        still referenced (not only the results of the block, but also
+        any temporary still bound to a variable) is moved to the PARI
+        heap, all others are released. Delete large temporaries before
+        leaving the block to avoid copying them. The number of objects
+        moved to the heap on exit is available as the ``promoted``
+        attribute.
+
+        This avoids keeping long chains of dead temporaries alive on
+        the PARI stack, which otherwise happens as long as a newer
+        object is referenced.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> used = pari.memory_stats()["stack_used"]
+        >>> with pari.arena() as arena:
+        ...     s = pari(0)
+        ...     for i in range(1, 100):
+        ...         s = s + pari(i)**2
+        >>> s
+        328350
+        >>> arena.promoted
+        1
+        >>> pari.memory_stats()["stack_used"] == used
+        True
+
+        Arenas can be nested:
+
+        >>> with pari.arena() as outer:
+        ...     a = pari(2)**100
+        ...     with pari.arena() as inner:
+        ...         b = a + 1
+        ...     c = a * b
+        >>> (inner.promoted, outer.promoted)
+        (1, 2)
+        >>> c - a**2 - a
+        0
+        """
+        return Arena()
+
+    def set_profiling(self, bint enable):
+        r"""
+        Enable or disable the profiling of PARI library calls.
+
+        When enabled, the auto-generated methods record the number of
+        calls, the time and the PARI stack used by each PARI function,
+        see :mod:`cypari2.profiler`. The results are given by
+        :meth:`profile_stats` and :meth:`profile_report`.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.set_profiling(True)
+        >>> pari.get_profiling()
+        True
+        >>> pari.set_profiling(False)
+        """
+        set_profiling(enable)
+
+    def get_profiling(self):
+        r"""
+        Return whether the profiling of PARI library calls is enabled,
+        see :meth:`set_profiling`.
+        """
+        return get_profiling()
+
+    def profiling(self, bint reset=True):
+        r"""
+        Return a context manager which enables the profiling of PARI
+        library calls inside a ``with`` block, see :meth:`set_profiling`.
+
+        INPUT:
+
+        - ``reset`` -- (default: ``True``) if ``True``, reset the
+          counters when entering the block
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> with pari.profiling():
+        ...     for n in range(10):
+        ...         _ = pari.gcd(n, 6)
+        ...     _ = pari(2**64 + 1).eulerphi()
+        >>> stats = pari.profile_stats()
+        >>> sorted(stats)
+        ['eulerphi', 'gcd']
+        >>> stats["gcd"]["calls"]
+        10
+        >>> pari.get_profiling()
+        False
+        """
+        return Profiling(reset)
+
+    def profile_stats(self, bint reset=False):
+        r"""
+        Return the counters of the profiling of PARI library calls,
+        see :meth:`set_profiling`.
+
+        INPUT:
+
+        - ``reset`` -- (default: ``False``) if ``True``, reset the
+          counters to zero after taking the snapshot
+
+        OUTPUT: a ``dict`` whose keys are the names of the PARI
+        functions which were called. The values are dicts with the
+        following keys:
+
+        - ``calls`` -- the number of calls
+
+        - ``time``, ``max_time`` -- the total and maximal wall time
+          of a call in seconds
+
+        - ``max_stack`` -- the maximal number of bytes of the PARI
+          stack used by a call (for its result and garbage)
+
+        - ``callback_time`` -- the time in seconds spent in Python
+          functions called by PARI, which is included in ``time``
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> with pari.profiling():
+        ...     v = pari.apply(lambda x: pari.nextprime(x), [10**20, 10**30])
+        ...     f = pari.polcyclo(60)
+        >>> stats = pari.profile_stats(reset=True)
+        >>> s = stats["apply"]
+        >>> s["calls"]
+        1
+        >>> 0 < s["callback_time"] <= s["time"]
+        True
+        >>> stats["nextprime"]["calls"]
+        2
+        >>> stats["polcyclo"]["max_stack"] > 0
+        True
+        >>> pari.profile_stats()
+        {}
+        """
+        stats = get_profile_stats()
+        if reset:
+            reset_profile_stats()
+        return stats
+
+    def profile_report(self, sort="time", Py_ssize_t limit=20):
+        r"""
+        Return a table with the results of the profiling of PARI library
+        calls, see :meth:`profile_stats`.
+
+        INPUT:
+
+        - ``sort`` -- (default: ``"time"``) a key of the dicts
+          returned by :meth:`profile_stats`, sorting the functions in
+          decreasing order
+
+        - ``limit`` -- (default: 20) the maximal number of functions
+          to show, or -1 to show all
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> with pari.profiling():
+        ...     for n in range(10):
+        ...         _ = pari.gcd(n, 6)
+        ...     _ = pari.isprime(2**127 - 1)
+        >>> print(pari.profile_report(sort="calls"))
+        function            calls    time (s)     max (s)   max stack callback (s)
+        gcd                    10    ...
+        isprime                 1    ...
+        >>> print(pari.profile_report(limit=1))
+        function            calls    time (s)     max (s)   max stack callback (s)
+        isprime                 1    ...
+        <BLANKLINE>
+        1 more function not shown
+        """
+        stats = get_profile_stats()
+        if stats and sort not in next(iter(stats.values())):
+            raise ValueError(f"cannot sort by {sort!r}")
+        functions = sorted(stats, key=lambda f: stats[f][sort], reverse=True)
+        lines = [f"{'function':<16}{'calls':>9}{'time (s)':>12}{'max (s)':>12}"
+                 f"{'max stack':>12}{'callback (s)':>13}"]
+        for f in functions[:limit] if limit >= 0 else functions:
+            s = stats[f]
+            lines.append(f"{f:<16}{s['calls']:>9}{s['time']:>12.6f}"
+                         f"{s['max_time']:>12.6f}{s['max_stack']:>12}"
+                         f"{s['callback_time']:>13.6f}")
+        hidden = len(functions) - limit
+        if limit >= 0 and hidden > 0:
+            lines.append("")
+            lines.append(f"{hidden} more function{'s' if hidden > 1 else ''} not shown")
+        return "\n".join(lines)
+
     @staticmethod
     def pari_version():
         """
@@ -1274,6 +1893,375 @@ cdef class Pari(Pari_auto):
                     k += 1
         return A
 
+    def from_array(self, a, bint vecsmall=False):
+        """
+        Convert an array supporting the buffer protocol (such as a NumPy
+        array, an ``array.array`` or a ``memoryview``) to PARI in a single
+        pass over its memory.
+
+        INPUT:
+
+        - ``a`` -- an array of dimension at most 2 with integer,
+          floating-point or complex items
+
+        - ``vecsmall`` -- (default: ``False``) if ``True``, convert a
+          1-dimensional array of integers to a ``t_VECSMALL``
+
+        OUTPUT: items are converted to ``t_INT``, ``t_REAL`` or
+        ``t_COMPLEX``. A 1-dimensional array is converted to a
+        ``t_VEC`` (or a ``t_VECSMALL``) and a 2-dimensional array to a
+        ``t_MAT`` with the same shape.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> from array import array
+        >>> pari.from_array(array("l", [1, -2, 3]))
+        [1, -2, 3]
+        >>> v = pari.from_array(array("q", [1, -2, 3]), vecsmall=True)
+        >>> v, v.type()
+        (Vecsmall([1, -2, 3]), 't_VECSMALL')
+        >>> pari.from_array(array("d", [0.5, 2]))
+        [0.500000000000000, 2.00000000000000]
+        >>> pari.from_array(array("Q", [2**64 - 1]))
+        [18446744073709551615]
+        >>> m = memoryview(array("i", range(6))).cast("B").cast("i", (2, 3))
+        >>> pari.from_array(m)
+        [0, 1, 2; 3, 4, 5]
+
+        Converting a memoryview of a PARI ``t_VECSMALL`` gives the
+        same object back:
+
+        >>> pari.from_array(memoryview(v), vecsmall=True) == v
+        True
+
+        Tests:
+
+        >>> pari.from_array(array("Q", [2**64 - 1]), vecsmall=True)
+        Traceback (most recent call last):
+        ...
+        OverflowError: value too large to convert to t_VECSMALL
+        >>> pari.from_array(array("d", [1.5]), vecsmall=True)
+        Traceback (most recent call last):
+        ...
+        TypeError: conversion to t_VECSMALL requires a 1-dimensional array of integers
+        >>> pari.from_array(memoryview(b"abc").cast("c"))
+        Traceback (most recent call last):
+        ...
+        TypeError: unsupported buffer format 'c'
+        >>> pari.from_array([1, 2])
+        Traceback (most recent call last):
+        ...
+        TypeError: a bytes-like object is required, not 'list'
+        >>> pari.from_array(memoryview(bytes(8)).cast("B", (2, 2, 2)))
+        Traceback (most recent call last):
+        ...
+        ValueError: cannot convert 3-dimensional array to a PARI matrix
+        >>> pari.from_array(array("d"))
+        []
+        """
+        cdef GEN g = PyBuffer_AsGEN(a, True, vecsmall)
+        if g is NULL:
+            raise TypeError(f"cannot convert {type(a).__name__} to PARI")
+        res = new_gen_noclear(g)
+        reset_avma()
+        return res
+
+    def sum(self, iterable, start=None):
+        """
+        Return the sum of ``start`` (if given) and the items of
+        ``iterable``, which may be :class:`Gen` or any objects which
+        can be converted to PARI.
+
+        Unlike the Python builtin ``sum()``, this does not create a
+        :class:`Gen` for every partial sum: the items are added by PARI
+        in a single pass, with garbage collection on the PARI stack.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.sum(range(101))
+        5050
+        >>> pari.sum([pari("x"), "1/2", "y"], 10)
+        x + (y + 21/2)
+        >>> pari.sum(pari("[1, 2; 3, 4]"))
+        [3, 7]~
+        >>> pari.sum([2**100, -2**100, 1.5])
+        1.50000000000000
+        >>> pari.sum([])
+        0
+        """
+        cdef list items
+        cdef Gen vec = None, s = None
+        if start is not None:
+            s = objtogen(start)
+        if isinstance(iterable, Gen) and is_vec_t(typ((<Gen>iterable).g)):
+            vec = <Gen>iterable
+        else:
+            items = reduction_items(iterable)
+        sig_on()
+        cdef GEN x = vecsum(vec.g if vec is not None else items_to_vec(items))
+        if s is not None:
+            x = gadd(s.g, x)
+        return new_gen(x)
+
+    def prod(self, iterable, start=None):
+        """
+        Return the product of ``start`` (if given) and the items of
+        ``iterable``, which may be :class:`Gen` or any objects which
+        can be converted to PARI.
+
+        The product is computed by PARI as a product tree (multiplying
+        pairs of items, then pairs of those products and so on), which
+        is much faster than multiplying one item at a time for large
+        integers or polynomials. The order of the factors is kept, so
+        this can also be used for matrices.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.prod(range(1, 21)) == pari.factorial_int(20)
+        True
+        >>> pari.prod(pari("x") - i for i in range(3))
+        x^3 - 3*x^2 + 2*x
+        >>> pari.prod([pari("[1, 1; 0, 1]")] * 5, start=pari("[1, 0; 0, 2]"))
+        [1, 5; 0, 2]
+        >>> pari.prod([])
+        1
+        """
+        cdef list items
+        cdef Gen vec = None, s = None
+        if start is not None:
+            s = objtogen(start)
+        if isinstance(iterable, Gen) and is_vec_t(typ((<Gen>iterable).g)):
+            vec = <Gen>iterable
+        else:
+            items = reduction_items(iterable)
+        sig_on()
+        cdef GEN x = vecprod(vec.g if vec is not None else items_to_vec(items))
+        if s is not None:
+            x = gmul(s.g, x)
+        return new_gen(x)
+
+    def dot(self, x, y):
+        """
+        Return the dot product ``x[0]*y[0] + x[1]*y[1] + ...`` of two
+        iterables of the same length, computed by PARI in a single pass.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.dot([1, 2, 3], [4, 5, 6])
+        32
+        >>> pari.dot(pari("[x, y]"), (2, "1/3"))
+        2*x + 1/3*y
+        >>> pari.dot([], [])
+        0
+        >>> pari.dot([1, 2], [3])
+        Traceback (most recent call last):
+        ...
+        ValueError: dot product of vectors of different lengths (2 and 1)
+        """
+        cdef list xitems = reduction_items(x)
+        cdef list yitems = reduction_items(y)
+        if len(xitems) != len(yitems):
+            raise ValueError(f"dot product of vectors of different lengths "
+                             f"({len(xitems)} and {len(yitems)})")
+        sig_on()
+        return new_gen(RgV_dotproduct(items_to_vec(xitems), items_to_vec(yitems)))
+
+    def batch(self, function, iterable, *args, output="pari", **kwds):
+        """
+        Apply the PARI function named ``function`` to every item of
+        ``iterable``. Extra arguments are passed to every call.
+
+        The items are converted and the function is called in a loop
+        in C, which is much faster than calling it from Python
+        for many small inputs. This is supported for functions whose
+        first argument is a PARI object and whose other arguments are
+        PARI objects or C integers.
+
+        INPUT:
+
+        - ``function`` -- name of the PARI function
+
+        - ``iterable`` -- the values for the first argument
+
+        - ``output`` -- (default: ``"pari"``) the type of the result:
+
+          - ``"pari"``: a PARI ``t_VECSMALL`` for functions returning a
+            C integer (like ``kronecker``) and a ``t_VEC`` otherwise
+
+          - ``"python"``: a list, converted using
+            :func:`~cypari2.convert.gen_to_python`
+
+          - ``"numpy"``: a NumPy array, converted using
+            :func:`~cypari2.convert.gen_to_numpy`
+
+        With ``output="pari"``, all results are returned in a single
+        PARI vector, which must fit on the PARI stack together with
+        the results themselves. With the other outputs, the items are
+        processed in chunks sized to the free PARI stack and each
+        chunk is converted before the next one is computed, so there
+        is no such limit.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.batch("isprime", range(10))
+        [0, 0, 1, 1, 0, 1, 0, 1, 0, 0]
+        >>> pari.batch("kronecker", range(1, 8), 7)
+        Vecsmall([1, 1, -1, 1, -1, -1, 0])
+        >>> pari.batch("valuation", [12, 18, 7], 2, output="python")
+        [2, 1, 0]
+        >>> curves = [pari.ellinit([0, 0, 0, a, 1]) for a in range(3)]
+        >>> pari.batch("ellap", curves, 5)
+        [0, -3, -1]
+        >>> pari.batch("poldegree", ["x^2 + 1", "y", 3], "x")
+        [2, 0, 0]
+        >>> [x.bitprecision() for x in pari.batch("sqrt", [2, 3], precision=128)]
+        [128, 128]
+        >>> pari.batch("kronecker", range(1, 8), 7, output="numpy").tolist()
+        [1, 1, -1, 1, -1, -1, 0]
+        >>> len(pari.batch("isprime", range(10**5)))
+        100000
+        >>> sum(pari.batch("isprime", range(10**6), output="python"))
+        78498
+        >>> pari.batch("print", [1])
+        Traceback (most recent call last):
+        ...
+        ValueError: the PARI function 'print' does not support batch evaluation
+        >>> pari.batch("isprime", [1], output="list")
+        Traceback (most recent call last):
+        ...
+        ValueError: output must be 'pari', 'python' or 'numpy'
+        """
+        if output not in ("pari", "python", "numpy"):
+            raise ValueError("output must be 'pari', 'python' or 'numpy'")
+        try:
+            f = getattr(self, "_batch_" + function)
+        except AttributeError:
+            raise ValueError(f"the PARI function {function!r} does not "
+                             f"support batch evaluation") from None
+        if output == "pari":
+            return f(iterable, *args, **kwds)
+
+        if output == "python":
+            from .convert import gen_to_python as convert
+        else:
+            from .convert import gen_to_numpy as convert
+        # Leave room for about 32 words per result
+        cdef Py_ssize_t i, chunk = max(1, (avma - pari_mainstack.bot) // (32 * sizeof(long)))
+        cdef list items = list(iterable)
+        if len(items) <= chunk:
+            return convert(f(items, *args, **kwds))
+        cdef list res = []
+        for i in range(0, len(items), chunk):
+            res.append(convert(f(items[i:i + chunk], *args, **kwds)))
+        if output == "python":
+            return [x for r in res for x in r]
+        import numpy
+        return numpy.concatenate(res)
+
+    def sorted(self, iterable, key=None, bint reverse=False, bint unique=False,
+               bint universal=False, bint indices=False):
+        """
+        Return a list with the items of ``iterable`` in sorted order.
+
+        Unlike the builtin :func:`sorted`, all comparisons are done by
+        PARI in a single call: the items (or their keys) are converted
+        to PARI and sorted by ``gen_indexsort``. The sort is stable.
+
+        INPUT:
+
+        - ``iterable`` -- the items to sort, which are returned
+          unchanged
+
+        - ``key`` -- (optional) a function computing from each item
+          the key to compare, which must be convertible to PARI
+
+        - ``reverse`` -- (default: ``False``) sort in decreasing order
+
+        - ``unique`` -- (default: ``False``) keep only the first of
+          equal items
+
+        - ``universal`` -- (default: ``False``) if ``False``, compare
+          like ``vecsort`` using ``lexcmp``, which compares numbers by
+          value and vectors lexicographically. If ``True``, use the
+          total order ``cmp_universal`` of PARI sets, which can compare
+          any objects (for example polynomials) but which is not
+          compatible with the ordering of real numbers.
+
+        - ``indices`` -- (default: ``False``) return the permutation,
+          as a list of indices starting at 0, instead of the items
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.sorted([3, pari(1), "1/2", 2.5])
+        ['1/2', 1, 2.5, 3]
+        >>> pari.sorted([3, 1, 2, 1], reverse=True, indices=True)
+        [0, 2, 1, 3]
+        >>> pari.sorted([3, 1, 3, 1, 2], unique=True)
+        [1, 2, 3]
+        >>> pari.sorted(["ab", "b", "c"], key=len)
+        ['b', 'c', 'ab']
+        >>> pari.sorted([[1, 3], [2, 0], [1]])
+        [[1], [1, 3], [2, 0]]
+        >>> P = pari("[x^2 + 1, x, x^3, x]")
+        >>> pari.sorted(P, universal=True, unique=True)
+        [x, x^2 + 1, x^3]
+        >>> pari.sorted(P)
+        Traceback (most recent call last):
+        ...
+        PariError: forbidden comparison t_POL , t_POL
+        >>> pari.sorted([])
+        []
+        """
+        cdef list items = list(iterable)
+        cdef list keys = reduction_items(items if key is None else map(key, items))
+        cdef Gen perm = sort_permutation(keys, reverse, unique, universal)
+        cdef Py_ssize_t i, n = lg(perm.g) - 1
+        if indices:
+            return [perm.g[i] - 1 for i in range(1, n + 1)]
+        return [items[perm.g[i] - 1] for i in range(1, n + 1)]
+
+    def dedupe(self, iterable, key=None, bint universal=False):
+        """
+        Return a list with the items of ``iterable`` without
+        duplicates, keeping the first occurrence of equal items in
+        their original order.
+
+        Items are compared by PARI after sorting them, see
+        :meth:`sorted` for the meaning of ``key`` and ``universal``.
+
+        Examples:
+
+        >>> import cypari2
+        >>> pari = cypari2.Pari()
+        >>> pari.dedupe([3, 1, "6/2", 1.0, 2])
+        [3, 1, 2]
+        >>> pari.dedupe(["x", "y", "x"], universal=True)
+        ['x', 'y']
+        >>> pari.dedupe(range(10), key=lambda n: n % 3)
+        [0, 1, 2]
+        """
+        cdef list items = list(iterable)
+        cdef list keys = reduction_items(items if key is None else map(key, items))
+        cdef Gen perm = sort_permutation(keys, False, True, universal)
+        sig_on()
+        vecsmall_sort(perm.g)
+        sig_off()
+        cdef Py_ssize_t i, n = lg(perm.g) - 1
+        return [items[perm.g[i] - 1] for i in range(1, n + 1)]
+
+
     def genus2red(self, P, p=None):
         r"""
         Let `P` be a polynomial with integer coefficients.
@@ -1334,6 +2322,74 @@ cdef class Pari(Pari_auto):
         return new_gen(gtolist(t0.g))
 
 
+
+cdef list reduction_items(iterable):
+    """
+    Return the items of ``iterable`` as a list for
+    :func:`item_to_GEN`: Python ``int`` and ``float`` are kept since
+    they can be converted directly on the PARI stack, other objects are
+    converted to :class:`Gen`.
+    """
+    return [x if type(x) is int or type(x) is float else objtogen(x)
+            for x in iterable]
+
+
+cdef GEN item_to_GEN(x) noexcept:
+    """
+    Convert an item of a list returned by :func:`reduction_items` to a
+    ``GEN``. A :class:`Gen` is not copied, so it must be kept alive
+    while the result is used.
+
+    This must be called inside ``sig_on()``.
+    """
+    if type(x) is int:
+        return PyLong_AS_GEN(<py_long>x)
+    elif type(x) is float:
+        return double_to_REAL(PyFloat_AS_DOUBLE(x))
+    return (<Gen>x).g
+
+
+cdef GEN items_to_vec(list items) noexcept:
+    """
+    Return a ``t_VEC`` with the items of a list returned by
+    :func:`reduction_items`, converted by :func:`item_to_GEN`.
+
+    This must be called inside ``sig_on()``.
+    """
+    cdef Py_ssize_t i, n = len(items)
+    cdef GEN v = cgetg(n + 1, t_VEC)
+    for i in range(n):
+        set_gel(v, i + 1, item_to_GEN(items[i]))
+    return v
+
+
+cdef int cmp_reverse(void* cmp, GEN x, GEN y) noexcept:
+    """
+    Compare ``y`` and ``x`` with the comparison function ``cmp``, as
+    ``cmp_nodata`` with the arguments swapped.
+    """
+    return (<int (*)(GEN, GEN) noexcept>cmp)(y, x)
+
+
+cdef Gen sort_permutation(list keys, bint reverse, bint unique, bint universal):
+    """
+    Return the permutation (as ``t_VECSMALL``) sorting a list
+    returned by :func:`reduction_items`. See :meth:`Pari.sorted`.
+    """
+    cdef void* cmp = <void*>(cmp_universal if universal else lexcmp)
+    cdef int (*f)(void*, GEN, GEN) noexcept
+    f = cmp_reverse if reverse else cmp_nodata
+    sig_on()
+    cdef GEN x = items_to_vec(keys)
+    if unique:
+        return new_gen(gen_indexsort_uniq(x, cmp, f))
+    return new_gen(gen_indexsort(x, cmp, f))
+
+
+# Cache of the numbers of variables given by name to get_var()
+cdef dict var_cache = {}
+
+
 cdef long get_var(v) except -2:
     """
     Convert ``v`` into a PARI variable number.
@@ -1393,10 +2449,17 @@ cdef long get_var(v) except -2:
             return -1
         else:
             return varno
+    # Variables are never removed, so the numbers of named
+    # variables can be cached
+    cached = var_cache.get(v) if type(v) is str else None
+    if cached is not None:
+        return cached
     cdef bytes s = to_bytes(v)
     sig_on()
     varno = fetch_user_var(s)
     sig_off()
+    if type(v) is str:
+        var_cache[v] = varno
     return varno
 
 
@@ -4656,6 +4656,7 @@ cdef extern from *:     # PARI headers already included by types.pxd
     ulong  udiviu_rem(GEN n, ulong d, ulong *r)
     ulong  udivuu_rem(ulong x, ulong y, ulong *r)
     ulong  umodi2n(GEN x, long n)
+    void   set_avma(ulong av)
     void   setabssign(GEN x)
     void   shift_left(GEN z2, GEN z1, long min, long M, ulong f, ulong sh)
     void   shift_right(GEN z2, GEN z1, long min, long M, ulong f, ulong sh)
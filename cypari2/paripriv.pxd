@@ -26,8 +26,15 @@ cdef extern from "pari/paripriv.h":
 
     extern gp_data* GP_DATA
 
+    enum: EpNEW, EpVAR
+    long EpVALENCE(entree* ep)
+    entree* initial_value(entree* ep)
+
 # In older versions of PARI, this is declared in the private
 # non-installed PARI header file "anal.h". More recently, this is
 # declared in "paripriv.h". Since a double declaration does not hurt,
 # we declare it here regardless.
 cdef extern const char* closure_func_err()
+
+# This is declared in the private non-installed PARI header file "anal.h"
+cdef extern entree** varentries
@@ -0,0 +1,26 @@
+from libc.stdint cimport int64_t
+from .types cimport pari_sp
+
+
+# State of one call of an auto-generated method, see profile_start()
+cdef struct profile_frame:
+    int64_t start     # time at the start of the call
+    int64_t callback  # time spent in Python callbacks before the call
+    pari_sp av        # avma at the start of the call
+
+cdef bint* get_profiling_flag() noexcept
+cdef bint profile_start(profile_frame* frame) noexcept
+cdef void profile_stop(profile_frame* frame, Py_ssize_t function) noexcept
+cdef int64_t callback_start() noexcept
+cdef void callback_stop(int64_t start) noexcept
+
+cdef int set_function_names(tuple names) except -1
+cdef void set_profiling(bint enable) noexcept
+cdef bint get_profiling() noexcept
+cdef dict get_profile_stats()
+cdef void reset_profile_stats() noexcept
+
+
+cdef class Profiling:
+    cdef bint reset
+    cdef bint previous
@@ -0,0 +1,200 @@
+"""
+Profiling of PARI library calls
+*******************************
+
+When profiling is enabled with :meth:`Pari.set_profiling` or
+:meth:`Pari.profiling`, the auto-generated methods of :class:`Gen` and
+:class:`Pari` (like ``pari.gcd()`` or ``x.factor()``) record, for each
+PARI function:
+
+- the number of calls
+
+- the total and maximal wall time of the calls
+
+- the maximal number of bytes of the PARI stack used by a call, that is
+  the size of its result and of the garbage left by the PARI function
+
+- the time spent in Python functions called by PARI (for example the
+  closures given to ``pari.apply()``), which is included in the wall
+  time
+
+Only the PARI library call is timed, not the conversion of the
+arguments and of the result. Calls which raise an error, the batch
+methods (see :meth:`Pari.batch`) and the methods of :class:`Gen`
+which are not auto-generated (like :meth:`Gen.factor`) are not
+recorded. When profiling is
+disabled, the only overhead for a call is testing the flag returned by
+``get_profiling_flag()``, which the modules calling PARI keep a
+pointer to.
+
+The results are given by :meth:`Pari.profile_stats` and
+:meth:`Pari.profile_report`.
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+from libc.string cimport memset
+from cpython.time cimport perf_counter_ns
+from cysignals.memory cimport check_calloc, sig_free
+
+from .paridecl cimport avma
+
+
+# Counters for one PARI function
+cdef struct function_stats:
+    size_t calls        # number of calls
+    int64_t total_ns    # total time of the calls
+    int64_t max_ns      # maximal time of a call
+    size_t max_stack    # maximal PARI stack bytes used by a call
+    int64_t callback_ns # total time in Python callbacks
+
+cdef bint enabled = False
+
+# Names of the PARI functions, indexed like the counters in stats.
+# These are set by the auto-generated code in pari_instance.
+cdef tuple function_names = ()
+cdef function_stats* stats = NULL
+cdef Py_ssize_t nstats = 0
+
+# Total time spent in Python callbacks
+cdef int64_t callback_ns = 0
+
+
+cdef bint* get_profiling_flag() noexcept:
+    """
+    Return a pointer to the flag telling whether profiling is enabled,
+    such that other modules can test it without a function call.
+    """
+    return &enabled
+
+
+cdef bint profile_start(profile_frame* frame) noexcept:
+    """
+    Start profiling a call of an auto-generated method. Return whether
+    profiling is enabled: only then ``profile_stop`` must be called.
+    """
+    if not enabled:
+        return False
+    frame.av = avma
+    frame.callback = callback_ns
+    frame.start = perf_counter_ns()
+    return True
+
+
+cdef void profile_stop(profile_frame* frame, Py_ssize_t function) noexcept:
+    """
+    Record a call of the PARI function with index ``function`` in
+    ``function_names``, started by ``profile_start(frame)``.
+    """
+    cdef int64_t t = perf_counter_ns() - frame.start
+    if function < 0 or function >= nstats:
+        return
+    cdef function_stats* s = &stats[function]
+    s.calls += 1
+    s.total_ns += t
+    if t > s.max_ns:
+        s.max_ns = t
+    if frame.av > avma and frame.av - avma > s.max_stack:
+        s.max_stack = frame.av - avma
+    s.callback_ns += callback_ns - frame.callback
+
+
+cdef int64_t callback_start() noexcept:
+    """
+    Return the start time of a Python callback or 0 if profiling is
+    disabled.
+    """
+    if not enabled:
+        return 0
+    return perf_counter_ns()
+
+
+cdef void callback_stop(int64_t start) noexcept:
+    """
+    Record the time of a Python callback started at ``start``.
+    """
+    global callback_ns
+    if start:
+        callback_ns += perf_counter_ns() - start
+
+
+cdef int set_function_names(tuple names) except -1:
+    """
+    Set the names of the profiled PARI functions and reset the
+    counters.
+    """
+    global function_names, stats, nstats
+    cdef function_stats* new_stats = <function_stats*>check_calloc(
+            max(len(names), 1), sizeof(function_stats))
+    sig_free(stats)
+    stats = new_stats
+    nstats = len(names)
+    function_names = names
+    return 0
+
+
+cdef void set_profiling(bint enable) noexcept:
+    """
+    Enable or disable profiling.
+    """
+    global enabled
+    enabled = enable
+
+
+cdef bint get_profiling() noexcept:
+    """
+    Return whether profiling is enabled.
+    """
+    return enabled
+
+
+cdef dict get_profile_stats():
+    """
+    Return the counters of the PARI functions which were called, see
+    :meth:`Pari.profile_stats`.
+    """
+    cdef dict res = {}
+    cdef function_stats* s
+    cdef Py_ssize_t i
+    for i in range(nstats):
+        s = &stats[i]
+        if not s.calls:
+            continue
+        res[function_names[i]] = {"calls": s.calls,
+                                  "time": s.total_ns * 1e-9,
+                                  "max_time": s.max_ns * 1e-9,
+                                  "max_stack": s.max_stack,
+                                  "callback_time": s.callback_ns * 1e-9}
+    return res
+
+
+cdef void reset_profile_stats() noexcept:
+    """
+    Reset all counters to zero.
+    """
+    if stats is not NULL:
+        memset(stats, 0, nstats * sizeof(function_stats))
+
+
+cdef class Profiling:
+    r"""
+    Context manager enabling profiling, see :meth:`Pari.profiling`.
+    """
+    def __init__(self, bint reset=True):
+        self.reset = reset
+
+    def __enter__(self):
+        if self.reset:
+            reset_profile_stats()
+        self.previous = get_profiling()
+        set_profiling(True)
+        return self
+
+    def __exit__(self, *args):
+        set_profiling(self.previous)
@@ -7,19 +7,39 @@ cdef new_gens2(GEN x, GEN y)
 cdef Gen new_gen_noclear(GEN x)
 cdef Gen clone_gen(GEN x)
 cdef Gen clone_gen_noclear(GEN x)
+cdef Gen borrowed_gen(GEN x)
+cdef int own_borrowed_gen(Gen z) except -1
 
 cdef void clear_stack() noexcept
 cdef void reset_avma() noexcept
 
 cdef void remove_from_pari_stack(Gen self) noexcept
 cdef int move_gens_to_heap(pari_sp lim) except -1
+cdef int promote_gens() except -1
+cdef size_t release_stack_gens(Gen bottom) except? -1
+cdef int set_promotion_policy(double threshold, size_t max_gens,
+                              size_t max_bytes, bint generational) except -1
+cdef dict get_promotion_policy()
 
 cdef int before_resize() except -1
 cdef int set_pari_stack_size(size_t size, size_t sizemax) except -1
 cdef void after_resize() noexcept
 
+cdef void release_clone(GEN address) noexcept
+cdef size_t flush_release_queue() noexcept
+cdef int set_release_queue_size(size_t size) except -1
+cdef size_t get_release_queue_size() noexcept
+cdef void count_clone_gen() noexcept
+cdef dict get_memory_stats()
+cdef void reset_memory_stats() noexcept
+
 
 cdef class DetachGen:
     cdef source
 
     cdef GEN detach(self) except NULL
+
+
+cdef class Arena:
+    cdef Gen bottom
+    cdef readonly size_t promoted
@@ -25,9 +25,12 @@ from cysignals.signals cimport (sig_on, sig_off, sig_block, sig_unblock,
 from .gen cimport Gen, Gen_new
 from .paridecl cimport (avma, pari_mainstack, gnil, gcopy,
                         is_universal_constant, is_on_stack,
-                        isclone, gclone, gclone_refc,
+                        isclone, gclone, gclone_refc, gunclone_deep, gsizebyte,
                         paristack_setsize)
 
+from libc.string cimport memset
+from cysignals.memory cimport check_reallocarray, sig_free
+
 from warnings import warn
 
 
@@ -46,6 +49,69 @@ cdef Gen top_of_stack = Gen_new(gnil, NULL)
 # we update stackbottom in Gen.__dealloc__
 cdef PyObject* stackbottom = <PyObject*>top_of_stack
 
+# Policy for moving Gens from the PARI stack to the heap, see
+# promote_gens() and set_promotion_policy(). Promotion is triggered
+# when the fraction promotion_threshold of the PARI stack is in use.
+# At most promotion_max_gens Gens or promotion_max_bytes bytes are
+# promoted at a time (0 means no limit). If promotion_generational is
+# set, the oldest Gens are promoted first, otherwise the newest.
+cdef double promotion_threshold = 0.5
+cdef size_t promotion_max_gens = 0
+cdef size_t promotion_max_bytes = 0
+cdef bint promotion_generational = False
+
+# After a partial run in generational mode, the oldest Gens have been
+# promoted but the PARI stack usage did not decrease. The next run is
+# delayed until this many bytes of the PARI stack are in use.
+cdef size_t promotion_delay = 0
+
+# Snapshot of the Gens on the PARI stack for move_oldest_gens_to_heap(),
+# from the oldest to the newest, as borrowed references. The entries
+# from snapshot_pos on have not been processed yet. An entry is only
+# valid if no Gen at or above its address was removed from the PARI
+# stack since the snapshot was taken: snapshot_popped is the highest
+# address of such a removed Gen.
+cdef struct gen_ref:
+    PyObject* gen
+    pari_sp sp
+
+cdef gen_ref* snapshot = NULL
+cdef size_t snapshot_len = 0
+cdef size_t snapshot_pos = 0
+cdef pari_sp snapshot_popped = 0
+
+
+# Counters for Pari.memory_stats(). The cumulative counters are in
+# a struct such that they can easily be reset.
+cdef struct memory_counters:
+    size_t promotions          # runs moving at least one Gen to the heap
+    size_t promoted_gens       # total Gens moved to the heap
+    size_t promoted_bytes      # total size of the Gens moved to the heap
+    size_t last_promoted_gens  # Gens moved in the last run
+    size_t last_promoted_bytes # bytes moved in the last run
+    size_t max_promoted_bytes  # maximum bytes moved in one run
+    size_t dropped_gens        # dead Gens unlinked without cloning
+    size_t clone_releases      # clones released by deallocated Gens
+    size_t clone_flushes       # flushes of the deferred release queue
+    size_t stack_resizes       # reallocations of the PARI stack
+    size_t leaks               # "cypari2 leaked N bytes" events
+    size_t leaked_bytes        # total bytes leaked
+
+cdef memory_counters counters
+
+# Current number of Gens on the PARI stack (the length of the linked
+# list starting at stackbottom) and of Gens referring to clones.
+cdef size_t live_stack_gens = 0
+cdef size_t live_clone_gens = 0
+
+# Queue of clones whose release is deferred, see
+# Pari.deferred_release(). The queue holds at most release_queue_size
+# addresses and is flushed when full. If release_queue_size is 0,
+# clones are released immediately.
+cdef GEN* release_queue = NULL
+cdef size_t release_queue_size = 0
+cdef size_t release_queue_len = 0
+
 
 cdef void remove_from_pari_stack(Gen self) noexcept:
     global avma, stackbottom
@@ -62,8 +128,14 @@ cdef void remove_from_pari_stack(Gen self) noexcept:
             print(f"Expected: 0x{self.sp():x}")
             print(f"Actual:   0x{avma:x}")
         else:
+            counters.leaks += 1
+            counters.leaked_bytes += self.sp() - avma
             warn(f"cypari2 leaked {self.sp() - avma} bytes on the PARI stack",
                  RuntimeWarning, stacklevel=2)
+    global live_stack_gens, snapshot_popped
+    live_stack_gens -= 1
+    if self.sp() > snapshot_popped:
+        snapshot_popped = self.sp()
     n = self.next
     stackbottom = <PyObject*>n
     self.next = None
@@ -75,7 +147,7 @@ cdef inline Gen Gen_stack_new(GEN x):
     Allocate and initialize a new instance of ``Gen`` wrapping
     a GEN on the PARI stack.
     """
-    global stackbottom
+    global stackbottom, live_stack_gens
     # n = <Gen>stackbottom must be done BEFORE calling Gen_new()
     # since Gen_new may invoke gc.collect() which would mess up
     # the PARI stack.
@@ -83,6 +155,7 @@ cdef inline Gen Gen_stack_new(GEN x):
     z = Gen_new(x, <GEN>avma)
     z.next = n
     stackbottom = <PyObject*>z
+    live_stack_gens += 1
     sz = z.sp()
     sn = n.sp()
     if sz > sn:
@@ -111,6 +184,58 @@ cdef void clear_stack() noexcept:
     reset_avma()
 
 
+cdef inline size_t gen_bytes(Gen z) noexcept:
+    """
+    Return the size in bytes of the object of ``z``, which is what
+    moving it to the heap copies.
+
+    This is not the distance to the next ``Gen`` on the PARI stack:
+    after :func:`move_oldest_gens_to_heap`, that also includes the
+    memory of older Gens which were already moved.
+    """
+    return gsizebyte(z.g)
+
+
+cdef void record_promotion(size_t ngens, size_t nbytes) noexcept:
+    """
+    Update the counters after moving ``ngens`` Gens using ``nbytes``
+    bytes of the PARI stack to the heap.
+    """
+    if not ngens:
+        return
+    counters.promotions += 1
+    counters.promoted_gens += ngens
+    counters.promoted_bytes += nbytes
+    counters.last_promoted_gens = ngens
+    counters.last_promoted_bytes = nbytes
+    if nbytes > counters.max_promoted_bytes:
+        counters.max_promoted_bytes = nbytes
+
+
+cdef int move_gen_to_heap(Gen current) except -1:
+    """
+    Move ``current``, which must be the Gen on the bottom of the PARI
+    stack, to the heap.
+    """
+    global live_clone_gens
+    sig_on()
+    current.g = gclone(current.g)
+    sig_block()
+    remove_from_pari_stack(current)
+    sig_unblock()
+    sig_off()
+    # The .address attribute can only be updated now because it is
+    # needed in remove_from_pari_stack(). This means that the object
+    # is temporarily in an inconsistent state but this does not
+    # matter since .address is normally not used.
+    #
+    # The more important .g attribute is updated correctly before
+    # remove_from_pari_stack(). Therefore, the object can be used
+    # normally regardless of what happens to the PARI stack.
+    current.address = current.g
+    live_clone_gens += 1
+
+
 cdef int move_gens_to_heap(pari_sp lim) except -1:
     """
     Move some/all Gens from the PARI stack to the heap.
@@ -118,23 +243,204 @@ cdef int move_gens_to_heap(pari_sp lim) except -1:
     If lim == -1, move everything. Otherwise, keep moving as long as
     avma <= lim.
     """
+    cdef size_t ngens = 0
+    cdef size_t nbytes = 0
     while avma <= lim and stackbottom is not <PyObject*>top_of_stack:
         current = <Gen>stackbottom
-        sig_on()
-        current.g = gclone(current.g)
-        sig_block()
-        remove_from_pari_stack(current)
-        sig_unblock()
-        sig_off()
-        # The .address attribute can only be updated now because it is
-        # needed in remove_from_pari_stack(). This means that the object
-        # is temporarily in an inconsistent state but this does not
-        # matter since .address is normally not used.
-        #
-        # The more important .g attribute is updated correctly before
-        # remove_from_pari_stack(). Therefore, the object can be used
-        # normally regardless of what happens to the PARI stack.
-        current.address = current.g
+        nbytes += gen_bytes(current)
+        move_gen_to_heap(current)
+        ngens += 1
+    record_promotion(ngens, nbytes)
+
+
+cdef int move_newest_gens_to_heap(size_t max_gens, size_t max_bytes) except -1:
+    """
+    Move the newest Gens from the PARI stack to the heap, until either
+    ``max_gens`` Gens or Gens of total size ``max_bytes`` have been
+    moved. A limit of 0 means no limit.
+    """
+    cdef size_t ngens = 0
+    cdef size_t nbytes = 0
+    while stackbottom is not <PyObject*>top_of_stack:
+        current = <Gen>stackbottom
+        nbytes += gen_bytes(current)
+        move_gen_to_heap(current)
+        ngens += 1
+        if max_gens and ngens >= max_gens:
+            break
+        if max_bytes and nbytes >= max_bytes:
+            break
+    record_promotion(ngens, nbytes)
+
+
+cdef int take_snapshot() except -1:
+    """
+    Record all Gens on the PARI stack in ``snapshot``, oldest first.
+    """
+    global snapshot, snapshot_len, snapshot_pos, snapshot_popped
+    cdef size_t n = 0
+    cdef PyObject* z = stackbottom
+    while z is not <PyObject*>top_of_stack:
+        n += 1
+        z = <PyObject*>(<Gen>z).next
+    snapshot = <gen_ref*>check_reallocarray(snapshot, max(n, 1), sizeof(gen_ref))
+    snapshot_len = n
+    snapshot_pos = 0
+    snapshot_popped = 0
+    z = stackbottom
+    while n:
+        n -= 1
+        snapshot[n].gen = z
+        snapshot[n].sp = (<Gen>z).sp()
+        z = <PyObject*>(<Gen>z).next
+    return 0
+
+
+cdef size_t move_oldest_gens_to_heap(size_t max_gens, size_t max_bytes) except? -1:
+    """
+    Move the oldest Gens from the PARI stack to the heap, until either
+    ``max_gens`` Gens or Gens of total size ``max_bytes`` have been
+    processed. A limit of 0 means no limit. Return the total size of
+    the processed Gens.
+
+    Unlike :func:`move_newest_gens_to_heap`, this does not touch the
+    younger Gens. The promoted Gens are unlinked from the Gen linked
+    list, so their memory on the PARI stack becomes part of the next
+    younger Gen and it is reclaimed as soon as that one is
+    deallocated. Like in a generational garbage collector, this
+    prevents long-lived Gens from pinning the PARI stack.
+
+    Old Gens which are only referenced by the linked list are dead:
+    those are simply unlinked without copying them to the heap.
+
+    The oldest Gens are found in ``snapshot``, such that a run only
+    processes the Gens within its budget. The snapshot is taken again
+    when it is exhausted or no longer valid.
+    """
+    global live_stack_gens, live_clone_gens, snapshot_pos, snapshot_len
+    cdef size_t ngens = 0
+    cdef size_t nbytes = 0
+    cdef size_t ncloned = 0
+    cdef size_t nclonedbytes = 0
+    cdef size_t sz
+    cdef bint retried = False
+    cdef Gen z, younger
+    while True:
+        if snapshot_pos + 1 >= snapshot_len:
+            if snapshot_pos < snapshot_len and snapshot[snapshot_pos].gen is stackbottom:
+                # All older Gens are gone, move the newest one too
+                z = <Gen>stackbottom
+                sz = gen_bytes(z)
+                nbytes += sz
+                move_gen_to_heap(z)
+                ncloned += 1
+                nclonedbytes += sz
+                snapshot_len = 0
+                break
+            if retried or ngens:
+                snapshot_len = 0
+                break
+            take_snapshot()
+            retried = True
+            continue
+        # The entry younger than the next Gen to process must be valid
+        # and still point to it
+        if (snapshot[snapshot_pos + 1].sp <= snapshot_popped or
+                (<Gen>snapshot[snapshot_pos + 1].gen).next is not
+                <Gen>snapshot[snapshot_pos].gen):
+            snapshot_len = 0
+            if retried or ngens:
+                break
+            take_snapshot()
+            retried = True
+            continue
+
+        z = <Gen>snapshot[snapshot_pos].gen
+        younger = <Gen>snapshot[snapshot_pos + 1].gen
+        sz = gen_bytes(z)
+        nbytes += sz
+        # The Gen is referenced by z and by younger.next
+        if _Py_REFCNT(<PyObject*>z) == 2:
+            # Make the Gen look like a constant, such that deallocating
+            # it does nothing
+            z.address = NULL
+            counters.dropped_gens += 1
+        else:
+            sig_on()
+            z.g = gclone(z.g)
+            sig_off()
+            z.address = z.g
+            live_clone_gens += 1
+            ncloned += 1
+            nclonedbytes += sz
+        live_stack_gens -= 1
+        younger.next = z.next
+        z.next = None
+        z = None
+        younger = None
+        snapshot_pos += 1
+        ngens += 1
+        if max_gens and ngens >= max_gens:
+            break
+        if max_bytes and nbytes >= max_bytes:
+            break
+    record_promotion(ncloned, nclonedbytes)
+    return nbytes
+
+
+cdef int promote_gens() except -1:
+    """
+    Move Gens from the PARI stack to the heap according to the
+    promotion policy.
+
+    In generational mode, if the PARI stack is nearly full anyway
+    (half-way between the threshold and completely full), move
+    everything.
+    """
+    global promotion_delay
+    cdef size_t used, limit, nbytes
+    if promotion_generational:
+        used = pari_mainstack.top - avma
+        limit = <size_t>((1 + promotion_threshold) / 2 * pari_mainstack.size)
+        if used < limit:
+            nbytes = move_oldest_gens_to_heap(promotion_max_gens, promotion_max_bytes)
+            # Run again once the PARI stack has grown by as much as
+            # this run processed (or at least 1/64 of its size), or
+            # when it is nearly full
+            promotion_delay = min(used + max(nbytes, pari_mainstack.size // 64), limit)
+            return 0
+    elif promotion_max_gens or promotion_max_bytes:
+        return move_newest_gens_to_heap(promotion_max_gens, promotion_max_bytes)
+    return move_gens_to_heap(-1)
+
+
+cdef int set_promotion_policy(double threshold, size_t max_gens,
+                              size_t max_bytes, bint generational) except -1:
+    """
+    Set the policy for moving Gens from the PARI stack to the heap,
+    see :meth:`Pari.promotion_policy`.
+    """
+    if not (0 < threshold <= 1):
+        raise ValueError(f"promotion threshold must be in (0, 1], not {threshold}")
+    global promotion_threshold, promotion_max_gens, promotion_max_bytes
+    global promotion_generational
+    promotion_threshold = threshold
+    promotion_max_gens = max_gens
+    promotion_max_bytes = max_bytes
+    promotion_generational = generational
+    global promotion_delay
+    promotion_delay = 0
+
+
+cdef dict get_promotion_policy():
+    """
+    Return the policy for moving Gens from the PARI stack to the heap
+    as a dict.
+    """
+    return {"threshold": promotion_threshold,
+            "max_gens": promotion_max_gens,
+            "max_bytes": promotion_max_bytes,
+            "generational": promotion_generational}
 
 
 cdef int before_resize() except -1:
@@ -164,6 +470,104 @@ cdef void after_resize() noexcept:
     This must be called after reallocating the PARI stack
     """
     top_of_stack.address = <GEN>pari_mainstack.top
+    counters.stack_resizes += 1
+
+
+cdef void release_clone(GEN address) noexcept:
+    """
+    Release the clone at ``address``, which was referenced by a
+    :class:`Gen` being deallocated.
+    """
+    global live_clone_gens, release_queue_len
+    live_clone_gens -= 1
+    counters.clone_releases += 1
+    if not release_queue_size:
+        gunclone_deep(address)
+        return
+    release_queue[release_queue_len] = address
+    release_queue_len += 1
+    if release_queue_len == release_queue_size:
+        flush_release_queue()
+
+
+cdef size_t flush_release_queue() noexcept:
+    """
+    Release all clones in the deferred release queue. Return the number
+    of clones released.
+    """
+    global release_queue_len
+    cdef size_t i, n = release_queue_len
+    if not n:
+        return 0
+    # Reset the length first, such that the queue stays consistent
+    # if gunclone_deep() is interrupted
+    release_queue_len = 0
+    for i in range(n):
+        gunclone_deep(release_queue[i])
+    counters.clone_flushes += 1
+    return n
+
+
+cdef int set_release_queue_size(size_t size) except -1:
+    """
+    Flush the deferred release queue and change its size. A size of 0
+    disables deferred release.
+    """
+    global release_queue, release_queue_size
+    flush_release_queue()
+    if size == release_queue_size:
+        return 0
+    if size:
+        release_queue = <GEN*>check_reallocarray(release_queue, size, sizeof(GEN))
+    else:
+        sig_free(release_queue)
+        release_queue = NULL
+    release_queue_size = size
+    return 0
+
+
+cdef size_t get_release_queue_size() noexcept:
+    return release_queue_size
+
+
+cdef void count_clone_gen() noexcept:
+    """
+    Account for a new :class:`Gen` referring to a clone which was not
+    created in this module.
+    """
+    global live_clone_gens
+    live_clone_gens += 1
+
+
+cdef dict get_memory_stats():
+    """
+    Return a snapshot of the memory counters as a dict, see
+    :meth:`Pari.memory_stats`.
+    """
+    return {"stack_gens": live_stack_gens,
+            "clone_gens": live_clone_gens,
+            "pending_clones": release_queue_len,
+            "stack_used": pari_mainstack.top - avma,
+            "stack_size": pari_mainstack.size,
+            "promotions": counters.promotions,
+            "promoted_gens": counters.promoted_gens,
+            "promoted_bytes": counters.promoted_bytes,
+            "last_promoted_gens": counters.last_promoted_gens,
+            "last_promoted_bytes": counters.last_promoted_bytes,
+            "max_promoted_bytes": counters.max_promoted_bytes,
+            "dropped_gens": counters.dropped_gens,
+            "clone_releases": counters.clone_releases,
+            "clone_flushes": counters.clone_flushes,
+            "stack_resizes": counters.stack_resizes,
+            "leaks": counters.leaks,
+            "leaked_bytes": counters.leaked_bytes}
+
+
+cdef void reset_memory_stats() noexcept:
+    """
+    Reset the cumulative memory counters to zero.
+    """
+    memset(&counters, 0, sizeof(counters))
 
 
 cdef Gen new_gen(GEN x):
@@ -206,18 +610,24 @@ cdef Gen new_gen_noclear(GEN x):
             return Gen_new(x, NULL)
         elif isclone(x):
             gclone_refc(x)
+            count_clone_gen()
             return Gen_new(x, x)
         raise SystemError("new_gen() argument not on PARI stack, not on PARI heap and not a universal constant")
 
     z = Gen_stack_new(x)
 
-    # If we used over half of the PARI stack, move all Gens to the heap
-    if (pari_mainstack.top - avma) >= pari_mainstack.size // 2:
-        if sig_on_count == 0:
+    # If we used too much of the PARI stack (by default: over half of
+    # it), move Gens to the heap
+    global promotion_delay
+    cdef size_t used = pari_mainstack.top - avma
+    if used >= promotion_threshold * pari_mainstack.size:
+        if used >= promotion_delay and sig_on_count == 0:
             try:
-                move_gens_to_heap(-1)
+                promote_gens()
             except MemoryError:
                 pass
+    elif promotion_delay:
+        promotion_delay = 0
 
     return z
 
@@ -225,14 +635,103 @@ cdef Gen new_gen_noclear(GEN x):
 cdef Gen clone_gen(GEN x):
     x = gclone(x)
     clear_stack()
+    count_clone_gen()
     return Gen_new(x, x)
 
 
 cdef Gen clone_gen_noclear(GEN x):
     x = gclone(x)
+    count_clone_gen()
     return Gen_new(x, x)
 
 
+cdef Gen borrowed_gen(GEN x):
+    """
+    Create a new ``Gen`` wrapping ``x`` without copying it.
+
+    The ``Gen`` does not own ``x``, so ``x`` must remain valid as long
+    as the ``Gen`` is used, unless :func:`own_borrowed_gen` is called.
+    """
+    return Gen_new(x, NULL)
+
+
+cdef int own_borrowed_gen(Gen z) except -1:
+    """
+    If ``z`` was created by :func:`borrowed_gen`, replace its ``GEN``
+    by a clone owned by ``z``. Otherwise, do nothing.
+    """
+    if z.address is not NULL or z.next is not None or is_universal_constant(z.g):
+        return 0
+    z.g = gclone(z.g)
+    z.address = z.g
+    count_clone_gen()
+
+
+cdef size_t release_stack_gens(Gen bottom) except? -1:
+    """
+    Remove all Gens newer than ``bottom`` from the PARI stack.
+
+    Gens which are still referenced are moved to the heap. The others
+    are released when the newer Gen holding on to them is removed.
+    Return the number of Gens moved to the heap.
+
+    If ``bottom`` is no longer on the PARI stack, everything is removed.
+    """
+    cdef size_t ngens = 0
+    cdef size_t nbytes = 0
+    while stackbottom is not <PyObject*>bottom and stackbottom is not <PyObject*>top_of_stack:
+        current = <Gen>stackbottom
+        nbytes += gen_bytes(current)
+        move_gen_to_heap(current)
+        ngens += 1
+    record_promotion(ngens, nbytes)
+    return ngens
+
+
+@cython.final
+cdef class Arena:
+    """
+    Context manager reclaiming the PARI stack used inside a block,
+    see :meth:`Pari.arena`.
+
+    Examples:
+
+    >>> import cypari2
+    >>> pari = cypari2.Pari()
+    >>> from cypari2.stack import Arena
+    >>> with Arena() as arena:
+    ...     x = pari(2)**64
+    ...     y = x + 1
+    ...     z = y * x
+    ...     del z
+    >>> y
+    18446744073709551617
+    >>> arena.promoted
+    2
+
+    An arena cannot be entered twice at the same time:
+
+    >>> with arena:
+    ...     with arena:
+    ...         pass
+    Traceback (most recent call last):
+    ...
+    RuntimeError: arena is already active
+    """
+    def __enter__(self):
+        if self.bottom is not None:
+            raise RuntimeError("arena is already active")
+        self.bottom = <Gen>stackbottom
+        self.promoted = 0
+        return self
+
+    def __exit__(self, *exc):
+        bottom = self.bottom
+        self.bottom = None
+        self.promoted = release_stack_gens(bottom)
+        return False
+
+
 @cython.no_gc
 cdef class DetachGen:
     """
@@ -0,0 +1,491 @@
+"""
+On-disk storage of many PARI objects
+************************************
+
+A :class:`GenStore` is a file containing a sequence of PARI objects in
+the binary format of :func:`~cypari2.convert.gen_to_bytes`, followed by
+an index of offsets. Readers map the file in memory: opening a store
+only reads the fixed-size header and trailer and getting an entry only
+copies that entry from the file to the PARI stack. So a large dataset
+can be opened instantly and accessed randomly, without parsing it.
+
+The file consists of
+
+- a header of 16 bytes: the magic bytes b"PARIGENS", the format
+  version, sizeof(long), the byte order (b"<" or b">") and 5 zero bytes
+- the entries, in the format of :func:`~cypari2.convert.gen_to_bytes`
+- the index: 2n offsets (unsigned 64-bit integers in the native byte
+  order) where entry i is stored between offsets 2i and 2i + 1
+- a trailer of 24 bytes: the number n of entries, the offset of the
+  index (as 64-bit integers) and the magic bytes b"PGSINDEX"
+
+The file is never truncated or overwritten in place: new entries are
+written after the last trailer and flushing writes a new index and
+trailer at the end of the file. A new store (mode ``"w"``) is written
+to a temporary file which replaces the old file when it is first
+flushed. Readers use the last valid trailer, so a store opened for
+writing must be closed (or flushed) before the new entries are visible
+to other readers. Processes which already opened the store keep seeing
+the entries which existed at that time, and a writer which is
+interrupted before flushing leaves the previously flushed entries
+readable.
+
+Every flush leaves the previous index (16 bytes per entry) unused in
+the file, so a store which is flushed k times while growing to n
+entries contains up to 16kn bytes of old indexes. Use
+:meth:`GenStore.compact` to reclaim this space.
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+from libc.stdint cimport uint64_t
+from libc.string cimport memcpy
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, PyBUF_SIMPLE
+
+from .gen cimport Gen, objtogen
+from .stack cimport new_gen, clone_gen
+from .convert cimport gen_to_bytes, binary_to_GEN
+
+import io
+import mmap
+import os
+import secrets
+import struct
+import sys
+from array import array
+
+
+cdef enum:
+    STORE_VERSION = 2
+    STORE_HEADER = 16
+    STORE_TRAILER = 24
+
+cdef header_format = struct.Struct("=8sBBc5x")
+cdef trailer_format = struct.Struct("=QQ8s")
+cdef bytes byteorder = b"<" if sys.byteorder == "little" else b">"
+
+
+cdef class GenStore:
+    r"""
+    A file containing a sequence of PARI objects with random access.
+
+    INPUT:
+
+    - ``path`` -- the file name
+
+    - ``mode`` -- ``"r"`` (default) to open an existing store
+      read-only, ``"a"`` to append to a store (created if needed) or
+      ``"w"`` to create a new empty store
+
+    Entries are converted to :class:`Gen` on access. Use
+    :meth:`get` with ``clone=True`` to put the result on the PARI heap
+    instead of the PARI stack, for objects which are kept for a long
+    time.
+
+    Examples:
+
+    >>> import os, tempfile
+    >>> from cypari2 import Pari
+    >>> from cypari2.store import GenStore
+    >>> pari = Pari()
+    >>> path = os.path.join(tempfile.mkdtemp(), "fields.pgs")
+    >>> with GenStore(path, "w") as store:
+    ...     for n in range(2, 6):
+    ...         i = store.append(pari.polcyclo(n, "y"))
+    ...     store.extend([pari("Mod(2, 7)"), pari("3/4")])
+    >>> store = GenStore(path)
+    >>> len(store)
+    6
+    >>> store[2]
+    y^2 + 1
+    >>> store[-1]
+    3/4
+    >>> store[1:3]
+    [y^2 + y + 1, y^2 + 1]
+    >>> list(store)
+    [y + 1, y^2 + y + 1, y^2 + 1, y^4 + y^3 + y^2 + y + 1, Mod(2, 7), 3/4]
+    >>> store.close()
+
+    Appending to an existing store, where new entries can be read
+    before they are flushed:
+
+    >>> with GenStore(path, "a") as store:
+    ...     store.append(pari("[1, 2; 3, 4]"))
+    ...     store[0], store[6]
+    6
+    (y + 1, [1, 2; 3, 4])
+    >>> with GenStore(path) as store:
+    ...     store[6]
+    [1, 2; 3, 4]
+
+    Readers which opened the store before an append are not affected,
+    and data written after the last flush (for example by a process
+    which crashed) is ignored:
+
+    >>> reader = GenStore(path)
+    >>> with GenStore(path, "a") as store:
+    ...     store.append(8)
+    7
+    >>> len(reader), len(GenStore(path))
+    (7, 8)
+    >>> reader.close()
+    >>> with open(path, "ab") as f:
+    ...     _ = f.write(b"unfinished entry")
+    >>> with GenStore(path, "a") as store:
+    ...     len(store), store.append(9)
+    (8, 8)
+    >>> GenStore(path)[7:]
+    [8, 9]
+
+    Creating a new store replaces the file only when the new store is
+    flushed, so readers of the old file are not affected:
+
+    >>> reader = GenStore(path)
+    >>> store = GenStore(path, "w")
+    >>> _ = store.append(10)
+    >>> len(GenStore(path)), store[0]
+    (9, 10)
+    >>> store.close()
+    >>> len(reader), reader[8], GenStore(path)[:]
+    (9, 9, [10])
+    >>> reader.close()
+
+    Errors:
+
+    >>> store = GenStore(path)
+    >>> store[10]
+    Traceback (most recent call last):
+    ...
+    IndexError: GenStore index out of range
+    >>> store.append(1)
+    Traceback (most recent call last):
+    ...
+    io.UnsupportedOperation: GenStore opened read-only
+    >>> store.close()
+    >>> store[0]
+    Traceback (most recent call last):
+    ...
+    ValueError: I/O operation on closed GenStore
+    >>> _ = open(path, "wb").write(b"not a store")
+    >>> GenStore(path)
+    Traceback (most recent call last):
+    ...
+    ValueError: ... is not a PARI object store
+    """
+    cdef readonly str path
+    cdef readonly str mode
+    cdef file
+    cdef map
+    cdef Py_buffer view
+    cdef bint mapped
+    cdef Py_ssize_t n
+    cdef Py_ssize_t index
+    cdef Py_ssize_t end
+    cdef offsets
+    cdef bint dirty
+    cdef str tmp_path
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "a", "w"):
+            raise ValueError("mode must be 'r', 'a' or 'w'")
+        self.path = os.fspath(path)
+        self.mode = mode
+        if mode == "a" and not os.path.exists(self.path):
+            mode = "w"
+
+        if mode == "w":
+            self.file, self.tmp_path = self.create_temp()
+            self.offsets = array("Q")
+            self.n = 0
+            self.end = STORE_HEADER
+            self.dirty = True
+            return
+
+        self.file = open(self.path, "rb" if mode == "r" else "r+b")
+        try:
+            self.map_file()
+        except BaseException:
+            self.file.close()
+            self.file = None
+            raise
+        if mode == "a":
+            self.offsets = array("Q")
+            self.offsets.frombytes(self.map[self.index:self.index + 16 * self.n])
+            self.end = self.file.seek(0, os.SEEK_END)
+
+    def __del__(self):
+        self.close()
+
+    def __dealloc__(self):
+        if self.mapped:
+            PyBuffer_Release(&self.view)
+
+    cdef create_temp(self):
+        """
+        Create a new file containing the header of an empty store, in
+        the directory of the store, and return the open file and its
+        name.
+        """
+        directory, name = os.path.split(self.path)
+        tmp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        f = open(tmp_path, "x+b")
+        f.write(header_format.pack(
+            b"PARIGENS", STORE_VERSION, sizeof(long), byteorder))
+        return f, tmp_path
+
+    cdef int map_data(self) except -1:
+        """
+        Map the current contents of the file in memory.
+        """
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        PyObject_GetBuffer(self.map, &self.view, PyBUF_SIMPLE)
+        self.mapped = True
+
+    cdef int map_file(self) except -1:
+        """
+        Map the file in memory and read the header and the last valid
+        trailer.
+        """
+        size = self.file.seek(0, os.SEEK_END)
+        if size < STORE_HEADER + STORE_TRAILER:
+            raise ValueError(f"{self.path!r} is not a PARI object store")
+        self.map_data()
+        try:
+            magic, version, wordsize, order = header_format.unpack_from(self.map)
+            if magic != b"PARIGENS":
+                raise ValueError(f"{self.path!r} is not a PARI object store")
+            if version != STORE_VERSION:
+                raise ValueError(f"unsupported PARI object store version {version}")
+            if wordsize != sizeof(long) or order != byteorder:
+                raise ValueError(f"{self.path!r} was written on an incompatible platform")
+            # Search the last trailer, skipping incomplete data written
+            # after it
+            end = size
+            while True:
+                pos = self.map.rfind(b"PGSINDEX", STORE_HEADER, end)
+                if pos < 0:
+                    raise ValueError(f"{self.path!r} is not a PARI object store")
+                n, index, index_magic = trailer_format.unpack_from(self.map, pos - 16)
+                if (pos >= STORE_HEADER + 16 and index >= STORE_HEADER and
+                        index + 16 * n + STORE_TRAILER == pos + 8):
+                    break
+                end = pos + 7
+        except BaseException:
+            self.unmap_file()
+            raise
+        self.n = n
+        self.index = index
+
+    cdef int unmap_file(self) except -1:
+        if self.mapped:
+            PyBuffer_Release(&self.view)
+            self.mapped = False
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    cdef int check_open(self) except -1:
+        if self.file is None:
+            raise ValueError("I/O operation on closed GenStore")
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get(j) for j in range(*i.indices(self.n))]
+        return self.get(i)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.get(i)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, Py_ssize_t i, bint clone=False):
+        r"""
+        Return entry ``i`` of the store.
+
+        The entry is copied from the file to the PARI stack. If
+        ``clone`` is ``True``, it is copied to the PARI heap instead.
+        Entries which were appended but not flushed yet can be read
+        from the store to which they were appended.
+
+        Examples:
+
+        >>> import os, tempfile
+        >>> from cypari2 import Pari
+        >>> from cypari2.store import GenStore
+        >>> pari = Pari()
+        >>> path = os.path.join(tempfile.mkdtemp(), "clone.pgs")
+        >>> with GenStore(path, "w") as store:
+        ...     store.append(pari("x^2 + 1"))
+        0
+        >>> with GenStore(path) as store:
+        ...     store.get(0, clone=True)
+        x^2 + 1
+        """
+        self.check_open()
+        if i < 0:
+            i += self.n
+        if not (0 <= i < self.n):
+            raise IndexError("GenStore index out of range")
+
+        cdef const char* data
+        cdef uint64_t start, end, limit
+        if self.offsets is not None:
+            # A writable store knows all offsets, including those of
+            # entries which are not flushed yet
+            start = self.offsets[2 * i]
+            end = self.offsets[2 * i + 1]
+            if not self.mapped or end > <uint64_t>self.view.len:
+                self.file.flush()
+                self.unmap_file()
+                self.map_data()
+            limit = self.view.len
+        else:
+            data = <const char*>self.view.buf
+            memcpy(&start, data + self.index + 16 * i, 8)
+            memcpy(&end, data + self.index + 16 * i + 8, 8)
+            limit = self.index
+        if not (STORE_HEADER <= start <= end <= limit):
+            raise ValueError(f"{self.path!r} is not a PARI object store")
+        data = <const char*>self.view.buf
+        x = binary_to_GEN(data + start, end - start)
+        if clone:
+            return clone_gen(x)
+        return new_gen(x)
+
+    def append(self, x):
+        r"""
+        Append ``x`` (converted to a PARI object) to the store and
+        return its index.
+
+        Objects containing closures cannot be stored.
+        """
+        self.check_open()
+        if self.mode == "r":
+            raise io.UnsupportedOperation("GenStore opened read-only")
+        cdef bytes data = gen_to_bytes(objtogen(x))
+        self.file.seek(self.end)
+        self.file.write(data)
+        self.offsets.append(self.end)
+        self.end += len(data)
+        self.offsets.append(self.end)
+        self.dirty = True
+        self.n += 1
+        return self.n - 1
+
+    def extend(self, iterable):
+        r"""
+        Append all objects of ``iterable`` to the store.
+        """
+        for x in iterable:
+            self.append(x)
+
+    def flush(self):
+        r"""
+        Write the index, such that the entries appended so far are
+        visible to readers of the file.
+        """
+        self.check_open()
+        if not self.dirty:
+            return
+        self.file.seek(self.end)
+        self.file.write(self.offsets.tobytes())
+        self.file.write(trailer_format.pack(self.n, self.end, b"PGSINDEX"))
+        self.file.flush()
+        self.index = self.end
+        self.end = self.file.tell()
+        self.dirty = False
+        if self.tmp_path is not None:
+            os.replace(self.tmp_path, self.path)
+            self.tmp_path = None
+
+    def compact(self):
+        r"""
+        Rewrite the store without the old indexes and without data
+        which does not belong to an entry (such as data left by a
+        writer which crashed), and flush it.
+
+        The store is written to a new file which then replaces the
+        old one, so readers of the old file are not affected.
+
+        Examples:
+
+        >>> import os, tempfile
+        >>> from cypari2.store import GenStore
+        >>> path = os.path.join(tempfile.mkdtemp(), "compact.pgs")
+        >>> with GenStore(path, "w") as store:
+        ...     for i in range(100):
+        ...         _ = store.append(i)
+        ...         store.flush()
+        ...     size = os.path.getsize(path)
+        ...     store.compact()
+        ...     os.path.getsize(path) < size // 5
+        ...     store[:3] + store[-1:]
+        True
+        [0, 1, 2, 99]
+        >>> GenStore(path)[50]
+        50
+        """
+        self.check_open()
+        if self.mode == "r":
+            raise io.UnsupportedOperation("GenStore opened read-only")
+        self.file.flush()
+        self.unmap_file()
+        self.map_data()
+        f, tmp_path = self.create_temp()
+        offsets = array("Q")
+        try:
+            pos = STORE_HEADER
+            for i in range(self.n):
+                start = self.offsets[2 * i]
+                end = self.offsets[2 * i + 1]
+                f.write(self.map[start:end])
+                offsets.append(pos)
+                pos += end - start
+                offsets.append(pos)
+            f.write(offsets.tobytes())
+            f.write(trailer_format.pack(self.n, pos, b"PGSINDEX"))
+            f.flush()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+        self.unmap_file()
+        self.file.close()
+        if self.tmp_path is not None:
+            os.unlink(self.tmp_path)
+            self.tmp_path = None
+        self.file = f
+        self.offsets = offsets
+        self.index = pos
+        self.end = f.tell()
+        self.dirty = False
+
+    def close(self):
+        r"""
+        Flush and close the store. This does nothing if the store is
+        already closed.
+        """
+        if self.file is None:
+            return
+        try:
+            if self.mode != "r":
+                self.flush()
+        finally:
+            self.unmap_file()
+            self.file.close()
+            self.file = None
@@ -0,0 +1,522 @@
+r"""
+Translate Python functions to GP closures
+*****************************************
+
+A Python function converted to a PARI closure by
+:func:`~cypari2.closure.objtoclosure` is normally called back from PARI
+for every evaluation. Simple functions which only do arithmetic can
+instead be translated to an equivalent GP closure, which PARI evaluates
+without calling Python. This is done by ``objtoclosure(f,
+translate=True)``: if ``f`` cannot be translated, a normal closure is
+returned.
+
+The function must be a ``lambda`` or a function whose body is a single
+``return`` statement (possibly after a docstring), with only positional
+arguments and without default values. Its source code must be
+available. The returned expression may use:
+
+- ``int``, ``float`` and ``bool`` literals
+
+- the arguments of the function
+
+- the operators ``+``, ``-``, ``*``, ``/``, ``//``, ``%`` and ``**``,
+  which are translated to the GP operators ``+``, ``-``, ``*``, ``/``,
+  ``\``, ``%`` and ``^``
+
+- comparisons, ``not`` and ``and``/``or`` between comparisons
+
+- conditional expressions ``a if c else b``
+
+- ``abs()``
+
+- calls of auto-generated methods of :class:`~cypari2.pari_instance.Pari`
+  and :class:`~cypari2.gen.Gen` with positional arguments, like
+  ``pari.gcd(x, y)`` or ``x.sin()``
+
+The GP closure computes what the Python function computes when it is
+called with :class:`~cypari2.gen.Gen` arguments, as done by a normal
+closure. Subexpressions involving only literals are computed by Python:
+for example, ``1/2`` is translated to ``0.5``. Floating-point literals
+are translated to real numbers with the same value and the current
+precision.
+
+Examples:
+
+>>> from cypari2 import Pari
+>>> from cypari2.translate import function_to_gp
+>>> pari = Pari()
+>>> function_to_gp(lambda x: x**2 + 3*x - 1)
+'(x)->x^2+3*x-1'
+>>> function_to_gp(lambda n: n % 7 == 3)
+'(n)->n%7==3'
+>>> def f(a, b):
+...     "Some function"
+...     return pari.gcd(a, b) + (a // -b) ** (1/2) if a > 0 and not b else abs(a.sin())
+>>> function_to_gp(f)
+'(a,b)->if(a>0&&!b,gcd(a,b)+(a\\(-b))^0.5,abs(sin(a)))'
+
+Functions which cannot be translated:
+
+>>> function_to_gp(lambda x: x[0])
+Traceback (most recent call last):
+...
+ValueError: cannot translate <lambda>() to GP: unsupported Subscript
+>>> function_to_gp(lambda x: x and 1)
+Traceback (most recent call last):
+...
+ValueError: cannot translate <lambda>() to GP: and/or of non-boolean values
+>>> function_to_gp(lambda x, y=1: x)
+Traceback (most recent call last):
+...
+ValueError: cannot translate <lambda>() to GP: unsupported arguments
+>>> function_to_gp(len)
+Traceback (most recent call last):
+...
+ValueError: cannot translate len() to GP: not a Python function
+"""
+
+# ****************************************************************************
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#                  https://www.gnu.org/licenses/
+# ****************************************************************************
+
+import ast
+import builtins
+import copy
+import linecache
+import math
+import operator
+import re
+from types import CodeType
+
+
+# Precedence of GP expressions, from the loosest to the tightest
+OR, AND, CMP, ADD, MUL, UNARY, POW, ATOM = range(8)
+
+# Python operator -> (GP operator, precedence, Python function)
+binary_operators = {
+    ast.Add: ("+", ADD, operator.add),
+    ast.Sub: ("-", ADD, operator.sub),
+    ast.Mult: ("*", MUL, operator.mul),
+    ast.Div: ("/", MUL, operator.truediv),
+    ast.FloorDiv: ("\\", MUL, operator.floordiv),
+    ast.Mod: ("%", MUL, operator.mod),
+    ast.Pow: ("^", POW, operator.pow),
+}
+
+comparison_operators = {
+    ast.Eq: ("==", operator.eq),
+    ast.NotEq: ("!=", operator.ne),
+    ast.Lt: ("<", operator.lt),
+    ast.LtE: ("<=", operator.le),
+    ast.Gt: (">", operator.gt),
+    ast.GtE: (">=", operator.ge),
+}
+
+gp_identifier = re.compile(r"[A-Za-z][A-Za-z0-9_]*\Z")
+
+
+class Translator:
+    r"""
+    Translate the Python function ``f`` to GP, see
+    :func:`function_to_gp`.
+    """
+    def __init__(self, f):
+        self.f = f
+        self.name = getattr(f, "__name__", "function")
+        self.code = getattr(f, "__code__", None)
+        self.args = ()
+
+    def error(self, reason):
+        return ValueError(f"cannot translate {self.name}() to GP: {reason}")
+
+    def find_node(self):
+        r"""
+        Return the ``ast.Lambda`` or ``ast.FunctionDef`` node of the
+        source code of ``f``.
+
+        The node is compiled again and compared to the code of ``f``,
+        such that a source file which changed since ``f`` was defined
+        is never translated.
+        """
+        code = self.code
+        if code is None:
+            raise self.error("not a Python function")
+        lines = linecache.getlines(code.co_filename, self.f.__globals__)
+        if not lines:
+            raise self.error("source code not available")
+        try:
+            tree = ast.parse("".join(lines))
+        except (SyntaxError, ValueError):
+            raise self.error("cannot parse the source code")
+
+        candidates = []
+        for node in ast.walk(tree):
+            if code.co_name == "<lambda>":
+                if isinstance(node, ast.Lambda) and node.lineno == code.co_firstlineno:
+                    candidates.append(node)
+            elif isinstance(node, ast.FunctionDef) and node.name == code.co_name:
+                first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                if first == code.co_firstlineno:
+                    candidates.append(node)
+
+        # Compare the bytecode, which also distinguishes several
+        # lambdas on the same line
+        candidates = [node for node in candidates if self.same_code(node)]
+        if not candidates:
+            raise self.error("source code does not match the function")
+        if len(candidates) != 1:
+            raise self.error("source code not found")
+        return candidates[0]
+
+    def same_code(self, node):
+        r"""
+        Check whether the lambda or function definition ``node``
+        compiles to the code of ``f``.
+        """
+        code = self.code
+        if isinstance(node, ast.Lambda):
+            stmt = ast.Expr(value=node)
+        else:
+            # The decorators do not change the code of f
+            stmt = copy.copy(node)
+            stmt.decorator_list = []
+        body = [stmt]
+        if code.co_freevars:
+            # Define the free variables of f in an enclosing function
+            outer = ast.parse("def outer():\n    {} = None\n".format(
+                " = ".join(code.co_freevars))).body[0]
+            outer.body += body
+            body = [outer]
+        module = ast.Module(body=body, type_ignores=[])
+        ast.fix_missing_locations(module)
+        try:
+            compiled = compile(module, code.co_filename, "exec")
+        except (SyntaxError, ValueError, TypeError):
+            return False
+
+        todo = [compiled]
+        while todo:
+            c = todo.pop()
+            if (c.co_code == code.co_code and
+                    c.co_consts == code.co_consts and
+                    c.co_names == code.co_names and
+                    c.co_varnames == code.co_varnames and
+                    c.co_freevars == code.co_freevars):
+                return True
+            todo.extend(x for x in c.co_consts if isinstance(x, CodeType))
+        return False
+
+    def translate(self):
+        r"""
+        Return the GP source code of a closure equivalent to ``f``.
+        """
+        node = self.find_node()
+        a = node.args
+        if (a.vararg or a.kwarg or a.kwonlyargs or a.defaults or
+                a.kw_defaults):
+            raise self.error("unsupported arguments")
+        self.args = tuple(arg.arg for arg in a.posonlyargs + a.args)
+        for arg in self.args:
+            if not gp_identifier.match(arg):
+                raise self.error(f"invalid GP variable name {arg!r}")
+
+        if isinstance(node, ast.Lambda):
+            body = node.body
+        else:
+            stmts = node.body
+            if (stmts and isinstance(stmts[0], ast.Expr) and
+                    isinstance(stmts[0].value, ast.Constant) and
+                    isinstance(stmts[0].value.value, str)):
+                stmts = stmts[1:]  # docstring
+            if (len(stmts) != 1 or not isinstance(stmts[0], ast.Return) or
+                    stmts[0].value is None):
+                raise self.error("the body is not a single return statement")
+            body = stmts[0].value
+
+        src, prec, value = self.expr(body)
+        return "(" + ",".join(self.args) + ")->" + src
+
+    def expr(self, node):
+        r"""
+        Translate the Python expression ``node``.
+
+        Return a tuple ``(src, prec, value)`` where ``src`` is the GP
+        source code, ``prec`` its precedence and ``value`` the value of
+        the expression if it only involves literals, ``None`` otherwise.
+        """
+        method = getattr(self, "expr_" + type(node).__name__, None)
+        if method is None:
+            raise self.error(f"unsupported {type(node).__name__}")
+        return method(node)
+
+    def literal(self, value):
+        if type(value) is bool:
+            value = int(value)
+        if type(value) is int:
+            src = str(value)
+        elif type(value) is float and math.isfinite(value):
+            src = repr(value)
+            # PARI reads the shortest representation of value with more
+            # than 53 bits of precision, which may give a different
+            # number. If so, use the exact binary value m * 2^e.
+            from .gen import objtogen
+            if objtogen(src) != objtogen(value):
+                m, e = math.frexp(value)
+                m, e = int(m * 2**53), e - 53
+                while not m & 1:
+                    m >>= 1
+                    e += 1
+                src = f"shift({m}.,{e})"
+        else:
+            raise self.error(f"unsupported constant {value!r}")
+        prec = UNARY if src.startswith("-") else ATOM
+        return src, prec, value
+
+    def fold(self, function, *values):
+        r"""
+        Compute an expression involving only literals in Python.
+        """
+        try:
+            return self.literal(function(*values))
+        except ArithmeticError:
+            raise self.error("error when computing a constant")
+
+    def operand(self, node, prec):
+        r"""
+        Translate ``node`` and add parentheses if its precedence is
+        lower than ``prec``.
+        """
+        src, p, value = self.expr(node)
+        if p < prec:
+            src = "(" + src + ")"
+        return src, value
+
+    def resolve(self, name):
+        r"""
+        Return the value of the global, nonlocal or builtin ``name``
+        when ``f`` is called.
+        """
+        code = self.code
+        if name in code.co_freevars:
+            try:
+                return self.f.__closure__[code.co_freevars.index(name)].cell_contents
+            except ValueError:
+                raise self.error(f"undefined name {name!r}")
+        if name in self.f.__globals__:
+            return self.f.__globals__[name]
+        b = self.f.__globals__.get("__builtins__", builtins)
+        if not isinstance(b, dict):
+            b = vars(b)
+        try:
+            return b[name]
+        except KeyError:
+            raise self.error(f"undefined name {name!r}")
+
+    def expr_Constant(self, node):
+        return self.literal(node.value)
+
+    def expr_Name(self, node):
+        if node.id in self.args:
+            return node.id, ATOM, None
+        raise self.error(f"unsupported name {node.id!r}")
+
+    def expr_BinOp(self, node):
+        try:
+            op, prec, function = binary_operators[type(node.op)]
+        except KeyError:
+            raise self.error(f"unsupported operator {type(node.op).__name__}")
+        if op == "^":
+            # ^ is right-associative
+            left, x = self.operand(node.left, prec + 1)
+            right, y = self.operand(node.right, prec)
+        else:
+            left, x = self.operand(node.left, prec)
+            right, y = self.operand(node.right, prec + 1)
+        if x is not None and y is not None:
+            if op == "^" and abs(y) > 1000:
+                raise self.error("exponent too large")
+            return self.fold(function, x, y)
+        if right.startswith("-"):
+            # Avoid "--" and "+-"
+            right = "(" + right + ")"
+        return left + op + right, prec, None
+
+    def expr_UnaryOp(self, node):
+        if isinstance(node.op, ast.UAdd):
+            return self.expr(node.operand)
+        if isinstance(node.op, ast.USub):
+            src, x = self.operand(node.operand, UNARY + 1)
+            if x is not None:
+                return self.fold(operator.neg, x)
+            return "-" + src, UNARY, None
+        if isinstance(node.op, ast.Not):
+            src, x = self.operand(node.operand, ATOM)
+            if x is not None:
+                return self.fold(operator.not_, x)
+            return "!" + src, UNARY, None
+        raise self.error(f"unsupported operator {type(node.op).__name__}")
+
+    def expr_Compare(self, node):
+        terms = []
+        values = []
+        left, x = self.operand(node.left, CMP + 1)
+        for cmpop, right_node in zip(node.ops, node.comparators):
+            try:
+                op, function = comparison_operators[type(cmpop)]
+            except KeyError:
+                raise self.error(f"unsupported operator {type(cmpop).__name__}")
+            right, y = self.operand(right_node, CMP + 1)
+            terms.append(left + op + right)
+            values.append((function, x, y))
+            left, x = right, y
+        if all(x is not None and y is not None for _, x, y in values):
+            return self.fold(lambda: all(f(x, y) for f, x, y in values))
+        if len(terms) == 1:
+            return terms[0], CMP, None
+        return "&&".join(terms), AND, None
+
+    def expr_BoolOp(self, node):
+        # Python returns one of the operands, GP returns 0 or 1: these
+        # only agree for operands which are booleans
+        for value in node.values:
+            if not (isinstance(value, (ast.Compare, ast.BoolOp)) or
+                    (isinstance(value, ast.UnaryOp) and isinstance(value.op, ast.Not)) or
+                    (isinstance(value, ast.Constant) and type(value.value) is bool)):
+                raise self.error("and/or of non-boolean values")
+        if isinstance(node.op, ast.And):
+            op, prec = "&&", AND
+        else:
+            op, prec = "||", OR
+        operands = [self.operand(value, prec) for value in node.values]
+        if all(x is not None for _, x in operands):
+            if prec == AND:
+                return self.fold(lambda: all(x for _, x in operands))
+            return self.fold(lambda: any(x for _, x in operands))
+        return op.join(src for src, _ in operands), prec, None
+
+    def expr_IfExp(self, node):
+        test = self.expr(node.test)
+        body = self.expr(node.body)
+        orelse = self.expr(node.orelse)
+        if test[2] is not None:
+            return body if test[2] else orelse
+        return f"if({test[0]},{body[0]},{orelse[0]})", ATOM, None
+
+    def expr_Call(self, node):
+        if node.keywords or any(isinstance(a, ast.Starred) for a in node.args):
+            raise self.error("unsupported arguments in function call")
+        # Imported here to avoid circular imports
+        from .gen import Gen, Gen_base
+        from .pari_instance import Pari, Pari_auto
+
+        func = node.func
+        args = [self.expr(a)[0] for a in node.args]
+        if isinstance(func, ast.Name):
+            if (func.id not in self.args and len(args) == 1 and
+                    self.resolve(func.id) is builtins.abs):
+                return f"abs({args[0]})", ATOM, None
+            raise self.error(f"unsupported function {func.id}()")
+        if not isinstance(func, ast.Attribute):
+            raise self.error("unsupported function call")
+
+        name = func.attr
+        if name.startswith("_") or not gp_identifier.match(name):
+            raise self.error(f"unsupported method {name}()")
+        if (isinstance(func.value, ast.Name) and func.value.id not in self.args and
+                isinstance(self.resolve(func.value.id), Pari)):
+            # pari.name(args)
+            if name not in Pari_auto.__dict__ or name in Pari.__dict__:
+                raise self.error(f"unsupported method {name}()")
+        else:
+            # x.name(args)
+            if name not in Gen_base.__dict__ or name in Gen.__dict__:
+                raise self.error(f"unsupported method {name}()")
+            src, prec, value = self.expr(func.value)
+            if value is not None:
+                raise self.error(f"unsupported method {name}() of a constant")
+            args.insert(0, src)
+        return name + "(" + ",".join(args) + ")", ATOM, None
+
+
+def function_to_gp(f):
+    r"""
+    Return the source code of a GP closure equivalent to the Python
+    function ``f``. Raise a ``ValueError`` if ``f`` cannot be
+    translated.
+
+    Examples:
+
+    >>> from cypari2.translate import function_to_gp
+    >>> function_to_gp(lambda: 2**10 - 1/4)
+    '()->1023.75'
+    >>> function_to_gp(lambda: 0.1)
+    '()->shift(3602879701896397.,-55)'
+    >>> function_to_gp(lambda x, y: -(-x) - -y * x**-y)
+    '(x,y)->-(-x)-(-y*x^(-y))'
+    >>> function_to_gp(lambda x, y: x < y <= 2 or x == 1 != y)
+    '(x,y)->x<y&&y<=2||x==1&&1!=y'
+    >>> function_to_gp(lambda x: (x + 1) ** 2 ** x % (2 * x))
+    '(x)->(x+1)^2^x%(2*x)'
+
+    Two lambdas on the same line:
+
+    >>> f, g = lambda x: x + 1, lambda x: x - 1
+    >>> function_to_gp(f), function_to_gp(g)
+    ('(x)->x+1', '(x)->x-1')
+
+    Calls of methods which are not generated from the PARI library are
+    not translated:
+
+    >>> from cypari2 import Pari
+    >>> pari = Pari()
+    >>> function_to_gp(lambda x: pari.vector(x))
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot translate <lambda>() to GP: unsupported method vector()
+    >>> function_to_gp(lambda x: x.factor())
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot translate <lambda>() to GP: unsupported method factor()
+
+    Functions defined inside other functions:
+
+    >>> def gcd_with(n):
+    ...     return lambda x: pari.gcd(x, n)
+    >>> function_to_gp(gcd_with(6))
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot translate <lambda>() to GP: unsupported name 'n'
+    >>> def gcd_with_6(pari):
+    ...     return lambda x: pari.gcd(x, 6)
+    >>> function_to_gp(gcd_with_6(pari))
+    '(x)->gcd(x,6)'
+
+    The source code must be the code which defined the function:
+
+    >>> import linecache, os, sys, tempfile
+    >>> d = tempfile.mkdtemp()
+    >>> path = os.path.join(d, "translate_stale.py")
+    >>> with open(path, "w") as f:
+    ...     _ = f.write("g = lambda x: x + 1\n")
+    >>> sys.path.insert(0, d)
+    >>> import translate_stale
+    >>> function_to_gp(translate_stale.g)
+    '(x)->x+1'
+    >>> with open(path, "w") as f:
+    ...     _ = f.write("g = lambda x: x + 10\n")
+    >>> linecache.checkcache(path)
+    >>> function_to_gp(translate_stale.g)
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot translate <lambda>() to GP: source code does not match the function
+    >>> sys.path.remove(d)
+    >>> function_to_gp(lambda x: len(x))
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot translate <lambda>() to GP: unsupported function len()
+    """
+    return Translator(f).translate()
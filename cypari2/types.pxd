@@ -109,6 +109,12 @@ cdef extern from "pari/pari.h":
         ulong hash
         entree *next
 
+    ctypedef struct GENbin:
+        size_t len
+        GEN x
+        GEN base
+        void (*rebase)(GEN, long)
+
     # Various structures that we don't interface but which need to be
     # declared, such that Cython understands the declarations of
     # functions using these types.
@@ -129,7 +135,6 @@ cdef extern from "pari/pari.h":
     struct pari_stack
     struct pari_thread
     struct pari_timer
-    struct GENbin
     struct hashentry
     struct hashtable
 
@@ -11,6 +11,12 @@ sys.path.append(path)
 import doctest
 
 import cypari2
+import cypari2.store
+import cypari2.diskcache
+import cypari2.docs
+import cypari2.parallel
+import cypari2.profiler
+import cypari2.translate
 
 # The doctests assume utf-8 encoding
 cypari2.string_utils.encoding = "utf-8"
@@ -25,9 +31,10 @@ cypari2.handle_error.PariError.__module__ = "__main__"
 pari = cypari2.Pari()
 pari.default("debugmem", 0)
 
-modules = [cypari2.closure, cypari2.convert, cypari2.gen,
-            cypari2.handle_error, cypari2.pari_instance, cypari2.stack,
-            cypari2.string_utils]
+modules = [cypari2.closure, cypari2.convert, cypari2.diskcache, cypari2.docs,
+            cypari2.gen, cypari2.handle_error, cypari2.pari_instance,
+            cypari2.parallel, cypari2.profiler, cypari2.stack, cypari2.store,
+            cypari2.string_utils, cypari2.translate]
 try:
       import autogen
       modules.extend([
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Benchmark the time and memory used by ``import cypari2`` in a new
+Python process, to catch regressions.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Generous limits: "import cypari2" takes about 35 ms and increases the
+# maximal RSS by about 6 MB (for a total of about 19 MB for the process)
+IMPORT_TIME_LIMIT = 1.0   # seconds
+IMPORT_RSS_LIMIT = 50     # megabytes
+
+BENCHMARK = """
+import resource, sys, time
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = time.perf_counter()
+import cypari2
+t = time.perf_counter() - t
+scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss in kB on Linux
+rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) * scale
+print(t, rss / 2**20, cypari2.docs.docs is None)
+"""
+
+
+def run_benchmark():
+    # Run in this directory, such that the source directory of cypari2
+    # is not imported
+    out = subprocess.run([sys.executable, "-c", BENCHMARK],
+                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True).stdout
+    t, rss, lazy = out.split()
+    return float(t), float(rss), lazy == "True"
+
+
+@unittest.skipIf(resource is None, "the resource module is not available")
+class TestImport(unittest.TestCase):
+    def test_import_time(self):
+        t = min(run_benchmark()[0] for _ in range(3))
+        print(f"import cypari2: {t * 1000:.1f} ms")
+        self.assertLess(t, IMPORT_TIME_LIMIT)
+
+    def test_import_rss(self):
+        rss = run_benchmark()[1]
+        print(f"import cypari2: {rss:.1f} MB")
+        self.assertLess(rss, IMPORT_RSS_LIMIT)
+
+    def test_lazy_docs(self):
+        # The documentation of the generated methods is not loaded
+        self.assertTrue(run_benchmark()[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import unittest
+
+import cypari2
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestToNumpy(unittest.TestCase):
+    def setUp(self):
+        self.pari = cypari2.Pari()
+
+    def check(self, a, dtype, values):
+        self.assertEqual(a.dtype, numpy.dtype(dtype))
+        self.assertEqual(a.tolist(), values)
+
+    def test_vecsmall(self):
+        v = self.pari([1, -2, 3]).Vecsmall()
+        a = v.to_numpy()
+        self.check(a, "int64", [1, -2, 3])
+        # Shares memory with the PARI object
+        self.assertFalse(a.flags.writeable)
+        self.assertIs(a.base.obj, v)
+        self.check(v.to_numpy(float), "float64", [1.0, -2.0, 3.0])
+
+    def test_vector(self):
+        pari = self.pari
+        self.check(pari([1, -2, 3]).to_numpy(), "int64", [1, -2, 3])
+        self.check(pari("[1, 2]~").to_numpy(), "int64", [1, 2])
+        self.check(pari([]).to_numpy(), "int64", [])
+        self.check(pari("[1, 2.5]").to_numpy(), "float64", [1.0, 2.5])
+        self.check(pari("[1, 2.5, I]").to_numpy(), "complex128",
+                   [1, 2.5, 1j])
+        self.check(pari("[1, 2.5, 1/2]").to_numpy(), "object",
+                   [1, 2.5, 0.5])
+        self.check(pari([1, 2**64]).to_numpy(), "object", [1, 2**64])
+        self.check(pari([1, 2**64]).to_numpy(float), "float64",
+                   [1.0, 2.0**64])
+        self.check(pari([1, 2]).to_numpy("int32"), "int32", [1, 2])
+
+    def test_matrix(self):
+        pari = self.pari
+        m = pari("[1, 2, 3; 4, 5, 6]")
+        a = m.to_numpy()
+        self.check(a, "int64", [[1, 2, 3], [4, 5, 6]])
+        self.check(pari("[1.5; 2]").to_numpy(), "float64", [[1.5], [2.0]])
+        self.check(pari("matrix(0, 0)").to_numpy(), "int64", [])
+        self.assertEqual(pari("matrix(0, 0)").to_numpy().shape, (0, 0))
+        self.check(m.Mat().mattranspose().to_numpy(), "int64",
+                   [[1, 4], [2, 5], [3, 6]])
+
+    def test_errors(self):
+        pari = self.pari
+        with self.assertRaises(OverflowError):
+            pari([1, 2**64]).to_numpy("int64")
+        with self.assertRaises(OverflowError):
+            pari([1, 2**31]).to_numpy("int32")
+        with self.assertRaises(OverflowError):
+            pari([-1]).to_numpy("uint64")
+        with self.assertRaises(OverflowError):
+            pari([256]).Vecsmall().to_numpy("uint8")
+        with self.assertRaises(TypeError):
+            pari([1, 2.5]).to_numpy(int)
+        with self.assertRaises(TypeError):
+            pari(1).to_numpy()
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestFromNumpy(unittest.TestCase):
+    def setUp(self):
+        self.pari = cypari2.Pari()
+
+    def test_from_array(self):
+        pari = self.pari
+        a = numpy.arange(6, dtype=numpy.int64).reshape(2, 3)
+        m = pari.from_array(a)
+        self.assertEqual(m.type(), "t_MAT")
+        self.assertEqual(m, pari("[0, 1, 2; 3, 4, 5]"))
+        self.assertEqual(pari.from_array(a.T), pari("[0, 3; 1, 4; 2, 5]"))
+        self.assertEqual(pari.from_array(a[:, ::-2]), pari("[2, 0; 5, 3]"))
+        v = pari.from_array(a[1], vecsmall=True)
+        self.assertEqual(v, pari("Vecsmall([3, 4, 5])"))
+        z = pari.from_array(numpy.array([1.5, 2j]))
+        self.assertEqual(z, pari([1.5, 2j]))
+        self.assertEqual(pari.from_array(numpy.array([0.1], dtype=numpy.float32)),
+                         pari([float(numpy.float32(0.1))]))
+        self.assertEqual(pari.from_array(numpy.array([True, False])),
+                         pari("[1, 0]"))
+        self.assertEqual(pari.from_array(numpy.zeros((0, 3))).matsize(),
+                         pari([0, 3]))
+
+    def test_round_trip(self):
+        pari = self.pari
+        for a in [numpy.arange(-5, 5), numpy.linspace(0, 1, 7),
+                  numpy.array([[1 + 2j, 3], [4.5, -1j]]),
+                  numpy.arange(12).reshape(3, 4)]:
+            b = pari.from_array(a).to_numpy()
+            self.assertEqual(b.dtype, a.dtype)
+            self.assertTrue((a == b).all())
+
+    def test_objtogen(self):
+        pari = self.pari
+        # Same results as converting the corresponding lists
+        for a in [numpy.arange(5), numpy.array([0.5, 1e100]),
+                  numpy.array([1 + 1j, 2]), numpy.arange(6).reshape(2, 3),
+                  numpy.array([2**64 - 1], dtype=numpy.uint64)]:
+            self.assertEqual(pari(a), pari(a.tolist()))
+        self.assertEqual(pari(numpy.int64(-7)), -7)
+        self.assertEqual(pari(numpy.array(["a", "b"])), pari(["a", "b"]))
+
+
+if __name__ == '__main__':
+    unittest.main()